@@ -0,0 +1,137 @@
+"""
+Cost-weighted, load-adaptive rate limiting for expensive endpoints.
+
+Expensive endpoints share a per-client compute budget measured in CPU
+milliseconds. Each request is charged up front with the endpoint's observed
+average CPU cost (seeded from ENDPOINT_COSTS and refined from measurements),
+multiplied by a load factor that grows when the host is busy. Scrapers hitting
+exports exhaust their budget quickly, while cheap interactive pages are not
+charged at all.
+"""
+
+import math
+import os
+import threading
+import time
+
+from flask import current_app, g, request
+
+import rate_limits
+
+DEFAULT_COMPUTE_BUDGET = '60000 per hour'  # CPU-ms per client
+
+# Starting CPU-ms estimates per endpoint, before any measurements exist
+ENDPOINT_COSTS = {
+    'main.search': 20,
+    'main.api_live_search': 5,
+    'main.api_get_officers': 10,
+    'main.api_get_incidents': 10,
+    'main.export_officer': 20,
+    'main.export_officers_csv': 500,
+    'main.export_incidents_csv': 500,
+    'main.export_vehicles_csv': 200,
+    'main.analytics': 100,
+}
+
+# Weight given to each new measurement in the running average
+SMOOTHING = 0.2
+
+# Host load (1-minute load average per CPU) above which charges are scaled up
+LOAD_THRESHOLD = 0.7
+MAX_LOAD_FACTOR = 8.0
+LOAD_SAMPLE_SECONDS = 1.0
+
+
+class CostTracker:
+    """Per-process running average of CPU-ms spent per endpoint"""
+
+    def __init__(self, initial_costs=None):
+        self._costs = dict(initial_costs or ENDPOINT_COSTS)
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, cpu_ms):
+        with self._lock:
+            previous = self._costs.get(endpoint)
+            if previous is None:
+                self._costs[endpoint] = cpu_ms
+            else:
+                self._costs[endpoint] = previous + SMOOTHING * (cpu_ms - previous)
+
+    def estimate(self, endpoint):
+        return self._costs.get(endpoint, 1.0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._costs)
+
+
+class LoadMonitor:
+    """Turns the host's load average into a multiplier for request costs"""
+
+    def __init__(self, threshold=LOAD_THRESHOLD, max_factor=MAX_LOAD_FACTOR):
+        self.threshold = threshold
+        self.max_factor = max_factor
+        self._cpus = os.cpu_count() or 1
+        self._factor = 1.0
+        self._sampled_at = 0.0
+
+    def factor(self):
+        now = time.monotonic()
+        if now - self._sampled_at >= LOAD_SAMPLE_SECONDS:
+            self._sampled_at = now
+            try:
+                load = os.getloadavg()[0] / self._cpus
+            except (AttributeError, OSError):
+                load = 0.0  # not available on this platform
+            self._factor = min(self.max_factor, max(1.0, load / self.threshold))
+        return self._factor
+
+
+cost_tracker = CostTracker()
+load_monitor = LoadMonitor()
+
+
+def request_cost():
+    """Budget charge for the current request, in CPU-ms"""
+    return max(1, math.ceil(cost_tracker.estimate(request.endpoint) * load_monitor.factor()))
+
+
+def init_app(app):
+    """Measure the CPU time each request spends, to refine the cost estimates"""
+    app.config.setdefault('RATELIMIT_COMPUTE_BUDGET', DEFAULT_COMPUTE_BUDGET)
+
+    @app.before_request
+    def start_cpu_timer():
+        g.cpu_started = time.thread_time()
+
+    @app.after_request
+    def record_cpu_time(response):
+        started = g.pop('cpu_started', None)
+        if started is None or not request.endpoint:
+            return response
+        endpoint = request.endpoint
+
+        def observe():
+            cost_tracker.observe(endpoint, (time.thread_time() - started) * 1000)
+
+        if response.is_streamed:
+            # A streamed export does its work while the server iterates the body
+            response.call_on_close(observe)
+        else:
+            observe()
+        return response
+
+
+def compute_limit(view):
+    """Decorator charging a view against the client's compute budget.
+
+    The budget comes from the RATELIMIT_COMPUTE_BUDGET config value, so it can
+    be changed without touching the decorated views.
+    """
+    return rate_limits.shared_limit(
+        lambda: current_app.config['RATELIMIT_COMPUTE_BUDGET'],
+        scope='compute',
+        cost=request_cost,
+        override_defaults=False,
+        error_message='Compute budget exceeded. Please slow down and try again later.'
+    )(view)
@@ -1,69 +1,204 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, abort, session
-from flask_sqlalchemy import SQLAlchemy
-from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, DateField, SelectField, FileField, BooleanField, SubmitField, FloatField, IntegerField
-from wtforms.validators import DataRequired, Email, Optional, NumberRange
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, url_for, flash, jsonify, send_file, abort, session, stream_with_context
 from werkzeug.utils import secure_filename
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask_mail import Mail, Message
 from dotenv import load_dotenv
+import click
 import os
 from datetime import datetime
-import json
-import requests
-from bs4 import BeautifulSoup
-import re
 import secrets
 import csv
 from io import StringIO
 
 from models import (db, Officer, Department, Incident, Evidence, SocialMediaProfile, 
                    CommunityReport, User, OfficerDepartmentHistory, TaxpayerCost, 
-                   OSINTProfile, AuditLog, ContentModeration, Dispute, Vehicle)
+                   OSINTProfile, AuditLog, Dispute, Vehicle,
+                   upgrade_schema)
+import change_feed
+import compression
+import database
+import moderation_queue
+import rate_limit_storage  # registers the sqlite:// rate limit storage scheme
+import rate_limits
+import replicas
+import serializers
+import sqlite_profile
+import live_search
+import name_search
+import maintenance
+import adaptive_limits
+import assets
+import profiling
+import metrics
+import query_detector
+import tracing
+from query_detector import query_budget
+from record_resolver import get_resolver, record_label
+from notifications import notify_admins_new_report, notify_admins_new_dispute
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-
-# Configuration from environment variables
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', secrets.token_hex(32))
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///badapples.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-
-# Email configuration
-app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
-app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'True') == 'True'
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@badapples.org')
-
-# OSINT API Keys (for future implementation)
-app.config['TWITTER_API_KEY'] = os.getenv('TWITTER_API_KEY')
-app.config['TWITTER_API_SECRET'] = os.getenv('TWITTER_API_SECRET')
-app.config['FACEBOOK_API_KEY'] = os.getenv('FACEBOOK_API_KEY')
-
-# Initialize extensions
-db.init_app(app)
-mail = Mail(app)
-
-# Rate limiting
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
-
-# Create upload directory
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# All routes live on this blueprint; commands are registered at the top level (flask init-db)
+bp = Blueprint('main', __name__, cli_group=None)
+
+# Expensive endpoints also draw from a per-client budget of CPU milliseconds
+compute_limit = adaptive_limits.compute_limit
+
+# Officers per page of /officers (snapshot_site.py renders the same pages)
+OFFICERS_PER_PAGE = 20
+
+# CSV exports are streamed: rows are fetched in batches and sent in blocks
+CSV_BATCH_ROWS = 1000
+CSV_BLOCK_BYTES = 32 * 1024
+
+def default_config(instance_path):
+    """Configuration from environment variables"""
+    return {
+        'SECRET_KEY': os.getenv('SECRET_KEY', secrets.token_hex(32)),
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL', database.DEFAULT_URI),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'UPLOAD_FOLDER': os.getenv('UPLOAD_FOLDER', 'uploads'),
+        'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max file size
+        
+        # Read-only replicas for GET requests (comma-separated DATABASE_REPLICA_URLS)
+        'SQLALCHEMY_REPLICA_URIS': replicas.replica_uris(),
+        'REPLICA_STICKY_SECONDS': int(os.getenv('REPLICA_STICKY_SECONDS', replicas.DEFAULT_STICKY_SECONDS)),
+        
+        # Pragmas applied to every SQLite connection (ignored on other databases)
+        'SQLITE_JOURNAL_MODE': os.getenv('SQLITE_JOURNAL_MODE', sqlite_profile.DEFAULT_JOURNAL_MODE),
+        'SQLITE_SYNCHRONOUS': os.getenv('SQLITE_SYNCHRONOUS', sqlite_profile.DEFAULT_SYNCHRONOUS),
+        'SQLITE_CACHE_SIZE_KB': int(os.getenv('SQLITE_CACHE_SIZE_KB', sqlite_profile.DEFAULT_CACHE_SIZE_KB)),
+        'SQLITE_MMAP_SIZE': int(os.getenv('SQLITE_MMAP_SIZE', sqlite_profile.DEFAULT_MMAP_SIZE)),
+        'SQLITE_BUSY_TIMEOUT_MS': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', sqlite_profile.DEFAULT_BUSY_TIMEOUT_MS)),
+        'SQLITE_BUSY_RETRIES': int(os.getenv('SQLITE_BUSY_RETRIES', sqlite_profile.DEFAULT_BUSY_RETRIES)),
+        
+        # Off-peak ANALYZE, incremental vacuum and integrity checks (python maintenance.py run)
+        'MAINTENANCE_WINDOW': os.getenv('MAINTENANCE_WINDOW', maintenance.DEFAULT_WINDOW),
+        'MAINTENANCE_STATE': os.getenv('MAINTENANCE_STATE', os.path.join(instance_path, 'maintenance.json')),
+        'MAINTENANCE_VACUUM_PAGES': int(os.getenv('MAINTENANCE_VACUUM_PAGES', maintenance.DEFAULT_VACUUM_PAGES)),
+        
+        # Change feed for mirrors (/api/changes)
+        'CHANGE_FEED_TOMBSTONE_DAYS': int(os.getenv('CHANGE_FEED_TOMBSTONE_DAYS', change_feed.DEFAULT_TOMBSTONE_DAYS)),
+        'CHANGE_FEED_SETTLE_SECONDS': int(os.getenv('CHANGE_FEED_SETTLE_SECONDS', change_feed.DEFAULT_SETTLE_SECONDS)),
+        
+        # Compression of HTML, JSON and CSV responses; turn off when the proxy compresses
+        'COMPRESS_ENABLED': os.getenv('COMPRESS_ENABLED', 'True') == 'True',
+        'COMPRESS_LEVELS': compression.parse_levels(os.getenv('COMPRESS_LEVELS')),
+        'COMPRESS_MIN_SIZE': int(os.getenv('COMPRESS_MIN_SIZE', compression.DEFAULT_MIN_SIZE)),
+        
+        # Most ids or badge numbers per /api/officers/batch or /api/incidents/batch request
+        'API_BATCH_MAX': int(os.getenv('API_BATCH_MAX', 100)),
+        
+        # jsonify uses orjson when installed (auto), or always/never (orjson/json)
+        'JSON_BACKEND': os.getenv('JSON_BACKEND', 'auto'),
+        
+        # Rate limit counters live in a SQLite file shared by all worker processes
+        'RATELIMIT_STORAGE_URI': os.getenv(
+            'RATELIMIT_STORAGE_URI', 'sqlite:///' + os.path.join(instance_path, 'ratelimit.db')),
+        'RATELIMIT_STRATEGY': os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter'),
+        'RATELIMIT_COMPUTE_BUDGET': os.getenv('RATELIMIT_COMPUTE_BUDGET', adaptive_limits.DEFAULT_COMPUTE_BUDGET),
+        
+        # Requests slower than this are logged with their SQL statements
+        'PERF_SLOW_REQUEST_MS': int(os.getenv('PERF_SLOW_REQUEST_MS', profiling.DEFAULT_SLOW_REQUEST_MS)),
+        'PERF_PROFILE_DIR': os.getenv('PERF_PROFILE_DIR', os.path.join(instance_path, 'profiles')),
+        
+        # Per-worker metric snapshots, merged by /metrics; empty it on deploy
+        'METRICS_DIR': os.getenv('METRICS_DIR', os.path.join(instance_path, 'metrics')),
+        # /metrics answers 404 until a token is set; scrapers send it as a bearer token
+        'METRICS_TOKEN': os.getenv('METRICS_TOKEN'),
+        
+        # Share of requests traced to instance/traces/ (0 disables tracing)
+        'TRACING_SAMPLE_RATE': float(os.getenv('TRACING_SAMPLE_RATE', 0)),
+        'TRACING_FILE': os.getenv('TRACING_FILE', os.path.join(instance_path, 'traces', 'traces-{pid}.jsonl')),
+        
+        # Email configuration
+        'MAIL_SERVER': os.getenv('MAIL_SERVER', 'smtp.gmail.com'),
+        'MAIL_PORT': int(os.getenv('MAIL_PORT', 587)),
+        'MAIL_USE_TLS': os.getenv('MAIL_USE_TLS', 'True') == 'True',
+        'MAIL_USERNAME': os.getenv('MAIL_USERNAME'),
+        'MAIL_PASSWORD': os.getenv('MAIL_PASSWORD'),
+        'MAIL_DEFAULT_SENDER': os.getenv('MAIL_DEFAULT_SENDER', 'noreply@badapples.org'),
+        
+        # OSINT API Keys (for future implementation)
+        'TWITTER_API_KEY': os.getenv('TWITTER_API_KEY'),
+        'TWITTER_API_SECRET': os.getenv('TWITTER_API_SECRET'),
+        'FACEBOOK_API_KEY': os.getenv('FACEBOOK_API_KEY'),
+    }
+
+def create_app(config=None):
+    """Application factory.
+    
+    ``config`` is a mapping that overrides the environment-derived defaults, e.g.
+    ``create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True})``.
+    Optional subsystems (mail, OSINT helpers, forms) are imported on first use,
+    so the factory is cheap enough to call once per test or in a preloading master.
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(default_config(app.instance_path))
+    if config:
+        app.config.from_mapping(config)
+    
+    # Initialize extensions
+    database.init_app(app)
+    replicas.init_app(app)
+    db.init_app(app)
+    serializers.init_app(app)
+    sqlite_profile.init_app(app)
+    maintenance.init_app(app)
+    change_feed.init_app(app)
+    rate_limits.init_app(app)
+    adaptive_limits.init_app(app)
+    profiling.init_app(app)
+    metrics.init_app(app)
+    query_detector.init_app(app)
+    assets.init_app(app)
+    compression.init_app(app)
+    
+    app.register_blueprint(bp)
+    rate_limits.limit_views(app)
+    tracing.init_app(app)  # wraps the registered views
+    return app
+
+def __getattr__(name):
+    """Build the default application on first access to ``app.app``.
+    
+    Keeps ``from app import app`` and ``gunicorn app:app`` working without
+    creating an application at import time.
+    """
+    if name == 'app':
+        application = globals()['app'] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def init_db():
+    """Create missing tables and columns, queue unverified records for moderation
+    and add records written outside the ORM to the change feed and name index"""
+    db.create_all()
+    added = upgrade_schema()
+    queued = moderation_queue.backfill()
+    change_feed.backfill()
+    name_search.backfill()
+    return added, queued
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database schema."""
+    added, queued = init_db()
+    click.echo(f'Database ready ({len(added)} columns added, {queued} records queued for moderation).')
+
+@bp.cli.command('rebuild-name-index')
+def rebuild_name_index_command():
+    """Recompute the fuzzy name index after officers were edited outside the app."""
+    click.echo(f'Indexed {name_search.rebuild()} officers.')
+
+@bp.app_context_processor
+def inject_record_helpers():
+    """Let templates look up polymorphic references through the request's resolver"""
+    def resolved_label(table_name, record_id):
+        return record_label(table_name, get_resolver().get(table_name, record_id))
+    return {'resolved_label': resolved_label}
 
 # Security headers
-@app.after_request
+@bp.after_app_request
 def set_security_headers(response):
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'SAMEORIGIN'
@@ -89,8 +224,7 @@ def log_audit(table_name, record_id, action, field_name=None, old_value=None, ne
         user_agent=user_agent,
         user_id=user_id
     )
-    db.session.add(audit_log)
-    db.session.commit()
+    sqlite_profile.commit_with_retry(audit_log)
 
 def get_client_ip():
     """Get client IP address"""
@@ -98,82 +232,14 @@ def get_client_ip():
         return request.environ['HTTP_X_FORWARDED_FOR'].split(',')[0].strip()
     return request.environ.get('REMOTE_ADDR', 'unknown')
 
-def search_social_media(name, department=None):
-    """Enhanced OSINT search for social media profiles"""
-    results = []
-    
-    # Search patterns
-    search_terms = [name]
-    if department:
-        search_terms.append(f"{name} {department}")
-    
-    # Twitter/X API integration (if configured)
-    if app.config.get('TWITTER_API_KEY'):
-        try:
-            # This is where you'd integrate with Twitter API
-            # For now, this is a placeholder for future implementation
-            twitter_results = search_twitter(name, department)
-            results.extend(twitter_results)
-        except Exception as e:
-            print(f"Twitter search error: {e}")
-    
-    # Facebook API integration (if configured)
-    if app.config.get('FACEBOOK_API_KEY'):
-        try:
-            # This is where you'd integrate with Facebook API
-            # For now, this is a placeholder for future implementation
-            facebook_results = search_facebook(name, department)
-            results.extend(facebook_results)
-        except Exception as e:
-            print(f"Facebook search error: {e}")
-    
-    # Google Search fallback (public information only)
-    try:
-        google_results = google_search_public_info(name, department)
-        results.extend(google_results)
-    except Exception as e:
-        print(f"Google search error: {e}")
-    
-    return results
-
-def search_twitter(name, department=None):
-    """Search Twitter/X for profiles (requires API key)"""
-    # Placeholder for Twitter API integration
-    # In production, use tweepy or similar library
-    return []
-
-def search_facebook(name, department=None):
-    """Search Facebook for profiles (requires API key)"""
-    # Placeholder for Facebook API integration
-    # In production, use facebook-sdk or similar library
-    return []
-
-def google_search_public_info(name, department=None):
-    """Search Google for public information"""
-    # This uses basic web scraping for publicly available information
-    # In production, use Google Custom Search API
-    results = []
-    
-    try:
-        search_query = f"{name}"
-        if department:
-            search_query += f" {department}"
-        search_query += " police officer"
-        
-        # This is a basic example - in production use proper APIs
-        # For now, return empty to avoid scraping issues
-        
-    except Exception as e:
-        print(f"Google search error: {e}")
-    
-    return results
-
-@app.route('/api/osint_scan/<int:officer_id>', methods=['POST'])
+@bp.route('/api/osint_scan/<int:officer_id>', methods=['POST'])
 def api_osint_scan(officer_id):
     """Automated OSINT scan for an officer"""
     if not session.get('is_admin'):
         return jsonify({'error': 'Access denied'}), 403
     
+    from osint import search_social_media
+    
     officer = Officer.query.get_or_404(officer_id)
     department_name = officer.current_department.name if officer.current_department else None
     
@@ -184,7 +250,7 @@ def api_osint_scan(officer_id):
     )
     
     # Save results to database
-    saved_count = 0
+    profiles = []
     for result in results:
         # Check if profile already exists
         existing = OSINTProfile.query.filter_by(
@@ -203,10 +269,10 @@ def api_osint_scan(officer_id):
                 confidence_score=result.get('confidence', 0.5),
                 notes=f"Automatically discovered via OSINT scan"
             )
-            db.session.add(profile)
-            saved_count += 1
+            profiles.append(profile)
     
-    db.session.commit()
+    sqlite_profile.commit_with_retry(*profiles)
+    saved_count = len(profiles)
     
     return jsonify({
         'success': True,
@@ -222,262 +288,38 @@ def calculate_total_costs(officer_id):
     total = sum(cost.amount for cost in costs)
     return total, costs
 
-def send_email_notification(subject, recipients, body_text, body_html=None):
-    """Send email notification"""
-    try:
-        if not app.config['MAIL_USERNAME'] or not app.config['MAIL_PASSWORD']:
-            # Email not configured, skip silently
-            return False
-            
-        msg = Message(
-            subject=subject,
-            recipients=recipients if isinstance(recipients, list) else [recipients],
-            body=body_text,
-            html=body_html or body_text
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
-
-def notify_admins_new_report(report_type, report_id):
-    """Notify admins of new community report"""
-    admin_users = User.query.filter(User.role.in_(['admin', 'moderator'])).all()
-    if not admin_users:
-        return
-    
-    recipients = [user.email for user in admin_users if user.email]
-    if not recipients:
-        return
-    
-    subject = f"New {report_type.title()} Report Submitted"
-    body = f"""
-A new {report_type} report has been submitted to the Bad Apples Database.
-
-Report ID: {report_id}
-Type: {report_type}
-
-Please review this report in the admin panel:
-{url_for('admin_panel', _external=True)}
-
----
-This is an automated notification from the Bad Apples Database.
-    """
-    
-    send_email_notification(subject, recipients, body)
-
-def notify_admins_new_dispute(dispute_id, table_name, record_id):
-    """Notify admins of new dispute"""
-    admin_users = User.query.filter(User.role.in_(['admin', 'moderator'])).all()
-    if not admin_users:
-        return
-    
-    recipients = [user.email for user in admin_users if user.email]
-    if not recipients:
-        return
-    
-    subject = f"New Dispute Submitted - {table_name} #{record_id}"
-    body = f"""
-A new dispute has been submitted to the Bad Apples Database.
-
-Dispute ID: {dispute_id}
-Record Type: {table_name}
-Record ID: {record_id}
-
-Please review this dispute in the admin panel:
-{url_for('admin_panel', _external=True)}
-
----
-This is an automated notification from the Bad Apples Database.
-    """
-    
-    send_email_notification(subject, recipients, body)
-
-def notify_dispute_resolution(dispute, resolution_status):
-    """Notify disputer of resolution"""
-    if not dispute.disputer_email:
-        return
-    
-    subject = f"Dispute Resolution - {dispute.table_name} #{dispute.record_id}"
-    body = f"""
-Your dispute has been reviewed and {resolution_status}.
-
-Dispute ID: {dispute.id}
-Record Type: {dispute.table_name}
-Record ID: {dispute.record_id}
-Status: {resolution_status.upper()}
-
-{f"Resolution: {dispute.resolution}" if dispute.resolution else ""}
-
-Thank you for helping us maintain the accuracy of the Bad Apples Database.
-
----
-This is an automated notification from the Bad Apples Database.
-    """
-    
-    send_email_notification(subject, [dispute.disputer_email], body)
-
-# Forms
-class OfficerForm(FlaskForm):
-    badge_number = StringField('Badge Number', validators=[DataRequired()])
-    first_name = StringField('First Name', validators=[DataRequired()])
-    last_name = StringField('Last Name', validators=[DataRequired()])
-    middle_name = StringField('Middle Name')
-    date_of_birth = DateField('Date of Birth')
-    department_id = SelectField('Department', coerce=int)
-    rank = StringField('Rank')
-    hire_date = DateField('Hire Date')
-    status = SelectField('Status', choices=[('active', 'Active'), ('suspended', 'Suspended'), ('terminated', 'Terminated'), ('retired', 'Retired')])
-    submit = SubmitField('Add Officer')
-
-class IncidentForm(FlaskForm):
-    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
-    incident_date = DateField('Incident Date', validators=[DataRequired()])
-    incident_type = StringField('Incident Type', validators=[DataRequired()])
-    description = TextAreaField('Description', validators=[DataRequired()])
-    location = StringField('Location')
-    outcome = StringField('Outcome')
-    charges_filed = BooleanField('Charges Filed')
-    conviction_date = DateField('Conviction Date')
-    sentence = TextAreaField('Sentence')
-    settlement_amount = StringField('Settlement Amount')
-    case_number = StringField('Case Number')
-    court_jurisdiction = StringField('Court Jurisdiction')
-    source = StringField('Source')
-    source_url = StringField('Source URL')
-    submit = SubmitField('Add Incident')
-
-class EvidenceForm(FlaskForm):
-    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
-    incident_id = SelectField('Incident (Optional)', coerce=int)
-    evidence_type = SelectField('Evidence Type', choices=[('photo', 'Photo'), ('video', 'Video'), ('document', 'Document'), ('audio', 'Audio')], validators=[DataRequired()])
-    file = FileField('File', validators=[DataRequired()])
-    description = TextAreaField('Description')
-    source = StringField('Source')
-    uploader_name = StringField('Your Name')
-    uploader_email = StringField('Your Email')
-    submit = SubmitField('Upload Evidence')
-
-class CommunityReportForm(FlaskForm):
-    incident_id = SelectField('Related Incident (Optional)', coerce=int)
-    reporter_name = StringField('Your Name')
-    reporter_email = StringField('Your Email')
-    reporter_phone = StringField('Your Phone')
-    report_type = SelectField('Report Type', choices=[('witness', 'Witness'), ('victim', 'Victim'), ('community', 'Community Member')])
-    description = TextAreaField('Description', validators=[DataRequired()])
-    incident_date = DateField('Incident Date')
-    location = StringField('Location')
-    contact_ok = BooleanField('OK to contact for follow-up')
-    submit = SubmitField('Submit Report')
-
-class DepartmentForm(FlaskForm):
-    name = StringField('Department Name', validators=[DataRequired()])
-    jurisdiction = StringField('Jurisdiction')
-    location = StringField('Location')
-    state = StringField('State')
-    website = StringField('Website')
-    phone = StringField('Phone')
-    submit = SubmitField('Add Department')
-
-class TaxpayerCostForm(FlaskForm):
-    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
-    cost_type = SelectField('Cost Type', choices=[
-        ('lawsuit', 'Lawsuit Settlement'),
-        ('fine', 'Fine/Penalty'),
-        ('conviction', 'Conviction Costs'),
-        ('disciplinary', 'Disciplinary Action'),
-        ('training', 'Retraining Costs'),
-        ('other', 'Other')
-    ], validators=[DataRequired()])
-    amount = FloatField('Amount ($)', validators=[DataRequired(), NumberRange(min=0)])
-    description = TextAreaField('Description', validators=[DataRequired()])
-    case_number = StringField('Case Number')
-    court_jurisdiction = StringField('Court/Jurisdiction')
-    date_occurred = DateField('Date Occurred')
-    date_paid = DateField('Date Paid')
-    source = StringField('Source')
-    source_url = StringField('Source URL')
-    submit = SubmitField('Add Cost')
-
-class OSINTProfileForm(FlaskForm):
-    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
-    platform = SelectField('Platform', choices=[
-        ('facebook', 'Facebook'),
-        ('twitter', 'Twitter'),
-        ('instagram', 'Instagram'),
-        ('linkedin', 'LinkedIn'),
-        ('tiktok', 'TikTok'),
-        ('youtube', 'YouTube'),
-        ('other', 'Other')
-    ], validators=[DataRequired()])
-    username = StringField('Username/Handle')
-    profile_url = StringField('Profile URL')
-    full_name = StringField('Full Name')
-    bio = TextAreaField('Bio/Description')
-    location = StringField('Location')
-    confidence_score = FloatField('Confidence Score (0-1)', validators=[NumberRange(min=0, max=1)])
-    notes = TextAreaField('Notes')
-    submit = SubmitField('Add OSINT Profile')
-
-class DisputeForm(FlaskForm):
-    table_name = StringField('Record Type', validators=[DataRequired()])
-    record_id = IntegerField('Record ID', validators=[DataRequired()])
-    dispute_type = SelectField('Dispute Type', choices=[
-        ('factual_error', 'Factual Error'),
-        ('privacy_violation', 'Privacy Violation'),
-        ('harassment', 'Harassment'),
-        ('inappropriate', 'Inappropriate Content'),
-        ('duplicate', 'Duplicate Information'),
-        ('other', 'Other')
-    ], validators=[DataRequired()])
-    description = TextAreaField('Dispute Description', validators=[DataRequired()])
-    disputer_name = StringField('Your Name')
-    disputer_email = StringField('Your Email')
-    disputer_phone = StringField('Your Phone')
-    evidence_provided = TextAreaField('Evidence Supporting Dispute')
-    submit = SubmitField('Submit Dispute')
-
-class AdminLoginForm(FlaskForm):
-    username = StringField('Username', validators=[DataRequired()])
-    password = StringField('Password', validators=[DataRequired()])
-    submit = SubmitField('Login')
-
-class AdminRegisterForm(FlaskForm):
-    username = StringField('Username', validators=[DataRequired()])
-    email = StringField('Email', validators=[DataRequired(), Email()])
-    password = StringField('Password', validators=[DataRequired()])
-    confirm_password = StringField('Confirm Password', validators=[DataRequired()])
-    role = SelectField('Role', choices=[('moderator', 'Moderator'), ('admin', 'Administrator')], validators=[DataRequired()])
-    submit = SubmitField('Register Admin User')
-
-class VehicleForm(FlaskForm):
-    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
-    vehicle_type = SelectField('Vehicle Type', choices=[
-        ('patrol', 'Patrol Vehicle'),
-        ('personal', 'Personal Vehicle'),
-        ('unmarked', 'Unmarked'),
-        ('undercover', 'Undercover'),
-        ('other', 'Other')
-    ], validators=[DataRequired()])
-    make = StringField('Make', validators=[DataRequired()])
-    model = StringField('Model', validators=[DataRequired()])
-    year = IntegerField('Year', validators=[Optional(), NumberRange(min=1900, max=2030)])
-    color = StringField('Color', validators=[DataRequired()])
-    license_plate = StringField('License Plate')
-    state = StringField('State (2 letters)', validators=[Optional()])
-    vin = StringField('VIN (17 characters)', validators=[Optional()])
-    is_unmarked = BooleanField('Is Unmarked Vehicle')
-    description = TextAreaField('Description/Notes')
-    last_seen_location = StringField('Last Seen Location')
-    last_seen_date = DateField('Last Seen Date', validators=[Optional()])
-    source = StringField('Source of Information')
-    submit = SubmitField('Add Vehicle')
+def count_incidents(officer_ids):
+    """Incident counts for several officers in one grouped query"""
+    officer_ids = list(officer_ids)
+    if not officer_ids:
+        return {}
+    return dict(db.session.query(Incident.officer_id, db.func.count(Incident.id))
+                .filter(Incident.officer_id.in_(officer_ids))
+                .group_by(Incident.officer_id).all())
+
+def csv_response(filename, header, rows):
+    """Stream ``rows`` as a CSV attachment, a block of CSV_BLOCK_BYTES at a time"""
+    def generate():
+        block = StringIO()
+        writer = csv.writer(block)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            if block.tell() >= CSV_BLOCK_BYTES:
+                yield block.getvalue()
+                block.seek(0)
+                block.truncate()
+        yield block.getvalue()
+    
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 # Routes
-@app.route('/')
+@bp.route('/')
+@query_budget(5)
 def index():
-    recent_incidents = Incident.query.order_by(Incident.created_at.desc()).limit(5).all()
+    recent_incidents = Incident.query.options(db.joinedload(Incident.officer)).order_by(Incident.created_at.desc()).limit(5).all()
     total_officers = Officer.query.count()
     total_incidents = Incident.query.count()
     total_evidence = Evidence.query.count()
@@ -488,29 +330,46 @@ def index():
                          total_incidents=total_incidents,
                          total_evidence=total_evidence)
 
-@app.route('/officers')
+@bp.route('/officers')
+@query_budget(6)
 def officers():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
     
-    query = Officer.query
+    query = Officer.query.options(db.joinedload(Officer.current_department))
     if search:
         query = query.filter(
-            (Officer.first_name.contains(search)) |
-            (Officer.last_name.contains(search)) |
-            (Officer.badge_number.contains(search))
+            (database.text_contains(Officer.first_name, search)) |
+            (database.text_contains(Officer.last_name, search)) |
+            (database.text_contains(Officer.badge_number, search))
         )
     
-    officers = query.paginate(page=page, per_page=20, error_out=False)
-    return render_template('officers.html', officers=officers, search=search)
-
-@app.route('/officer/<int:officer_id>')
+    officers = query.order_by(Officer.id).paginate(page=page, per_page=OFFICERS_PER_PAGE, error_out=False)
+    close_matches = False
+    if search and not officers.total:
+        # Nothing contains the search as typed: list the most similar names instead
+        ids = [officer.id for officer in name_search.matches(
+            search, limit=name_search.CANDIDATES, options=[db.load_only(*name_search.indexed_columns())])]
+        if ids:
+            close_matches = True
+            officers = (Officer.query.options(db.joinedload(Officer.current_department))
+                        .filter(Officer.id.in_(ids))
+                        .order_by(db.case({officer_id: rank for rank, officer_id in enumerate(ids)}, value=Officer.id))
+                        .paginate(page=page, per_page=OFFICERS_PER_PAGE, error_out=False))
+    incident_counts = count_incidents(officer.id for officer in officers.items)
+    return render_template('officers.html', officers=officers, search=search, incident_counts=incident_counts,
+                           close_matches=close_matches)
+
+@bp.route('/officer/<int:officer_id>')
+@query_budget(10)
 def officer_detail(officer_id):
     officer = Officer.query.get_or_404(officer_id)
     incidents = officer.incidents.order_by(Incident.incident_date.desc()).all()
     evidence = officer.evidence.order_by(Evidence.created_at.desc()).all()
     social_media = officer.social_media.all()
-    department_history = officer.department_history.order_by(OfficerDepartmentHistory.start_date.desc()).all()
+    department_history = officer.department_history.options(
+        db.joinedload(OfficerDepartmentHistory.department)
+    ).order_by(OfficerDepartmentHistory.start_date.desc()).all()
     vehicles = [v for v in officer.vehicles if v.is_active]
     total_cost, costs = calculate_total_costs(officer_id)
     
@@ -524,8 +383,10 @@ def officer_detail(officer_id):
                          total_cost=total_cost,
                          costs=costs)
 
-@app.route('/add_officer', methods=['GET', 'POST'])
+@bp.route('/add_officer', methods=['GET', 'POST'])
 def add_officer():
+    from forms import OfficerForm
+    
     form = OfficerForm()
     form.department_id.choices = [(d.id, d.name) for d in Department.query.all()]
     
@@ -541,15 +402,16 @@ def add_officer():
             hire_date=form.hire_date.data,
             status=form.status.data
         )
-        db.session.add(officer)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(officer)
         flash('Officer added successfully!', 'success')
-        return redirect(url_for('officer_detail', officer_id=officer.id))
+        return redirect(url_for('main.officer_detail', officer_id=officer.id))
     
     return render_template('add_officer.html', form=form)
 
-@app.route('/add_incident', methods=['GET', 'POST'])
+@bp.route('/add_incident', methods=['GET', 'POST'])
 def add_incident():
+    from forms import IncidentForm
+    
     form = IncidentForm()
     form.officer_id.choices = [(o.id, f"{o.first_name} {o.last_name} ({o.badge_number})") for o in Officer.query.all()]
     
@@ -570,15 +432,17 @@ def add_incident():
             source=form.source.data,
             source_url=form.source_url.data
         )
-        db.session.add(incident)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(incident)
+        moderation_queue.enqueue('incidents', incident.id)
         flash('Incident added successfully!', 'success')
-        return redirect(url_for('officer_detail', officer_id=incident.officer_id))
+        return redirect(url_for('main.officer_detail', officer_id=incident.officer_id))
     
     return render_template('add_incident.html', form=form)
 
-@app.route('/add_evidence', methods=['GET', 'POST'])
+@bp.route('/add_evidence', methods=['GET', 'POST'])
 def add_evidence():
+    from forms import EvidenceForm
+    
     form = EvidenceForm()
     form.officer_id.choices = [(o.id, f"{o.first_name} {o.last_name} ({o.badge_number})") for o in Officer.query.all()]
     form.incident_id.choices = [(0, 'Not related to specific incident')] + [(i.id, f"{i.incident_type} - {i.incident_date}") for i in Incident.query.all()]
@@ -587,8 +451,10 @@ def add_evidence():
         file = form.file.data
         if file:
             filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
             file.save(file_path)
+            metrics.record_upload(os.path.getsize(file_path))
             
             evidence = Evidence(
                 officer_id=form.officer_id.data,
@@ -602,16 +468,18 @@ def add_evidence():
                 uploader_name=form.uploader_name.data,
                 uploader_email=form.uploader_email.data
             )
-            db.session.add(evidence)
-            db.session.commit()
+            sqlite_profile.commit_with_retry(evidence)
+            moderation_queue.enqueue('evidence', evidence.id)
             flash('Evidence uploaded successfully!', 'success')
-            return redirect(url_for('officer_detail', officer_id=evidence.officer_id))
+            return redirect(url_for('main.officer_detail', officer_id=evidence.officer_id))
     
     return render_template('add_evidence.html', form=form)
 
-@app.route('/community_report', methods=['GET', 'POST'])
-@limiter.limit("10 per hour")
+@bp.route('/community_report', methods=['GET', 'POST'])
+@rate_limits.limit("10 per hour")
 def community_report():
+    from forms import CommunityReportForm
+    
     form = CommunityReportForm()
     form.incident_id.choices = [(0, 'Not related to specific incident')] + [(i.id, f"{i.incident_type} - {i.incident_date}") for i in Incident.query.all()]
     
@@ -627,19 +495,21 @@ def community_report():
             location=form.location.data,
             contact_ok=form.contact_ok.data
         )
-        db.session.add(report)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(report)
+        moderation_queue.enqueue('community_reports', report.id)
         
         # Send email notification to admins
         notify_admins_new_report('community_report', report.id)
         
         flash('Community report submitted successfully! Administrators have been notified.', 'success')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     return render_template('community_report.html', form=form)
 
-@app.route('/add_department', methods=['GET', 'POST'])
+@bp.route('/add_department', methods=['GET', 'POST'])
 def add_department():
+    from forms import DepartmentForm
+    
     form = DepartmentForm()
     
     if form.validate_on_submit():
@@ -651,48 +521,56 @@ def add_department():
             website=form.website.data,
             phone=form.phone.data
         )
-        db.session.add(department)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(department)
         flash('Department added successfully!', 'success')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     return render_template('add_department.html', form=form)
 
-@app.route('/search')
-@limiter.limit("30 per minute")
+@bp.route('/search')
+@rate_limits.limit("30 per minute")
+@compute_limit
+@query_budget(4)
 def search():
     query = request.args.get('q', '')
     if not query:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     # Search officers
-    officers = Officer.query.filter(
-        (Officer.first_name.contains(query)) |
-        (Officer.last_name.contains(query)) |
-        (Officer.badge_number.contains(query))
+    officers = Officer.query.options(db.joinedload(Officer.current_department)).filter(
+        (database.text_contains(Officer.first_name, query)) |
+        (database.text_contains(Officer.last_name, query)) |
+        (database.text_contains(Officer.badge_number, query))
     ).all()
+    # Then similar names, for misspellings
+    close_matches = name_search.matches(query, exclude={officer.id for officer in officers},
+                                        options=[db.joinedload(Officer.current_department)])
     
     # Search incidents
-    incidents = Incident.query.filter(
-        (Incident.incident_type.contains(query)) |
-        (Incident.description.contains(query)) |
-        (Incident.location.contains(query))
+    incidents = Incident.query.options(db.joinedload(Incident.officer)).filter(
+        (database.text_contains(Incident.incident_type, query)) |
+        (database.text_contains(Incident.description, query)) |
+        (database.text_contains(Incident.location, query))
     ).all()
     
     return render_template('search_results.html', 
                          query=query, 
                          officers=officers, 
+                         close_matches=close_matches,
                          incidents=incidents)
 
-@app.route('/download_evidence/<int:evidence_id>')
+@bp.route('/download_evidence/<int:evidence_id>')
 def download_evidence(evidence_id):
     evidence = Evidence.query.get_or_404(evidence_id)
     if os.path.exists(evidence.file_path):
-        return send_file(evidence.file_path, as_attachment=True, download_name=evidence.file_name)
+        with tracing.span('send_file', file=evidence.file_name):
+            return send_file(evidence.file_path, as_attachment=True, download_name=evidence.file_name)
     else:
         abort(404)
 
-@app.route('/export_officer/<int:officer_id>')
+@bp.route('/export_officer/<int:officer_id>')
+@compute_limit
+@query_budget(6)
 def export_officer(officer_id):
     officer = Officer.query.get_or_404(officer_id)
     incidents = officer.incidents.all()
@@ -700,130 +578,89 @@ def export_officer(officer_id):
     total_cost, costs = calculate_total_costs(officer_id)
     
     export_data = {
-        'officer': {
-            'name': f"{officer.first_name} {officer.last_name}",
-            'badge_number': officer.badge_number,
-            'department': officer.current_department.name if officer.current_department else None,
-            'status': officer.status
-        },
-        'incidents': [
-            {
-                'date': incident.incident_date.isoformat(),
-                'type': incident.incident_type,
-                'description': incident.description,
-                'outcome': incident.outcome,
-                'charges_filed': incident.charges_filed,
-                'conviction_date': incident.conviction_date.isoformat() if incident.conviction_date else None,
-                'sentence': incident.sentence,
-                'settlement_amount': incident.settlement_amount
-            } for incident in incidents
-        ],
+        'officer': serializers.OFFICER_EXPORT.dump(officer),
+        'incidents': serializers.INCIDENT_EXPORT.dump_many(incidents),
         'evidence_count': len(evidence),
         'total_taxpayer_cost': total_cost,
-        'costs': [
-            {
-                'type': cost.cost_type,
-                'amount': cost.amount,
-                'description': cost.description,
-                'date': cost.date_occurred.isoformat() if cost.date_occurred else None
-            } for cost in costs
-        ]
+        'costs': serializers.TAXPAYER_COST_EXPORT.dump_many(costs)
     }
     
     return jsonify(export_data)
 
-@app.route('/export_officers_csv')
+@bp.route('/export_officers_csv')
+@compute_limit
 def export_officers_csv():
     """Export all officers to CSV format"""
-    officers = Officer.query.all()
-    
-    # Create CSV in memory
-    si = StringIO()
-    writer = csv.writer(si)
-    
-    # Write header
-    writer.writerow(['Badge Number', 'First Name', 'Last Name', 'Department', 'Rank', 'Status', 'Hire Date', 'Incident Count'])
-    
-    # Write data
-    for officer in officers:
-        writer.writerow([
+    incident_counts = (db.select(Incident.officer_id, db.func.count(Incident.id).label('incidents'))
+                       .group_by(Incident.officer_id).subquery())
+    rows = db.session.execute(
+        db.select(Officer, Department.name, db.func.coalesce(incident_counts.c.incidents, 0))
+        .outerjoin(Department, Officer.current_department_id == Department.id)
+        .outerjoin(incident_counts, incident_counts.c.officer_id == Officer.id)
+        .order_by(Officer.id)
+        .execution_options(yield_per=CSV_BATCH_ROWS))
+    
+    return csv_response(
+        f'officers_export_{datetime.now().strftime("%Y%m%d")}.csv',
+        ['Badge Number', 'First Name', 'Last Name', 'Department', 'Rank', 'Status', 'Hire Date', 'Incident Count'],
+        ([
             officer.badge_number,
             officer.first_name,
             officer.last_name,
-            officer.current_department.name if officer.current_department else '',
-            officer.rank or '',
+            department or '',
+            officer.current_rank or '',
             officer.status,
             officer.hire_date.strftime('%Y-%m-%d') if officer.hire_date else '',
-            officer.incidents.count()
-        ])
-    
-    # Create response
-    output = si.getvalue()
-    si.close()
-    
-    return send_file(
-        StringIO(output),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'officers_export_{datetime.now().strftime("%Y%m%d")}.csv'
+            incident_count
+        ] for officer, department, incident_count in rows)
     )
 
-@app.route('/export_incidents_csv')
+@bp.route('/export_incidents_csv')
+@compute_limit
 def export_incidents_csv():
     """Export all incidents to CSV format"""
-    incidents = Incident.query.all()
-    
-    # Create CSV in memory
-    si = StringIO()
-    writer = csv.writer(si)
-    
-    # Write header
-    writer.writerow(['Date', 'Type', 'Officer Name', 'Badge Number', 'Department', 'Location', 'Description', 'Outcome', 'Charges Filed', 'Settlement Amount', 'Source'])
-    
-    # Write data
-    for incident in incidents:
-        writer.writerow([
+    rows = db.session.execute(
+        db.select(Incident, Officer, Department.name)
+        .join(Officer, Incident.officer_id == Officer.id)
+        .outerjoin(Department, Officer.current_department_id == Department.id)
+        .order_by(Incident.id)
+        .execution_options(yield_per=CSV_BATCH_ROWS))
+    
+    return csv_response(
+        f'incidents_export_{datetime.now().strftime("%Y%m%d")}.csv',
+        ['Date', 'Type', 'Officer Name', 'Badge Number', 'Department', 'Location', 'Description', 'Outcome', 'Charges Filed', 'Settlement Amount', 'Source'],
+        ([
             incident.incident_date.strftime('%Y-%m-%d'),
             incident.incident_type,
-            f"{incident.officer.first_name} {incident.officer.last_name}",
-            incident.officer.badge_number,
-            incident.officer.current_department.name if incident.officer.current_department else '',
+            f"{officer.first_name} {officer.last_name}",
+            officer.badge_number,
+            department or '',
             incident.location or '',
             incident.description,
             incident.outcome or '',
             'Yes' if incident.charges_filed else 'No',
             incident.settlement_amount or '',
             incident.source or ''
-        ])
-    
-    # Create response
-    output = si.getvalue()
-    si.close()
-    
-    return send_file(
-        StringIO(output),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'incidents_export_{datetime.now().strftime("%Y%m%d")}.csv'
+        ] for incident, officer, department in rows)
     )
 
-@app.route('/export_vehicles_csv')
+@bp.route('/export_vehicles_csv')
+@compute_limit
 def export_vehicles_csv():
     """Export all vehicles to CSV format"""
-    vehicles = Vehicle.query.filter_by(is_active=True).all()
-    
-    # Create CSV in memory
-    si = StringIO()
-    writer = csv.writer(si)
-    
-    # Write header
-    writer.writerow(['Officer Name', 'Badge Number', 'Vehicle Type', 'Make', 'Model', 'Year', 'Color', 'License Plate', 'State', 'VIN', 'Is Unmarked', 'Last Seen Location', 'Last Seen Date'])
-    
-    # Write data
-    for vehicle in vehicles:
-        writer.writerow([
-            f"{vehicle.officer.first_name} {vehicle.officer.last_name}",
-            vehicle.officer.badge_number,
+    rows = db.session.execute(
+        db.select(Vehicle, Officer)
+        .join(Officer, Vehicle.officer_id == Officer.id)
+        .where(Vehicle.is_active.is_(True))
+        .order_by(Vehicle.id)
+        .execution_options(yield_per=CSV_BATCH_ROWS))
+    
+    return csv_response(
+        f'vehicles_export_{datetime.now().strftime("%Y%m%d")}.csv',
+        ['Officer Name', 'Badge Number', 'Vehicle Type', 'Make', 'Model', 'Year', 'Color', 'License Plate', 'State', 'VIN', 'Is Unmarked', 'Last Seen Location', 'Last Seen Date'],
+        ([
+            f"{officer.first_name} {officer.last_name}",
+            officer.badge_number,
             vehicle.vehicle_type,
             vehicle.make,
             vehicle.model,
@@ -835,23 +672,15 @@ def export_vehicles_csv():
             'Yes' if vehicle.is_unmarked else 'No',
             vehicle.last_seen_location or '',
             vehicle.last_seen_date.strftime('%Y-%m-%d') if vehicle.last_seen_date else ''
-        ])
-    
-    # Create response
-    output = si.getvalue()
-    si.close()
-    
-    return send_file(
-        StringIO(output),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'vehicles_export_{datetime.now().strftime("%Y%m%d")}.csv'
+        ] for vehicle, officer in rows)
     )
 
 # New routes for advanced features
 
-@app.route('/add_taxpayer_cost', methods=['GET', 'POST'])
+@bp.route('/add_taxpayer_cost', methods=['GET', 'POST'])
 def add_taxpayer_cost():
+    from forms import TaxpayerCostForm
+    
     form = TaxpayerCostForm()
     form.officer_id.choices = [(o.id, f"{o.first_name} {o.last_name} ({o.badge_number})") for o in Officer.query.all()]
     
@@ -868,19 +697,20 @@ def add_taxpayer_cost():
             source=form.source.data,
             source_url=form.source_url.data
         )
-        db.session.add(cost)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(cost)
         
         # Log the audit trail
         log_audit('taxpayer_costs', cost.id, 'create', user_id=session.get('user_id'))
         
         flash('Taxpayer cost added successfully!', 'success')
-        return redirect(url_for('officer_detail', officer_id=cost.officer_id))
+        return redirect(url_for('main.officer_detail', officer_id=cost.officer_id))
     
     return render_template('add_taxpayer_cost.html', form=form)
 
-@app.route('/add_osint_profile', methods=['GET', 'POST'])
+@bp.route('/add_osint_profile', methods=['GET', 'POST'])
 def add_osint_profile():
+    from forms import OSINTProfileForm
+    
     form = OSINTProfileForm()
     form.officer_id.choices = [(o.id, f"{o.first_name} {o.last_name} ({o.badge_number})") for o in Officer.query.all()]
     
@@ -896,19 +726,20 @@ def add_osint_profile():
             confidence_score=form.confidence_score.data,
             notes=form.notes.data
         )
-        db.session.add(profile)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(profile)
         
         # Log the audit trail
         log_audit('osint_profiles', profile.id, 'create', user_id=session.get('user_id'))
         
         flash('OSINT profile added successfully!', 'success')
-        return redirect(url_for('officer_detail', officer_id=profile.officer_id))
+        return redirect(url_for('main.officer_detail', officer_id=profile.officer_id))
     
     return render_template('add_osint_profile.html', form=form)
 
-@app.route('/dispute/<string:table_name>/<int:record_id>', methods=['GET', 'POST'])
+@bp.route('/dispute/<string:table_name>/<int:record_id>', methods=['GET', 'POST'])
 def dispute_record(table_name, record_id):
+    from forms import DisputeForm
+    
     form = DisputeForm()
     form.table_name.data = table_name
     form.record_id.data = record_id
@@ -925,8 +756,7 @@ def dispute_record(table_name, record_id):
             evidence_provided=form.evidence_provided.data,
             ip_address=get_client_ip()
         )
-        db.session.add(dispute)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(dispute)
         
         # Log the audit trail
         log_audit(table_name, record_id, 'dispute', new_value=f"Disputed: {form.dispute_type.data}")
@@ -935,35 +765,41 @@ def dispute_record(table_name, record_id):
         notify_admins_new_dispute(dispute.id, table_name, record_id)
         
         flash('Dispute submitted successfully! It will be reviewed by moderators and you will be notified of the resolution.', 'success')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     return render_template('dispute_record.html', form=form, table_name=table_name, record_id=record_id)
 
-@app.route('/admin')
+@bp.route('/admin')
+@query_budget(14)
 def admin_panel():
     if not session.get('is_admin'):
         flash('Access denied. Admin privileges required.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     # Get pending items for moderation
     pending_incidents = Incident.query.filter_by(verified=False).count()
     pending_evidence = Evidence.query.filter_by(verified=False).count()
     pending_reports = CommunityReport.query.filter_by(verified=False).count()
     pending_disputes = Dispute.query.filter_by(status='pending').count()
+    queue_depth = moderation_queue.queue_depth()
     
-    # Get recent activity
-    recent_audit_logs = AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(10).all()
+    # Get recent activity, resolving the records it refers to in one query per table
+    recent_audit_logs = AuditLog.query.options(db.joinedload(AuditLog.user)).order_by(AuditLog.timestamp.desc()).limit(10).all()
+    get_resolver().load(recent_audit_logs)
     
     return render_template('admin_panel.html',
                          pending_incidents=pending_incidents,
                          pending_evidence=pending_evidence,
                          pending_reports=pending_reports,
                          pending_disputes=pending_disputes,
+                         queue_depth=queue_depth,
                          recent_audit_logs=recent_audit_logs)
 
-@app.route('/admin/login', methods=['GET', 'POST'])
-@limiter.limit("5 per minute")
+@bp.route('/admin/login', methods=['GET', 'POST'])
+@rate_limits.limit("5 per minute")
 def admin_login():
+    from forms import AdminLoginForm
+    
     form = AdminLoginForm()
     
     if form.validate_on_submit():
@@ -973,30 +809,32 @@ def admin_login():
             session['username'] = user.username
             session['is_admin'] = True
             flash('Login successful!', 'success')
-            return redirect(url_for('admin_panel'))
+            return redirect(url_for('main.admin_panel'))
         else:
             flash('Invalid credentials or insufficient privileges.', 'error')
     
     return render_template('admin_login.html', form=form)
 
-@app.route('/admin/logout')
+@bp.route('/admin/logout')
 def admin_logout():
     session.clear()
     flash('Logged out successfully.', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/admin/register', methods=['GET', 'POST'])
+@bp.route('/admin/register', methods=['GET', 'POST'])
 def admin_register():
     # Only allow admins to register new admin/moderator users
     if not session.get('is_admin'):
         flash('Access denied. Admin privileges required.', 'error')
-        return redirect(url_for('admin_login'))
+        return redirect(url_for('main.admin_login'))
     
     # Check if current user is admin (not just moderator)
     current_user = User.query.get(session.get('user_id'))
     if not current_user or current_user.role != 'admin':
         flash('Access denied. Only administrators can register new users.', 'error')
-        return redirect(url_for('admin_panel'))
+        return redirect(url_for('main.admin_panel'))
+    
+    from forms import AdminRegisterForm
     
     form = AdminRegisterForm()
     
@@ -1027,251 +865,468 @@ def admin_register():
         )
         new_user.set_password(form.password.data)
         
-        db.session.add(new_user)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(new_user)
         
         # Log the action
         log_audit('users', new_user.id, 'create', user_id=session.get('user_id'))
         
         flash(f'{form.role.data.title()} user {form.username.data} created successfully!', 'success')
-        return redirect(url_for('admin_panel'))
+        return redirect(url_for('main.admin_panel'))
     
     return render_template('admin_register.html', form=form)
 
-@app.route('/admin/moderate/<string:table_name>/<int:record_id>')
+@bp.route('/admin/moderate/<string:table_name>/<int:record_id>')
 def moderate_record(table_name, record_id):
     if not session.get('is_admin'):
         flash('Access denied.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     # Get the record based on table name
-    if table_name == 'incidents':
-        record = Incident.query.get_or_404(record_id)
-    elif table_name == 'evidence':
-        record = Evidence.query.get_or_404(record_id)
-    elif table_name == 'community_reports':
-        record = CommunityReport.query.get_or_404(record_id)
-    else:
+    if table_name not in moderation_queue.QUEUE_TABLES:
         flash('Invalid record type.', 'error')
-        return redirect(url_for('admin_panel'))
+        return redirect(url_for('main.admin_panel'))
+    record = get_resolver().get(table_name, record_id)
+    if record is None:
+        abort(404)
     
-    return render_template('moderate_record.html', record=record, table_name=table_name)
+    # Claim the record so other moderators don't review it at the same time
+    claim = None
+    if not record.verified:
+        claim = moderation_queue.claim_record(table_name, record_id, session.get('user_id'))
+        if claim is None:
+            flash('Another moderator is currently reviewing this record.', 'warning')
+    
+    return render_template('moderate_record.html', record=record, table_name=table_name, claim=claim)
 
-@app.route('/admin/approve/<string:table_name>/<int:record_id>')
+@bp.route('/admin/approve/<string:table_name>/<int:record_id>')
 def approve_record(table_name, record_id):
     if not session.get('is_admin'):
         flash('Access denied.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+    if table_name not in moderation_queue.QUEUE_TABLES:
+        abort(400)
+    
+    if moderation_queue.held_by_others(table_name, [record_id], session.get('user_id')):
+        flash('Another moderator is currently reviewing this record.', 'error')
+        return redirect(url_for('main.moderation_queue_view'))
     
     # Update the record
-    if table_name == 'incidents':
-        record = Incident.query.get_or_404(record_id)
-        record.verified = True
-    elif table_name == 'evidence':
-        record = Evidence.query.get_or_404(record_id)
-        record.verified = True
-    elif table_name == 'community_reports':
-        record = CommunityReport.query.get_or_404(record_id)
+    def approve():
+        record = get_resolver().get(table_name, record_id)
+        if record is None:
+            abort(404)
         record.verified = True
     
-    db.session.commit()
+    sqlite_profile.run_with_retry(approve)
+    moderation_queue.resolve(table_name, [record_id], 'approved', session.get('user_id'))
     
     # Log the audit trail
     log_audit(table_name, record_id, 'approve', user_id=session.get('user_id'))
     
     flash('Record approved successfully!', 'success')
-    return redirect(url_for('admin_panel'))
+    return redirect(url_for('main.admin_panel'))
 
-@app.route('/admin/reject/<string:table_name>/<int:record_id>')
+@bp.route('/admin/reject/<string:table_name>/<int:record_id>')
 def reject_record(table_name, record_id):
     if not session.get('is_admin'):
         flash('Access denied.', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+    if table_name not in moderation_queue.QUEUE_TABLES:
+        abort(400)
     
-    # Create moderation record
-    moderation = ContentModeration(
-        table_name=table_name,
-        record_id=record_id,
-        status='rejected',
-        moderator_id=session.get('user_id'),
-        reason_code=request.args.get('reason', 'inappropriate')
-    )
-    db.session.add(moderation)
-    db.session.commit()
+    if moderation_queue.held_by_others(table_name, [record_id], session.get('user_id')):
+        flash('Another moderator is currently reviewing this record.', 'error')
+        return redirect(url_for('main.moderation_queue_view'))
+    
+    # Record the decision on the queue entry
+    moderation_queue.resolve(table_name, [record_id], 'rejected', session.get('user_id'),
+                             reason_code=request.args.get('reason', 'inappropriate'))
     
     # Log the audit trail
     log_audit(table_name, record_id, 'reject', user_id=session.get('user_id'))
     
     flash('Record rejected successfully!', 'success')
-    return redirect(url_for('admin_panel'))
+    return redirect(url_for('main.admin_panel'))
+
+@bp.route('/admin/queue')
+@query_budget(8)
+def moderation_queue_view():
+    """Moderation queue: the current moderator's claims and the pending list"""
+    if not session.get('is_admin'):
+        flash('Access denied.', 'error')
+        return redirect(url_for('main.index'))
+    
+    after = request.args.get('after')
+    pending, next_cursor = moderation_queue.pending_page(after=after, limit=50)
+    claims = moderation_queue.claims_for(session.get('user_id'))
+    get_resolver().load(claims + pending)
+    
+    return render_template('moderation_queue.html',
+                         claims=claims,
+                         pending=pending,
+                         next_cursor=next_cursor,
+                         queue_depth=moderation_queue.queue_depth(),
+                         now=datetime.utcnow())
+
+@bp.route('/admin/queue/claim', methods=['POST'])
+def claim_moderation_batch():
+    """Claim the next batch of pending records for the current moderator"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    # From the admin form, or {"limit": n} from API clients; claim_batch clamps it
+    data = request.get_json(silent=True) if request.is_json else request.form
+    try:
+        limit = int(data.get('limit', moderation_queue.DEFAULT_BATCH_SIZE))
+    except (AttributeError, TypeError, ValueError):
+        limit = moderation_queue.DEFAULT_BATCH_SIZE
+    claimed = moderation_queue.claim_batch(session.get('user_id'), limit=limit)
+    
+    if request.is_json:
+        return jsonify({
+            'success': True,
+            'claimed': [{'id': c.id, 'table_name': c.table_name, 'record_id': c.record_id,
+                         'lease_expires_at': c.lease_expires_at.isoformat()} for c in claimed]
+        })
+    
+    flash(f'Claimed {len(claimed)} records for review.', 'success')
+    return redirect(url_for('main.moderation_queue_view'))
+
+@bp.route('/admin/queue/renew', methods=['POST'])
+def renew_moderation_claims():
+    """Extend the leases on the current moderator's claims"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    renewed = moderation_queue.renew(session.get('user_id'))
+    return jsonify({'success': True, 'renewed': renewed})
+
+@bp.route('/admin/queue/release', methods=['POST'])
+def release_moderation_claims():
+    """Return the current moderator's claims to the queue"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    released = moderation_queue.release(session.get('user_id'))
+    flash(f'Released {released} records back to the queue.', 'success')
+    return redirect(url_for('main.moderation_queue_view'))
+
+@bp.route('/admin/perf')
+def admin_perf():
+    """Per-route timings, slow requests and saved profiles for this worker"""
+    if not session.get('is_admin'):
+        flash('Access denied.', 'error')
+        return redirect(url_for('main.index'))
+    
+    return render_template('admin_perf.html',
+                         routes=profiling.route_stats.snapshot(),
+                         slow_requests=list(profiling.route_stats.slow_requests),
+                         slow_threshold=current_app.config['PERF_SLOW_REQUEST_MS'],
+                         profiles=profiling.list_profiles(),
+                         profile_param=profiling.PROFILE_PARAM,
+                         pid=os.getpid())
+
+@bp.route('/admin/perf/profile/<string:name>')
+def admin_perf_profile(name):
+    """Text report of one saved cProfile run"""
+    if not session.get('is_admin'):
+        abort(403)
+    
+    report = profiling.profile_report(name)
+    if report is None:
+        abort(404)
+    return current_app.response_class(report, mimetype='text/plain')
+
+@bp.route('/admin/perf/reset', methods=['POST'])
+def admin_perf_reset():
+    if not session.get('is_admin'):
+        abort(403)
+    
+    profiling.route_stats.reset()
+    flash('Performance statistics reset for this worker.', 'success')
+    return redirect(url_for('main.admin_perf'))
+
+@bp.route('/admin/maintenance')
+def admin_maintenance():
+    """Scheduled maintenance runs and per-table size and fragmentation"""
+    if not session.get('is_admin'):
+        flash('Access denied.', 'error')
+        return redirect(url_for('main.index'))
+    
+    tasks, stats = maintenance.status(current_app.config)
+    return render_template('admin_maintenance.html',
+                         tasks=tasks,
+                         stats=stats,
+                         window=current_app.config['MAINTENANCE_WINDOW'])
 
-@app.route('/osint_search')
+@bp.route('/admin/maintenance/stats', methods=['POST'])
+def admin_maintenance_stats():
+    """Recompute the table statistics (reads every page of the database)"""
+    if not session.get('is_admin'):
+        abort(403)
+    
+    try:
+        maintenance.refresh_stats(db.engine, current_app.config)
+        flash('Table statistics refreshed.', 'success')
+    except maintenance.MaintenanceError as e:
+        flash(str(e), 'error')
+    return redirect(url_for('main.admin_maintenance'))
+
+@bp.route('/metrics')
+@rate_limits.exempt
+def prometheus_metrics():
+    """Prometheus scrape endpoint, authenticated with METRICS_TOKEN as a bearer token.
+
+    Without a token it does not exist: traffic, slow query and lock statistics
+    are not public. Behind a reverse proxy every request comes from loopback,
+    so there is no address-based exception either.
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        abort(404)
+    # Bytes: compare_digest rejects str with non-ASCII characters, which any client can send
+    if not secrets.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        abort(401)
+    
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/osint_search')
 def osint_search():
     query = request.args.get('q', '')
     if not query:
         return jsonify([])
     
     # Basic OSINT search (in production, integrate with real OSINT tools)
+    from osint import search_social_media
     results = search_social_media(query)
     return jsonify(results)
 
 # API Endpoints
-@app.route('/api/live_search')
-@limiter.limit("60 per minute")
+@bp.route('/api/live_search')
+@rate_limits.limit(live_search.RATE_LIMIT)
+@compute_limit
+@query_budget(4)
 def api_live_search():
-    """Real-time search API for AJAX requests"""
+    """Real-time search API for AJAX requests (also served by asgi.py)"""
     query = request.args.get('q', '').strip()
-    
-    if len(query) < 3:
-        return jsonify({'officers': [], 'incidents': [], 'vehicles': []})
-    
-    # Search officers
-    officers = Officer.query.filter(
-        (Officer.first_name.contains(query)) |
-        (Officer.last_name.contains(query)) |
-        (Officer.badge_number.contains(query))
-    ).limit(5).all()
-    
-    # Search incidents
-    incidents = Incident.query.filter(
-        (Incident.incident_type.contains(query)) |
-        (Incident.description.contains(query))
-    ).limit(5).all()
-    
-    # Search vehicles
-    vehicles = Vehicle.query.filter(
-        (Vehicle.make.contains(query)) |
-        (Vehicle.model.contains(query)) |
-        (Vehicle.license_plate.contains(query)) |
-        (Vehicle.color.contains(query))
-    ).filter_by(is_active=True).limit(5).all()
-    
-    return jsonify({
-        'officers': [{
-            'id': o.id,
-            'first_name': o.first_name,
-            'last_name': o.last_name,
-            'badge_number': o.badge_number
-        } for o in officers],
-        'incidents': [{
-            'id': i.id,
-            'incident_type': i.incident_type,
-            'officer_id': i.officer_id,
-            'officer_name': f"{i.officer.first_name} {i.officer.last_name}"
-        } for i in incidents],
-        'vehicles': [{
-            'id': v.id,
-            'make': v.make,
-            'model': v.model,
-            'license_plate': v.license_plate,
-            'officer_id': v.officer_id
-        } for v in vehicles]
-    })
+    return jsonify(live_search.search(db.session, query))
 
-@app.route('/api/officers', methods=['GET'])
+@bp.route('/api/officers', methods=['GET'])
+@compute_limit
+@query_budget(4)
 def api_get_officers():
     """REST API: Get all officers"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    view = serializers.sparse(serializers.OFFICER_LISTING, request.args)
     
-    officers = Officer.query.paginate(page=page, per_page=per_page, error_out=False)
+    officers = Officer.query.options(*view.load_options()).paginate(
+        page=page, per_page=per_page, error_out=False)
+    context = None
+    if 'incident_count' in view.fields:
+        context = {'incident_counts': count_incidents(o.id for o in officers.items)}
     
     return jsonify({
-        'data': [{
-            'id': o.id,
-            'badge_number': o.badge_number,
-            'first_name': o.first_name,
-            'last_name': o.last_name,
-            'department': o.current_department.name if o.current_department else None,
-            'status': o.status,
-            'incident_count': o.incidents.count()
-        } for o in officers.items],
+        'data': view.dump_many(officers.items, context),
         'page': officers.page,
         'per_page': officers.per_page,
         'total': officers.total,
         'pages': officers.pages
     })
 
-@app.route('/api/officer/<int:officer_id>', methods=['GET'])
+# Resources the officer endpoints can embed: name -> (view, model, filter_by criteria)
+OFFICER_EMBEDS = {
+    'incidents': (serializers.INCIDENT_BRIEF, Incident, {}),
+    'costs': (serializers.TAXPAYER_COST_BRIEF, TaxpayerCost, {}),
+    'vehicles': (serializers.VEHICLE_BRIEF, Vehicle, {'is_active': True}),
+}
+
+class InvalidBatch(ValueError):
+    """A batch request without ids, with an id that is not a number, or with too many ids"""
+
+def batch_keys(name, values, ids=True, limit=None):
+    """The distinct ``values`` of a batch request, in request order.
+    
+    Ids must be whole numbers, sent as ints or as digit strings ("5"). Badge
+    numbers and other string keys are passed with ``ids=False``.
+    """
+    keys = []
+    for value in values:
+        if isinstance(value, str):
+            value = value.strip()
+        if ids:
+            if isinstance(value, bool) or not isinstance(value, (int, str)) or \
+                    not (str(value).isascii() and str(value).isdigit()):
+                raise InvalidBatch(f'{name} must be a list of numbers, got {value!r}')
+            value = int(value)
+        keys.append(value)
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        raise InvalidBatch(f'No {name} given')
+    if limit is not None and len(keys) > limit:
+        raise InvalidBatch(f'At most {limit} {name} per request, got {len(keys)}')
+    return keys
+
+def batch_param(param, ids=True):
+    """``batch_keys`` of a comma-separated query parameter, at most API_BATCH_MAX"""
+    values = [value for value in request.args.get(param, '').split(',') if value.strip()]
+    return batch_keys(param, values, ids, limit=current_app.config['API_BATCH_MAX'])
+
+def embed_officer_resources(data, officer_ids):
+    """Add the resources named by ``include`` to each officer's dict, one IN query per resource"""
+    for name in serializers.includes(request.args, OFFICER_EMBEDS, default=['incidents']):
+        view, model, criteria = OFFICER_EMBEDS[name]
+        view = serializers.sparse(view, request.args, f'fields[{name}]')
+        rows = (model.query.options(*view.load_options('officer_id'))
+                .filter(model.officer_id.in_(officer_ids)).filter_by(**criteria)
+                .order_by(model.id))
+        for officer in data:
+            officer[name] = []
+        by_officer = {officer_id: officer for officer_id, officer in zip(officer_ids, data)}
+        for row in rows:
+            by_officer[row.officer_id][name].append(view.dump(row))
+
+@bp.route('/api/officer/<int:officer_id>', methods=['GET'])
+@query_budget(4)
 def api_get_officer(officer_id):
-    """REST API: Get single officer"""
-    officer = Officer.query.get_or_404(officer_id)
+    """REST API: Get single officer, with the resources named by ``include``"""
+    view = serializers.sparse(serializers.OFFICER_DETAIL, request.args)
+    officer = Officer.query.options(*view.load_options()).filter_by(id=officer_id).first_or_404()
+    
+    data = view.dump(officer)
+    embed_officer_resources([data], [officer.id])
+    return jsonify(data)
+
+@bp.route('/api/officers/batch', methods=['GET'])
+@compute_limit
+@query_budget(4)
+def api_get_officers_batch():
+    """REST API: Several officers by ``ids=1,2`` or ``badges=B1,B2``, in request order.
+    
+    Takes the same fields= and include= parameters as /api/officer/<id>, but
+    embeds nothing unless asked. Ids or badges not found are listed in ``missing``.
+    """
+    if ('ids' in request.args) == ('badges' in request.args):
+        raise InvalidBatch('Pass either ids or badges')
+    if 'ids' in request.args:
+        keys, column = batch_param('ids'), Officer.id
+    else:
+        keys, column = batch_param('badges', ids=False), Officer.badge_number
+    view = serializers.sparse(serializers.OFFICER_DETAIL, request.args)
+    
+    officers = Officer.query.options(*view.load_options(column.key)).filter(column.in_(keys)).all()
+    found = {getattr(officer, column.key): officer for officer in officers}
+    ordered = [found[key] for key in keys if key in found]
+    data = view.dump_many(ordered)
+    if 'include' in request.args and ordered:
+        embed_officer_resources(data, [officer.id for officer in ordered])
     
     return jsonify({
-        'id': officer.id,
-        'badge_number': officer.badge_number,
-        'first_name': officer.first_name,
-        'last_name': officer.last_name,
-        'middle_name': officer.middle_name,
-        'department': officer.current_department.name if officer.current_department else None,
-        'rank': officer.rank,
-        'status': officer.status,
-        'hire_date': officer.hire_date.isoformat() if officer.hire_date else None,
-        'incidents': [{
-            'id': i.id,
-            'date': i.incident_date.isoformat(),
-            'type': i.incident_type,
-            'description': i.description
-        } for i in officer.incidents.all()]
+        'data': data,
+        'missing': [key for key in keys if key not in found]
     })
 
-@app.route('/api/incidents', methods=['GET'])
+@bp.route('/api/incidents', methods=['GET'])
+@compute_limit
+@query_budget(3)
 def api_get_incidents():
     """REST API: Get all incidents"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    view = serializers.sparse(serializers.INCIDENT_LISTING, request.args)
     
-    incidents = Incident.query.paginate(page=page, per_page=per_page, error_out=False)
+    incidents = Incident.query.options(*view.load_options()).paginate(
+        page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'data': [{
-            'id': i.id,
-            'officer_id': i.officer_id,
-            'officer_name': f"{i.officer.first_name} {i.officer.last_name}",
-            'date': i.incident_date.isoformat(),
-            'type': i.incident_type,
-            'location': i.location,
-            'description': i.description[:200]
-        } for i in incidents.items],
+        'data': view.dump_many(incidents.items),
         'page': incidents.page,
         'per_page': incidents.per_page,
         'total': incidents.total,
         'pages': incidents.pages
     })
 
-@app.route('/admin/batch_approve', methods=['POST'])
+@bp.route('/api/incidents/batch', methods=['GET'])
+@compute_limit
+@query_budget(2)
+def api_get_incidents_batch():
+    """REST API: Several incidents by ``ids=1,2``, in request order, with full descriptions"""
+    ids = batch_param('ids')
+    view = serializers.sparse(serializers.INCIDENT_DETAIL, request.args)
+    
+    incidents = Incident.query.options(*view.load_options()).filter(Incident.id.in_(ids)).all()
+    found = {incident.id: incident for incident in incidents}
+    
+    return jsonify({
+        'data': view.dump_many(found[incident_id] for incident_id in ids if incident_id in found),
+        'missing': [incident_id for incident_id in ids if incident_id not in found]
+    })
+
+@bp.errorhandler(serializers.InvalidFieldset)
+@bp.errorhandler(InvalidBatch)
+def invalid_api_request(error):
+    """An API parameter the endpoint does not support"""
+    return jsonify({'error': str(error)}), 400
+
+@bp.route('/api/changes', methods=['GET'])
+@compute_limit
+@query_budget(8)
+def api_changes():
+    """REST API: records inserted, updated or deleted after the ``since`` cursor"""
+    # A malformed cursor is an error, not 0: that would silently re-send the whole feed
+    since = request.args.get('since', '0')
+    if not (since.isascii() and since.isdigit()):
+        return jsonify({'error': f'Invalid cursor {since!r}: pass next_cursor from the previous page, or 0'}), 400
+    since = int(since)
+    limit = request.args.get('limit', change_feed.DEFAULT_PAGE_SIZE, type=int)
+    
+    try:
+        changes, next_cursor, has_more = change_feed.changes(
+            since, limit, current_app.config['CHANGE_FEED_SETTLE_SECONDS'])
+    except change_feed.ResyncRequired as e:
+        return jsonify({'error': str(e), 'resync': True}), 410
+    
+    return jsonify({
+        'changes': changes,
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    })
+
+def record_ids_from(data):
+    """The ``record_ids`` list of a batch action, as ``batch_keys``"""
+    record_ids = data.get('record_ids')
+    if not isinstance(record_ids, list):
+        raise InvalidBatch('record_ids must be a list of numbers')
+    return batch_keys('record_ids', record_ids)
+
+@bp.route('/admin/batch_approve', methods=['POST'])
 def batch_approve():
     """Batch approve multiple records"""
     if not session.get('is_admin'):
         return jsonify({'error': 'Access denied'}), 403
     
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     table_name = data.get('table_name')
-    record_ids = data.get('record_ids', [])
+    record_ids = record_ids_from(data)
     
-    if not table_name or not record_ids:
+    if not table_name:
         return jsonify({'error': 'Missing parameters'}), 400
+    if table_name not in moderation_queue.QUEUE_TABLES:
+        return jsonify({'error': f'{table_name} is not a moderated table'}), 400
     
-    approved_count = 0
+    # Skip records another moderator has claimed
+    held = moderation_queue.held_by_others(table_name, record_ids, session.get('user_id'))
+    record_ids = [record_id for record_id in record_ids if record_id not in held]
     
-    for record_id in record_ids:
-        if table_name == 'incidents':
-            record = Incident.query.get(record_id)
+    def approve():
+        records = get_resolver().resolve((table_name, record_id) for record_id in record_ids)
+        for record in records.values():
             if record:
                 record.verified = True
-                approved_count += 1
-        elif table_name == 'evidence':
-            record = Evidence.query.get(record_id)
-            if record:
-                record.verified = True
-                approved_count += 1
-        elif table_name == 'community_reports':
-            record = CommunityReport.query.get(record_id)
-            if record:
-                record.verified = True
-                approved_count += 1
+        return sum(1 for record in records.values() if record)
     
-    db.session.commit()
+    approved_count = sqlite_profile.run_with_retry(approve)
+    moderation_queue.resolve(table_name, record_ids, 'approved', session.get('user_id'))
     
     # Log the batch action
     log_audit(table_name, 0, 'batch_approve', 
@@ -1284,34 +1339,28 @@ def batch_approve():
         'message': f'Successfully approved {approved_count} records'
     })
 
-@app.route('/admin/batch_reject', methods=['POST'])
+@bp.route('/admin/batch_reject', methods=['POST'])
 def batch_reject():
     """Batch reject multiple records"""
     if not session.get('is_admin'):
         return jsonify({'error': 'Access denied'}), 403
     
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     table_name = data.get('table_name')
-    record_ids = data.get('record_ids', [])
+    record_ids = record_ids_from(data)
     reason = data.get('reason', 'rejected')
     
-    if not table_name or not record_ids:
+    if not table_name:
         return jsonify({'error': 'Missing parameters'}), 400
+    if table_name not in moderation_queue.QUEUE_TABLES:
+        return jsonify({'error': f'{table_name} is not a moderated table'}), 400
     
-    rejected_count = 0
+    # Skip records another moderator has claimed
+    held = moderation_queue.held_by_others(table_name, record_ids, session.get('user_id'))
+    record_ids = [record_id for record_id in record_ids if record_id not in held]
     
-    for record_id in record_ids:
-        moderation = ContentModeration(
-            table_name=table_name,
-            record_id=record_id,
-            status='rejected',
-            moderator_id=session.get('user_id'),
-            reason_code=reason
-        )
-        db.session.add(moderation)
-        rejected_count += 1
-    
-    db.session.commit()
+    rejected_count = moderation_queue.resolve(table_name, record_ids, 'rejected',
+                                              session.get('user_id'), reason_code=reason)
     
     # Log the batch action
     log_audit(table_name, 0, 'batch_reject', 
@@ -1324,8 +1373,10 @@ def batch_reject():
         'message': f'Successfully rejected {rejected_count} records'
     })
 
-@app.route('/add_vehicle', methods=['GET', 'POST'])
+@bp.route('/add_vehicle', methods=['GET', 'POST'])
 def add_vehicle():
+    from forms import VehicleForm
+    
     form = VehicleForm()
     form.officer_id.choices = [(o.id, f"{o.first_name} {o.last_name} ({o.badge_number})") for o in Officer.query.all()]
     
@@ -1346,18 +1397,17 @@ def add_vehicle():
             last_seen_date=form.last_seen_date.data,
             source=form.source.data
         )
-        db.session.add(vehicle)
-        db.session.commit()
+        sqlite_profile.commit_with_retry(vehicle)
         
         # Log the audit trail
         log_audit('vehicles', vehicle.id, 'create', user_id=session.get('user_id'))
         
         flash('Vehicle added successfully!', 'success')
-        return redirect(url_for('officer_detail', officer_id=vehicle.officer_id))
+        return redirect(url_for('main.officer_detail', officer_id=vehicle.officer_id))
     
     return render_template('add_vehicle.html', form=form)
 
-@app.route('/vehicles')
+@bp.route('/vehicles')
 def vehicles():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
@@ -1365,18 +1415,19 @@ def vehicles():
     query = Vehicle.query.filter_by(is_active=True)
     if search:
         query = query.join(Officer).filter(
-            (Vehicle.make.contains(search)) |
-            (Vehicle.model.contains(search)) |
-            (Vehicle.license_plate.contains(search)) |
-            (Vehicle.color.contains(search)) |
-            (Officer.first_name.contains(search)) |
-            (Officer.last_name.contains(search))
+            (database.text_contains(Vehicle.make, search)) |
+            (database.text_contains(Vehicle.model, search)) |
+            (database.text_contains(Vehicle.license_plate, search)) |
+            (database.text_contains(Vehicle.color, search)) |
+            (database.text_contains(Officer.first_name, search)) |
+            (database.text_contains(Officer.last_name, search))
         )
     
     vehicles = query.paginate(page=page, per_page=20, error_out=False)
     return render_template('vehicles.html', vehicles=vehicles, search=search)
 
-@app.route('/analytics')
+@bp.route('/analytics')
+@compute_limit
 def analytics():
     """Analytics dashboard with statistics and trends"""
     # Basic statistics
@@ -1388,10 +1439,11 @@ def analytics():
     unmarked_vehicles = Vehicle.query.filter_by(is_active=True, is_unmarked=True).count()
     
     # Status breakdown
-    active_officers = Officer.query.filter_by(status='active').count()
-    terminated_officers = Officer.query.filter_by(status='terminated').count()
-    suspended_officers = Officer.query.filter_by(status='suspended').count()
-    retired_officers = Officer.query.filter_by(status='retired').count()
+    status_counts = dict(db.session.query(Officer.status, db.func.count(Officer.id)).group_by(Officer.status).all())
+    active_officers = status_counts.get('active', 0)
+    terminated_officers = status_counts.get('terminated', 0)
+    suspended_officers = status_counts.get('suspended', 0)
+    retired_officers = status_counts.get('retired', 0)
     
     # Incident types
     incident_types = db.session.query(
@@ -1415,13 +1467,14 @@ def analytics():
     department_stats = db.session.query(
         Department,
         db.func.count(Incident.id).label('incident_count')
-    ).join(Officer).join(Incident).group_by(Department.id).order_by(db.func.count(Incident.id).desc()).limit(10).all()
+    ).select_from(Department).join(Officer, Officer.current_department_id == Department.id).join(
+        Incident, Incident.officer_id == Officer.id).group_by(Department.id).order_by(db.func.count(Incident.id).desc()).limit(10).all()
     
     # Monthly incident trends (last 12 months)
     from dateutil.relativedelta import relativedelta
     twelve_months_ago = datetime.now() - relativedelta(months=12)
     monthly_incidents = db.session.query(
-        db.func.strftime('%Y-%m', Incident.incident_date).label('month'),
+        database.year_month(Incident.incident_date).label('month'),
         db.func.count(Incident.id).label('count')
     ).filter(Incident.incident_date >= twelve_months_ago).group_by('month').order_by('month').all()
     
@@ -1453,6 +1506,4 @@ def analytics():
                          pending_disputes=pending_disputes)
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-    app.run(debug=True, port=5001)
+    create_app().run(debug=True, port=5001)
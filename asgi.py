@@ -0,0 +1,195 @@
+"""
+ASGI server for the live search.
+
+Typing in the search box sends a request after each pause, and the browser
+aborts the requests that a newer query supersedes. On a sync worker an
+aborted request still runs its three LIKE scans to the end. Here every
+request is an asyncio task, which is cancelled as soon as the client
+disconnects; the statement it was running is interrupted (sqlite3 interrupt,
+PostgreSQL cancel), so abandoned searches stop using the database.
+
+Run it next to the WSGI app and send only the live search to it:
+
+    uvicorn asgi:app --port 8001 --workers 2
+
+    location = /api/live_search { proxy_pass http://127.0.0.1:8001; }
+
+It needs an ASGI server, greenlet, and aiosqlite for SQLite (psycopg already
+covers PostgreSQL), all listed in requirements.txt. Configuration comes from the same environment as the
+Flask app. Results and the replica choice match the Flask view, which keeps
+serving /api/live_search wherever this server is not deployed. Hits count
+against the Flask view's own rate limit (live_search.RATE_LIMIT per client):
+this server uses Flask-Limiter's strategy and key, so with a shared
+RATELIMIT_STORAGE_URI (the default SQLite file, or Redis) a client has one
+budget across both servers.
+"""
+
+import asyncio
+import contextlib
+import http.cookies
+import logging
+import random
+import time
+from urllib.parse import parse_qs
+
+from limits import parse as parse_limit
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import database
+import live_search
+import rate_limits
+import replicas
+import sqlite_profile
+from app import create_app
+from models import db
+
+logger = logging.getLogger(__name__)
+
+PATH = '/api/live_search'
+
+
+async def interrupt(driver_connection):
+    """Stop the statement running on a driver connection, from another task"""
+    if hasattr(driver_connection, 'interrupt'):  # aiosqlite
+        await driver_connection.interrupt()
+    elif hasattr(driver_connection, 'cancel_safe'):  # psycopg 3.2+
+        await driver_connection.cancel_safe()
+    else:
+        driver_connection.cancel()
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+class LiveSearchServer:
+    """The ASGI application. The Flask app, engines and rate limiter are
+    created on first use, so importing this module stays cheap."""
+
+    def __init__(self, config=None):
+        self.config_overrides = config
+        self.flask_app = None
+        self.primary = None
+        self.replicas = []
+        self.rate_limiter = None
+        self.completed = self.cancelled = 0
+
+    def start(self):
+        if self.flask_app is not None:
+            return
+        self.flask_app = create_app(self.config_overrides)
+        config = self.flask_app.config
+        with self.flask_app.app_context():
+            urls = [db.engines[key].url for key in self.flask_app.extensions['replicas']]
+            primary_url = db.engine.url  # relative SQLite paths resolved against the instance folder
+        self.primary = self._engine(primary_url)
+        self.replicas = [self._engine(url) for url in urls]
+        if config.get('RATELIMIT_ENABLED', True):
+            # The strategy and storage Flask-Limiter uses, and the key it gives
+            # the view's limit: [prefix,] client address, endpoint
+            self.rate_limiter = rate_limits.get_limiter(self.flask_app).limiter
+            self.rate_limit = parse_limit(live_search.RATE_LIMIT)
+            endpoint, _ = self.flask_app.url_map.bind('localhost').match(PATH)
+            self.rate_limit_prefix = [config['RATELIMIT_KEY_PREFIX']] if config.get('RATELIMIT_KEY_PREFIX') else []
+            self.rate_limit_endpoint = endpoint
+
+    def _engine(self, url):
+        url = database.async_url(url)
+        engine = create_async_engine(url, **database.engine_options(url.render_as_string(hide_password=False)))
+        sqlite_profile.tune(engine, self.flask_app.config)
+        return engine
+
+    async def stop(self):
+        for engine in [self.primary] + self.replicas:
+            if engine is not None:
+                await engine.dispose()
+        logger.info('Live search: %d completed, %d cancelled by the client', self.completed, self.cancelled)
+
+    def choose_engine(self, headers):
+        """A replica, unless the browser recently wrote and must read its own changes"""
+        cookies = http.cookies.SimpleCookie(headers.get(b'cookie', b'').decode('latin-1'))
+        sticky = cookies.get(replicas.STICKY_COOKIE)
+        try:
+            recently_wrote = sticky is not None and float(sticky.value) > time.time()
+        except ValueError:
+            recently_wrote = False
+        if self.replicas and not recently_wrote:
+            return random.choice(self.replicas)
+        return self.primary
+
+    async def search(self, query, client, engine, running):
+        """(status, JSON-able body) for one request. The driver connection
+        in use is kept in ``running`` so that it can be interrupted."""
+        if self.rate_limiter is not None:
+            key = [*self.rate_limit_prefix, client, self.rate_limit_endpoint]
+            allowed = await asyncio.to_thread(self.rate_limiter.hit, self.rate_limit, *key)
+            if not allowed:
+                return 429, {'error': f'Rate limit exceeded: {live_search.RATE_LIMIT}'}
+        if len(query) < live_search.MIN_QUERY_LENGTH:
+            return 200, live_search.empty()
+        async with engine.connect() as connection:
+            running['connection'] = (await connection.get_raw_connection()).driver_connection
+            async with AsyncSession(bind=connection) as session:
+                return 200, await live_search.search_async(session, query)
+
+    async def respond(self, send, status, body, head=False):
+        data = self.flask_app.json.response(body).get_data()  # same encoder and format as jsonify
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(data)).encode()),
+            (b'cache-control', b'no-store'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b'' if head else data})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        self.start()
+        if scope['path'] != PATH:
+            return await self.respond(send, 404, {'error': f'Only {PATH} is served here'})
+        if scope['method'] not in ('GET', 'HEAD'):
+            return await self.respond(send, 405, {'error': 'Method not allowed'})
+
+        args = parse_qs(scope['query_string'].decode('latin-1'))
+        query = args.get('q', [''])[0].strip()
+        client = (scope.get('client') or ('unknown',))[0]
+        engine = self.choose_engine(dict(scope['headers']))
+
+        running = {}
+        search = asyncio.ensure_future(self.search(query, client, engine, running))
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        done, _ = await asyncio.wait({search, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        if search not in done:  # the browser aborted a superseded query
+            # Interrupt first: cancelling the task makes SQLAlchemy drop the
+            # connection while the database goes on executing the statement
+            if 'connection' in running:
+                await interrupt(running['connection'])
+            search.cancel()
+            with contextlib.suppress(asyncio.CancelledError, DBAPIError):
+                await search
+            self.cancelled += 1
+            return
+        disconnected.cancel()
+        status, body = search.result()
+        self.completed += 1
+        await self.respond(send, status, body, head=scope['method'] == 'HEAD')
+
+
+app = LiveSearchServer()
@@ -0,0 +1,79 @@
+"""
+Fingerprinted static assets.
+
+``python build_assets.py`` writes minified copies of the CSS and JavaScript
+named by content hash into static/build/, and a manifest mapping the source
+names to them. While that manifest exists:
+
+- ``url_for('static', filename='css/style.css')`` returns the URL of the
+  current build, so templates need no changes.
+- Built files are served with ``Cache-Control: public, max-age=<one year>,
+  immutable``, so browsers never revalidate them; a new build changes the URL.
+- Clients that accept brotli or gzip get the pre-compressed variant.
+
+Without a build (development) static files are served as before. The
+manifest is read at startup, so restart the app after building.
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import current_app, request, send_file
+from werkzeug.security import safe_join
+
+import compression
+
+DEFAULT_MAX_AGE = 365 * 24 * 3600
+
+
+def load_manifest(path):
+    """Source name -> built name for the current and the previous build"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}, set()
+    return manifest.get('files', {}), set(manifest.get('files', {}).values()) | set(manifest.get('previous', {}).values())
+
+
+def _send_built(filename):
+    path = safe_join(current_app.static_folder, filename)
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding in compression.available():
+        variant = path + compression.SUFFIXES[encoding]
+        if request.accept_encodings[encoding] and os.path.exists(variant):
+            response = send_file(variant, mimetype=mimetype, max_age=current_app.config['ASSETS_MAX_AGE'])
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype, max_age=current_app.config['ASSETS_MAX_AGE'])
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    """Resolve and serve the built assets. Call before registering blueprints."""
+    app.config.setdefault('ASSETS_MANIFEST', os.path.join(app.static_folder, 'build', 'manifest.json'))
+    app.config.setdefault('ASSETS_MAX_AGE', DEFAULT_MAX_AGE)
+
+    files, built = load_manifest(app.config['ASSETS_MANIFEST'])
+    app.extensions['assets'] = files
+    if not files:
+        return
+
+    @app.url_defaults
+    def fingerprint(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in files:
+            values['filename'] = files[values['filename']]
+
+    serve_static = app.view_functions['static']
+
+    def static(filename):
+        if filename in built:
+            return _send_built(filename)
+        return serve_static(filename=filename)
+
+    app.view_functions['static'] = static
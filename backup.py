@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Bad Apples Backup Tool
+Online, incremental snapshots of the SQLite database with retention,
+verification and timed restore drills
+
+Usage: python backup.py snapshot [--keep-last 7 --keep-daily 14 --keep-weekly 8]
+       python backup.py list
+       python backup.py verify [SNAPSHOT]
+       python backup.py restore SNAPSHOT --to PATH [--force]
+       python backup.py drill [--max-seconds 60]
+       python backup.py prune [--keep-last 7 --keep-daily 14 --keep-weekly 8]
+
+A snapshot is taken while the app keeps running. SQLite's online backup API
+copies a consistent image of the database into a temporary file. In WAL mode
+it copies in one step, which never blocks writers. Otherwise it copies
+--pages pages per step and lets writers in between steps. The copy is split
+into fixed-size chunks stored by their SHA-256, so each snapshot only writes
+the chunks that changed since the previous one. A manifest records the chunk
+list for each point in time.
+
+Snapshots live in BACKUP_DIR (default instance/backups/). Restore drills
+rebuild the newest snapshot, check it with PRAGMA integrity_check and record
+how long the restore took in drills.jsonl.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CHUNK_SIZE = 1024 * 1024  # a multiple of every SQLite page size
+DEFAULT_PAGES_PER_STEP = 1024
+DEFAULT_KEEP_LAST = 7
+DEFAULT_KEEP_DAILY = 14
+DEFAULT_KEEP_WEEKLY = 8
+SNAPSHOT_ID_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+class BackupError(Exception):
+    pass
+
+
+class SnapshotStore:
+    """Content-addressed chunks plus one manifest per snapshot"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.chunk_dir = os.path.join(directory, 'chunks')
+        self.snapshot_dir = os.path.join(directory, 'snapshots')
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest + '.z')
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def add(self, path, metadata):
+        """Store the file at ``path`` as a new snapshot; returns its manifest"""
+        chunks, new_chunks, new_bytes = [], 0, 0
+        whole = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                whole.update(data)
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+                chunk_path = self._chunk_path(digest)
+                if not os.path.exists(chunk_path):
+                    compressed = zlib.compress(data, 6)
+                    self._write_atomic(chunk_path, compressed)
+                    new_chunks += 1
+                    new_bytes += len(compressed)
+
+        manifest = dict(metadata, size=os.path.getsize(path), sha256=whole.hexdigest(),
+                        chunk_size=CHUNK_SIZE, chunks=chunks, new_chunks=new_chunks, new_bytes=new_bytes)
+        self._write_atomic(os.path.join(self.snapshot_dir, manifest['id'] + '.json'),
+                           json.dumps(manifest, indent=2).encode())
+        return manifest
+
+    def manifests(self):
+        """All manifests, oldest first"""
+        names = sorted(name for name in os.listdir(self.snapshot_dir) if name.endswith('.json'))
+        return [self.manifest(name[:-len('.json')]) for name in names]
+
+    def manifest(self, snapshot_id):
+        path = os.path.join(self.snapshot_dir, snapshot_id + '.json')
+        if not os.path.exists(path):
+            raise BackupError(f'No snapshot {snapshot_id}')
+        with open(path) as f:
+            return json.load(f)
+
+    def read_chunk(self, digest):
+        with open(self._chunk_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupError(f'Chunk {digest} is corrupt')
+        return data
+
+    def restore(self, manifest, path):
+        """Rebuild a snapshot into ``path`` and check its checksum"""
+        whole = hashlib.sha256()
+        with open(path, 'wb') as f:
+            for digest in manifest['chunks']:
+                data = self.read_chunk(digest)
+                whole.update(data)
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if whole.hexdigest() != manifest['sha256']:
+            raise BackupError(f"Snapshot {manifest['id']} does not match its checksum")
+
+    def remove(self, snapshot_id):
+        os.remove(os.path.join(self.snapshot_dir, snapshot_id + '.json'))
+
+    def collect_garbage(self):
+        """Delete chunks no snapshot refers to; returns how many were deleted"""
+        referenced = {digest for manifest in self.manifests() for digest in manifest['chunks']}
+        removed = 0
+        for prefix in os.listdir(self.chunk_dir):
+            for name in os.listdir(os.path.join(self.chunk_dir, prefix)):
+                if name[:-len('.z')] not in referenced:
+                    os.remove(os.path.join(self.chunk_dir, prefix, name))
+                    removed += 1
+        return removed
+
+
+def online_backup(source_path, target_path, pages=DEFAULT_PAGES_PER_STEP):
+    """Copy a live database with the backup API; returns the number of steps taken"""
+    if not os.path.isfile(source_path):
+        raise BackupError(f'{source_path} does not exist')
+    # Read-write so a WAL database can be read even before its -shm file exists
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+
+    try:
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        # A WAL reader never blocks writers, so one step gives a consistent
+        # copy without restarts; otherwise yield the lock between steps
+        source.backup(target, pages=-1 if wal else pages, progress=progress, sleep=0.005)
+        target.execute('PRAGMA journal_mode=DELETE')  # a self-contained single file
+    finally:
+        target.close()
+        source.close()
+    return steps
+
+
+def integrity_check(path):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        return [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    finally:
+        conn.close()
+
+
+def table_counts(path):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+    finally:
+        conn.close()
+
+
+def take_snapshot(store, source_path, pages=DEFAULT_PAGES_PER_STEP):
+    """Back up the live database into the store and verify the copy"""
+    started = time.perf_counter()
+    snapshot_id = datetime.utcnow().strftime(SNAPSHOT_ID_FORMAT)
+    if os.path.exists(os.path.join(store.snapshot_dir, snapshot_id + '.json')):
+        raise BackupError(f'Snapshot {snapshot_id} already exists')
+    with tempfile.TemporaryDirectory(dir=store.directory) as tmp:
+        copy = os.path.join(tmp, 'snapshot.db')
+        steps = online_backup(source_path, copy, pages)
+        problems = integrity_check(copy)
+        if problems != ['ok']:
+            raise BackupError('Backup copy failed integrity_check: ' + '; '.join(problems[:5]))
+        manifest = store.add(copy, {
+            'id': snapshot_id,
+            'created': datetime.utcnow().isoformat() + 'Z',
+            'source': os.path.abspath(source_path),
+            'steps': steps,
+            'tables': table_counts(copy),
+        })
+    manifest['seconds'] = time.perf_counter() - started
+    return manifest
+
+
+def retained(manifests, keep_last, keep_daily, keep_weekly):
+    """Snapshot ids kept by the retention policy: the newest ``keep_last``, plus
+    the newest snapshot of each of the last ``keep_daily`` days and
+    ``keep_weekly`` ISO weeks"""
+    newest_first = sorted(manifests, key=lambda manifest: manifest['id'], reverse=True)
+    keep = {manifest['id'] for manifest in newest_first[:keep_last]}
+    if not newest_first:
+        return keep
+    latest = datetime.strptime(newest_first[0]['id'], SNAPSHOT_ID_FORMAT)
+    days, weeks = set(), set()
+    for manifest in newest_first:
+        taken = datetime.strptime(manifest['id'], SNAPSHOT_ID_FORMAT)
+        day = taken.date()
+        week = taken.isocalendar()[:2]
+        if day not in days and latest - taken < timedelta(days=keep_daily):
+            days.add(day)
+            keep.add(manifest['id'])
+        if week not in weeks and latest - taken < timedelta(weeks=keep_weekly):
+            weeks.add(week)
+            keep.add(manifest['id'])
+    return keep
+
+
+def prune(store, keep_last, keep_daily, keep_weekly):
+    """Apply the retention policy; returns (removed snapshot ids, removed chunks)"""
+    manifests = store.manifests()
+    keep = retained(manifests, keep_last, keep_daily, keep_weekly)
+    removed = [manifest['id'] for manifest in manifests if manifest['id'] not in keep]
+    for snapshot_id in removed:
+        store.remove(snapshot_id)
+    return removed, store.collect_garbage()
+
+
+def verify(store, manifest):
+    """Rebuild a snapshot in a scratch file and check it; returns integrity_check's result"""
+    with tempfile.TemporaryDirectory(dir=store.directory) as tmp:
+        path = os.path.join(tmp, 'verify.db')
+        store.restore(manifest, path)
+        return integrity_check(path)
+
+
+def drill(store, max_seconds=None):
+    """Timed restore of the newest snapshot, logged to drills.jsonl"""
+    manifests = store.manifests()
+    if not manifests:
+        raise BackupError('No snapshots to restore')
+    manifest = manifests[-1]
+    result = {'time': datetime.utcnow().isoformat() + 'Z', 'snapshot': manifest['id']}
+    with tempfile.TemporaryDirectory(dir=store.directory) as tmp:
+        path = os.path.join(tmp, 'drill.db')
+        started = time.perf_counter()
+        try:
+            store.restore(manifest, path)
+            result['restore_seconds'] = time.perf_counter() - started
+            result['integrity'] = integrity_check(path)
+            result['tables_match'] = table_counts(path) == manifest.get('tables', table_counts(path))
+        except (BackupError, OSError, sqlite3.Error, zlib.error) as e:
+            result['error'] = str(e)
+    result['passed'] = ('error' not in result and result['integrity'] == ['ok'] and result['tables_match']
+                        and (max_seconds is None or result['restore_seconds'] <= max_seconds))
+    with open(os.path.join(store.directory, 'drills.jsonl'), 'a') as f:
+        f.write(json.dumps(result) + '\n')
+    return result
+
+
+def database_path():
+    """Path of the app's SQLite database"""
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        raise SystemExit('❌ backup.py handles SQLite files; use pg_dump or WAL archiving for PostgreSQL')
+    path = url.database
+    return path[len('file:'):] if path.startswith('file:') else path
+
+
+def default_backup_dir():
+    return os.getenv('BACKUP_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'backups'))
+
+
+def _add_retention_arguments(parser):
+    parser.add_argument('--keep-last', type=int, default=DEFAULT_KEEP_LAST)
+    parser.add_argument('--keep-daily', type=int, default=DEFAULT_KEEP_DAILY, help='days with one kept snapshot')
+    parser.add_argument('--keep-weekly', type=int, default=DEFAULT_KEEP_WEEKLY, help='weeks with one kept snapshot')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Online backups of the Bad Apples database')
+    parser.add_argument('--backup-dir', default=default_backup_dir())
+    parser.add_argument('--database', help='SQLite file to back up (defaults to the app database)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    snapshot_parser = commands.add_parser('snapshot', help='take an incremental snapshot and apply retention')
+    snapshot_parser.add_argument('--pages', type=int, default=DEFAULT_PAGES_PER_STEP,
+                                 help='pages copied per step outside WAL mode')
+    _add_retention_arguments(snapshot_parser)
+    commands.add_parser('list', help='list snapshots')
+    verify_parser = commands.add_parser('verify', help='rebuild and check snapshots (default: all)')
+    verify_parser.add_argument('snapshot', nargs='?')
+    restore_parser = commands.add_parser('restore', help='rebuild a snapshot into a database file')
+    restore_parser.add_argument('snapshot', help="snapshot id, or 'latest'")
+    restore_parser.add_argument('--to', required=True, help='file to write; stop the app before replacing its database')
+    restore_parser.add_argument('--force', action='store_true', help='overwrite an existing file')
+    drill_parser = commands.add_parser('drill', help='timed test restore of the newest snapshot')
+    drill_parser.add_argument('--max-seconds', type=float, help='fail if the restore takes longer')
+    prune_parser = commands.add_parser('prune', help='apply the retention policy')
+    _add_retention_arguments(prune_parser)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.backup_dir)
+    print("💾 Bad Apples Backup")
+    print("=" * 40)
+
+    try:
+        if args.command == 'snapshot':
+            manifest = take_snapshot(store, args.database or database_path(), args.pages)
+            print(f"✅ Snapshot {manifest['id']}: {manifest['size']:,} bytes, {manifest['new_chunks']} new chunks "
+                  f"({manifest['new_bytes']:,} bytes stored) in {manifest['seconds']:.2f}s")
+            removed, chunks = prune(store, args.keep_last, args.keep_daily, args.keep_weekly)
+            if removed:
+                print(f"🧹 Removed {len(removed)} old snapshots and {chunks} unused chunks")
+        elif args.command == 'list':
+            for manifest in store.manifests():
+                print(f"{manifest['id']}  {manifest['size']:>14,} bytes  {len(manifest['chunks']):>6} chunks  "
+                      f"{sum(manifest.get('tables', {}).values()):>10,} rows")
+        elif args.command == 'verify':
+            manifests = [store.manifest(args.snapshot)] if args.snapshot else store.manifests()
+            failed = False
+            for manifest in manifests:
+                try:
+                    result = verify(store, manifest)
+                except (BackupError, OSError, zlib.error) as e:
+                    result = [str(e)]
+                failed = failed or result != ['ok']
+                print(f"{'✅' if result == ['ok'] else '❌'} {manifest['id']}: {'; '.join(result[:3])}")
+            if failed:
+                return 1
+        elif args.command == 'restore':
+            manifests = store.manifests()
+            manifest = manifests[-1] if args.snapshot == 'latest' and manifests else store.manifest(args.snapshot)
+            if os.path.exists(args.to) and not args.force:
+                raise BackupError(f'{args.to} exists; pass --force to overwrite it')
+            partial = args.to + '.restoring'
+            store.restore(manifest, partial)
+            os.replace(partial, args.to)
+            print(f"✅ Restored {manifest['id']} to {args.to}")
+        elif args.command == 'drill':
+            result = drill(store, args.max_seconds)
+            if result['passed']:
+                print(f"✅ Restored {result['snapshot']} in {result['restore_seconds']:.2f}s, integrity ok")
+            else:
+                print(f"❌ Drill failed for {result['snapshot']}: "
+                      f"{result.get('error') or result.get('integrity')}, {result.get('restore_seconds', 0):.2f}s")
+                return 1
+        elif args.command == 'prune':
+            removed, chunks = prune(store, args.keep_last, args.keep_daily, args.keep_weekly)
+            print(f"🧹 Removed {len(removed)} snapshots and {chunks} unused chunks")
+    except (BackupError, sqlite3.Error) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark
+
+Renders representative responses (officer list and detail pages, JSON API and
+export responses, and the incident CSV export) from a scratch database of
+synthetic data. Each one is compressed at every level of every available
+encoding, the way compression.py compresses responses. The script reports
+the CPU time and the bytes for each level.
+
+The recommended level per encoding minimises the total response cost: the
+CPU milliseconds plus the milliseconds needed to send the bytes at --mbps. A
+slow link favours smaller bytes, a fast one less CPU. The streamed CSV is
+also compressed in STREAM_FLUSH_BYTES blocks, which shows what the flushes
+cost.
+
+Usage: python benchmarks/bench_compression.py [--rows 10000] [--seed 42] [--runs 5]
+                                              [--mbps 20] [--encoding br --encoding gzip]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import compression
+
+LEVELS = {'gzip': range(1, 10), 'deflate': range(1, 10), 'br': range(0, 12)}
+CSV_BLOCK_BYTES = 32 * 1024  # what csv_response() yields per chunk
+
+
+def render_payloads(app):
+    """name -> (uncompressed body, streamed?)"""
+    from models import db, Incident
+    from sqlalchemy import func
+
+    with app.app_context():
+        busiest = db.session.query(Incident.officer_id).group_by(Incident.officer_id).order_by(
+            func.count(Incident.id).desc()).limit(1).scalar()
+    client = app.test_client()
+    paths = [
+        ('officers_html', '/officers', False),
+        ('officer_detail_html', f'/officer/{busiest}', False),
+        ('api_incidents_json', '/api/incidents', False),
+        ('export_officer_json', f'/export_officer/{busiest}', False),
+        ('export_incidents_csv', '/export_incidents_csv', True),
+    ]
+    payloads = {}
+    for name, path, streamed in paths:
+        response = client.get(path)  # no Accept-Encoding: the uncompressed body
+        if response.status_code != 200:
+            print(f"{name:<22} ❌ HTTP {response.status_code}, skipped")
+            continue
+        payloads[name] = (response.get_data(), streamed)
+    return payloads
+
+
+def one_shot(data, encoding, level):
+    encoder = compression.encoder(encoding, level)
+    return len(encoder.compress(data) + encoder.finish())
+
+
+def streamed(data, encoding, level):
+    chunks = [data[i:i + CSV_BLOCK_BYTES] for i in range(0, len(data), CSV_BLOCK_BYTES)]
+    encoder = compression.encoder(encoding, level)
+    return sum(len(chunk) for chunk in compression._stream(iter(chunks), encoder, compression.STREAM_FLUSH_BYTES))
+
+
+def measure(fn, data, encoding, level, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        size = fn(data, encoding, level)
+        samples.append((time.perf_counter() - started) * 1000)
+    return size, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--mbps', type=float, default=20, help='client bandwidth in Mbit/s used to weigh bytes')
+    parser.add_argument('--encoding', action='append', choices=sorted(LEVELS),
+                        help='encodings to measure (default: all available)')
+    args = parser.parse_args()
+    encodings = args.encoding or [e for e in ('br', 'gzip', 'deflate') if e != 'br' or 'br' in compression.available()]
+    ms_per_byte = 8 / (args.mbps * 1000)
+
+    print("🗜️  Response compression benchmark")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import synthetic_data
+        from app import create_app
+        from models import db, upgrade_schema
+
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'bench.db'),
+            'RATELIMIT_ENABLED': False,
+            'METRICS_DIR': os.path.join(tmp, 'metrics'),
+        })
+        app.logger.setLevel(logging.CRITICAL)
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()
+            print(f"🧪 Loading {args.rows:,} synthetic rows (seed {args.seed})")
+            synthetic_data.load(args.rows, seed=args.seed, progress=lambda message: None)
+        payloads = render_payloads(app)
+
+    costs = {encoding: {} for encoding in encodings}  # encoding -> level -> summed cost in ms
+    for name, (data, is_streamed) in payloads.items():
+        modes = [('', one_shot)] + ([(' (streamed)', streamed)] if is_streamed else [])
+        for label, fn in modes:
+            print(f"\n{name}{label}: {len(data):,} bytes, {len(data) * ms_per_byte:.1f} ms to send uncompressed")
+            print(f"   {'encoding':<8} {'level':>5} {'bytes':>10} {'ratio':>6} {'cpu ms':>8} {'MB/s':>7} {'total ms':>9}")
+            for encoding in encodings:
+                for level in LEVELS[encoding]:
+                    size, cpu_ms = measure(fn, data, encoding, level, args.runs)
+                    total = cpu_ms + size * ms_per_byte
+                    if not label:
+                        costs[encoding][level] = costs[encoding].get(level, 0) + total
+                    throughput = len(data) / 1e6 / (cpu_ms / 1000) if cpu_ms else float('inf')
+                    print(f"   {encoding:<8} {level:>5} {size:>10,} {len(data) / size:>6.1f} "
+                          f"{cpu_ms:>8.2f} {throughput:>7.0f} {total:>9.2f}")
+
+    configured, suggested = compression.DEFAULT_LEVELS, {}
+    print(f"\n📊 Cheapest level per encoding at {args.mbps:g} Mbit/s (CPU + transfer, all responses)")
+    for encoding, by_level in costs.items():
+        if not by_level:
+            continue
+        best = suggested[encoding] = min(by_level, key=by_level.get)
+        current = configured.get(encoding)
+        note = '' if current == best else (f"   (configured {current}: {by_level[current]:.1f} ms)"
+                                           if current in by_level else '')
+        print(f"   {encoding:<8} level {best:>2}: {by_level[best]:.1f} ms{note}")
+    print(f"   COMPRESS_LEVELS={','.join(f'{encoding}:{level}' for encoding, level in suggested.items())}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
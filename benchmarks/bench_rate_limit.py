@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Rate limit storage microbenchmark
+
+Measures the per-request cost of a sliding-window rate limit check against the
+shared SQLite storage (single process and several concurrent processes), and
+checks that concurrent workers together never exceed the limit.
+
+Usage: python benchmarks/bench_rate_limit.py [--hits 5000] [--workers 4] [--budget-ms 1.0]
+Exits non-zero if the mean overhead per check is above the budget.
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+import rate_limit_storage  # noqa: F401  registers sqlite://
+
+
+def time_hits(storage_uri, hits, limit='1000000 per hour', key='bench'):
+    """Return (per-hit latencies in seconds, number of allowed hits)"""
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(storage_uri))
+    item = parse(limit)
+    latencies = []
+    allowed = 0
+    for _ in range(hits):
+        start = time.perf_counter()
+        allowed += limiter.hit(item, key)
+        latencies.append(time.perf_counter() - start)
+    return latencies, allowed
+
+
+def _worker(args):
+    storage_uri, hits, limit = args
+    return time_hits(storage_uri, hits, limit)
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    mean = statistics.mean(latencies) * 1000
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<32} mean {mean:.3f} ms   p50 {p50:.3f} ms   p99 {p99:.3f} ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--hits', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--budget-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    print("🚦 Rate limit storage benchmark")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_uri = 'sqlite:///' + os.path.join(tmp, 'ratelimit.db')
+
+        report('memory:// (per process)', time_hits('memory://', args.hits)[0])
+        single = report('sqlite:// single process', time_hits(sqlite_uri, args.hits)[0])
+
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.map(_worker, [(sqlite_uri, args.hits, '1000000 per hour')] * args.workers)
+        concurrent = report(f'sqlite:// {args.workers} processes',
+                            [latency for latencies, _ in results for latency in latencies])
+
+        # Correctness: workers share one budget, so the total allowed equals the limit
+        limit = args.hits // 2
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.map(_worker, [(sqlite_uri.replace('ratelimit', 'shared'), args.hits // args.workers,
+                                          f'{limit} per hour')] * args.workers)
+        allowed = sum(count for _, count in results)
+        print(f"\nShared limit of {limit}: {allowed} hits allowed across {args.workers} processes")
+
+    failed = False
+    if allowed != limit:
+        print(f"❌ Limit not enforced across processes (expected {limit})")
+        failed = True
+    for label, mean in (('single process', single), ('concurrent', concurrent)):
+        if mean > args.budget_ms:
+            print(f"❌ {label} mean {mean:.3f} ms exceeds budget of {args.budget_ms} ms")
+            failed = True
+    if not failed:
+        print(f"✅ Within {args.budget_ms} ms budget")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Route and helper microbenchmarks
+
+Loads seeded synthetic data (see synthetic_data.py) into a scratch database,
+times the hot pages, API endpoints and query helpers through the test client,
+and compares the medians with the stored baseline for that data size.
+
+Usage: python benchmarks/bench_routes.py [--rows 10000] [--seed 42] [--runs 20]
+                                         [--backend sqlite|postgresql] [--database URL]
+                                         [--only NAME] [--update-baseline]
+Exits non-zero if a case regressed by more than the tolerance or stopped returning 200.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', 'baselines')
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def build_cases(app, client):
+    """(name, callable) pairs; route callables return the response status"""
+    import moderation_queue
+    from app import calculate_total_costs
+    from models import db, Officer, Incident, AuditLog
+    from record_resolver import RecordResolver
+    from sqlalchemy import func
+
+    with app.app_context():
+        # The most-reported officer is the worst case for the detail pages
+        busiest = db.session.query(Incident.officer_id).group_by(Incident.officer_id).order_by(
+            func.count(Incident.id).desc()).limit(1).scalar()
+        typical = db.session.query(Officer.id).order_by(Officer.id).offset(
+            Officer.query.count() // 2).limit(1).scalar()
+        last_page = max(1, Officer.query.count() // 20)
+
+    def get(path):
+        return lambda: client.get(path).status_code
+
+    def in_context(fn):
+        def run():
+            with app.app_context():
+                fn()
+                db.session.remove()
+        return run
+
+    def resolve_audit_page():
+        logs = AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(200).all()
+        RecordResolver().resolve(logs)
+
+    def claim_and_release():
+        moderation_queue.claim_batch(moderator_id=1, limit=25)
+        moderation_queue.release(1)
+
+    return [
+        ('index', get('/')),
+        ('officers', get('/officers')),
+        ('officers_last_page', get(f'/officers?page={last_page}')),
+        ('officers_filtered', get('/officers?search=Smith')),
+        ('officers_misspelled', get('/officers?search=Jonhson')),
+        ('officer_detail_busiest', get(f'/officer/{busiest}')),
+        ('officer_detail_typical', get(f'/officer/{typical}')),
+        ('search', get('/search?q=Smith')),
+        ('search_incident_text', get('/search?q=footage')),
+        ('search_misspelled', get('/search?q=Garsia')),
+        ('api_live_search', get('/api/live_search?q=Joh')),
+        ('api_live_search_misspelled', get('/api/live_search?q=Mcdonld')),
+        ('api_officers', get('/api/officers')),
+        ('api_officer', get(f'/api/officer/{busiest}')),
+        ('api_incidents', get('/api/incidents')),
+        ('export_officer', get(f'/export_officer/{busiest}')),
+        ('export_officers_csv', get('/export_officers_csv')),
+        ('export_incidents_csv', get('/export_incidents_csv')),
+        ('analytics', get('/analytics')),
+        ('admin_panel', get('/admin')),
+        ('admin_queue', get('/admin/queue')),
+        ('calculate_total_costs', in_context(lambda: calculate_total_costs(busiest))),
+        ('resolve_audit_page', in_context(resolve_audit_page)),
+        ('queue_depth', in_context(moderation_queue.queue_depth)),
+        ('claim_and_release', in_context(claim_and_release)),
+    ]
+
+
+def prepare(app, rows, seed, load_data):
+    import moderation_queue
+    import name_search
+    import synthetic_data
+    from models import db, upgrade_schema, User
+
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        if load_data:
+            print(f"🧪 Loading {rows:,} synthetic rows (seed {seed})")
+            synthetic_data.load(rows, seed=seed)
+            moderation_queue.backfill()
+            name_search.backfill()
+        if not User.query.filter_by(username='bench-admin').first():
+            admin = User(username='bench-admin', email='bench@example.com', role='admin')
+            admin.set_password('bench-admin')
+            db.session.add(admin)
+            db.session.commit()
+        return User.query.filter_by(username='bench-admin').first().id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--backend', choices=['sqlite', 'postgresql'], default='sqlite',
+                        help='scratch database type; postgresql starts a throwaway local server')
+    parser.add_argument('--database', help='reuse an already loaded database instead of a scratch one')
+    parser.add_argument('--only', action='append', help='run only the named case (repeatable)')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed slowdown over the baseline (0.5 = 50%%)')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    suffix = '' if args.backend == 'sqlite' else f'-{args.backend}'
+    baseline_path = os.path.join(BASELINE_DIR, f'routes-{args.rows}{suffix}.json')
+
+    print("⏱️  Route benchmark")
+    print("=" * 40)
+
+    with contextlib.ExitStack() as stack:
+        tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        from app import create_app
+
+        if args.database:
+            database = args.database
+        elif args.backend == 'postgresql':
+            from scratch_postgres import scratch_postgres
+            database = stack.enter_context(scratch_postgres())
+        else:
+            database = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': database,
+            'RATELIMIT_ENABLED': False,
+            'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+        })
+        app.logger.setLevel(logging.CRITICAL)  # failing cases are reported below instead
+        admin_id = prepare(app, args.rows, args.seed, load_data=not args.database)
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['is_admin'] = True
+            session['user_id'] = admin_id
+
+        cases = build_cases(app, client)
+        if args.only:
+            cases = [case for case in cases if case[0] in args.only]
+
+        results, errors = {}, {}
+        for name, run in cases:
+            samples = []
+            try:
+                for attempt in range(args.runs + 2):
+                    started = time.perf_counter()
+                    status = run()
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if status is not None and status != 200:
+                        raise RuntimeError(f'HTTP {status}')
+                    if attempt >= 2:  # first two runs warm the caches
+                        samples.append(elapsed)
+            except Exception as exc:
+                errors[name] = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+                print(f"{name:<26} ❌ {errors[name]}")
+                continue
+            results[name] = {'median_ms': statistics.median(samples), 'p95_ms': percentile(samples, 0.95)}
+            print(f"{name:<26} {results[name]['median_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+        baseline.update({name: round(r['median_ms'], 2) for name, r in results.items()})
+        with open(baseline_path, 'w') as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write('\n')
+        print(f"✅ Baseline written to {os.path.relpath(baseline_path, ROOT)}")
+        return 0
+
+    failed = False
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            allowed = baseline[name] * (1 + args.tolerance)
+            if result['median_ms'] > allowed:
+                print(f"❌ {name} regressed: {result['median_ms']:.2f} ms > {allowed:.2f} ms "
+                      f"(baseline {baseline[name]} ms + {args.tolerance:.0%})")
+                failed = True
+        for name in errors:
+            if name in baseline:
+                print(f"❌ {name} has a baseline but now fails")
+                failed = True
+    else:
+        print(f"⚠️  No baseline for {args.rows} rows yet; run with --update-baseline to record one")
+
+    if not failed:
+        print("✅ Routes within budget")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Serializer benchmark
+
+Loads synthetic data into a scratch database and measures the per-row cost
+of turning officers and incidents into JSON, split into the two steps an API
+response takes:
+
+    dump    ORM object -> dict: hand-written dict literals (what the endpoints
+            used to do) against the compiled views from serializers.py
+    encode  list of dicts -> JSON bytes: Flask's default provider (json)
+            against the orjson provider, both with sorted keys
+
+Usage: python benchmarks/bench_serializers.py [--rows 10000] [--seed 42] [--runs 20] [--limit 1000]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import serializers
+
+
+def hand_written_officer(o, incident_counts):
+    return {
+        'id': o.id,
+        'badge_number': o.badge_number,
+        'first_name': o.first_name,
+        'last_name': o.last_name,
+        'department': o.current_department.name if o.current_department else None,
+        'status': o.status,
+        'incident_count': incident_counts.get(o.id, 0)
+    }
+
+
+def hand_written_incident(i):
+    return {
+        'id': i.id,
+        'officer_id': i.officer_id,
+        'officer_name': f"{i.officer.first_name} {i.officer.last_name}",
+        'date': i.incident_date.isoformat(),
+        'type': i.incident_type,
+        'location': i.location,
+        'description': i.description[:200]
+    }
+
+
+def time_per_row(fn, rows, runs):
+    """Median microseconds per row over ``runs`` passes"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6 / rows)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=1000, help='objects serialized per pass')
+    args = parser.parse_args()
+
+    print("🧾 Serializer benchmark")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import synthetic_data
+        from app import count_incidents, create_app
+        from models import db, upgrade_schema, Officer, Incident
+
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'bench.db'),
+            'RATELIMIT_ENABLED': False,
+            'METRICS_DIR': os.path.join(tmp, 'metrics'),
+            'JSON_BACKEND': 'json',
+        })
+        app.logger.setLevel(logging.CRITICAL)
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()
+            print(f"🧪 Loading {args.rows:,} synthetic rows (seed {args.seed})")
+            synthetic_data.load(args.rows, seed=args.seed, progress=lambda message: None)
+
+            officers = Officer.query.options(db.joinedload(Officer.current_department)).limit(args.limit).all()
+            incidents = Incident.query.options(db.joinedload(Incident.officer)).limit(args.limit).all()
+            counts = count_incidents(o.id for o in officers)
+
+            cases = [
+                ('officers', len(officers),
+                 lambda: [hand_written_officer(o, counts) for o in officers],
+                 lambda: serializers.OFFICER_LISTING.dump_many(officers, {'incident_counts': counts})),
+                ('incidents', len(incidents),
+                 lambda: [hand_written_incident(i) for i in incidents],
+                 lambda: serializers.INCIDENT_LISTING.dump_many(incidents)),
+            ]
+
+            providers = [('json', app.json)]
+            if serializers.orjson is not None:
+                providers.append(('orjson', serializers.OrjsonProvider(app)))
+            else:
+                print("⚠️  orjson is not installed; only the json encoder is measured")
+
+            print(f"\n{'':<10} {'dump µs/row':>24} {'encode µs/row':>26}")
+            print(f"{'':<10} {'hand-written':>12} {'compiled':>11} " + ' '.join(f'{name:>12}' for name, _ in providers))
+            for name, rows, hand_written, compiled in cases:
+                assert hand_written() == compiled(), f'{name}: the views do not match the hand-written dicts'
+                dumped = compiled()
+                dump_times = [time_per_row(hand_written, rows, args.runs), time_per_row(compiled, rows, args.runs)]
+                encode_times = [time_per_row(lambda: provider.response(dumped), rows, args.runs)
+                                for _, provider in providers]
+                print(f"{name:<10} {dump_times[0]:>12.2f} {dump_times[1]:>11.2f} "
+                      + ' '.join(f'{t:>12.2f}' for t in encode_times))
+                total_before = dump_times[0] + encode_times[0]
+                total_after = dump_times[1] + encode_times[-1]
+                print(f"{'':<10} total {total_before:.2f} -> {total_after:.2f} µs/row "
+                      f"({total_before / total_after:.1f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+SQLite write concurrency benchmark
+
+Runs concurrent writer processes (community reports followed by an audit log
+entry, through the app's own commit path) next to reader processes scanning
+the incident tables. The run is repeated with SQLite's default settings and
+with the tuned profile from sqlite_profile.py, then the script compares write
+throughput, commit latency, lock errors and busy retries.
+
+Usage: python benchmarks/bench_sqlite_writes.py [--writers 4] [--readers 2] [--duration 10] [--rows 20000]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# What a connection gets without the profile: rollback journal, full sync,
+# SQLite's 2 MB page cache, no mmap, and pysqlite's 5 second busy timeout
+DEFAULT_PROFILE = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_CACHE_SIZE_KB': 2000,
+    'SQLITE_MMAP_SIZE': 0,
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_BUSY_RETRIES': 0,
+}
+TUNED_PROFILE = {}  # the app's defaults
+
+READ_QUERY = """
+SELECT o.id, COUNT(i.id), SUM(LENGTH(i.description))
+FROM officers o JOIN incidents i ON i.officer_id = o.id
+GROUP BY o.id ORDER BY COUNT(i.id) DESC LIMIT 20
+"""
+
+
+def make_app(database, profile):
+    from app import create_app
+    app = create_app(dict(profile, SQLALCHEMY_DATABASE_URI=database, RATELIMIT_ENABLED=False,
+                          METRICS_DIR=os.path.join(os.path.dirname(database[len('sqlite:///'):]), 'metrics')))
+    app.logger.disabled = True
+    return app
+
+
+def writer(database, profile, deadline, results):
+    import metrics
+    import sqlite_profile
+    from app import log_audit
+    from models import CommunityReport
+    from sqlalchemy.exc import OperationalError
+
+    app = make_app(database, profile)
+    commits, errors, latencies = 0, 0, []
+    with app.test_request_context('/community_report', method='POST',
+                                  environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                report = CommunityReport(reporter_name='bench', report_type='complaint',
+                                         description='Concurrent write benchmark ' * 8)
+                sqlite_profile.commit_with_retry(report)
+                log_audit('community_reports', report.id, 'create')
+            except OperationalError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            commits += 1
+    retries = metrics.registry.counters.get(('badapples_db_busy_retries_total', ()), 0)
+    results.put({'commits': commits, 'errors': errors, 'latencies': latencies, 'retries': retries})
+
+
+def reader(database, profile, deadline, results):
+    from models import db
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    app = make_app(database, profile)
+    reads, errors = 0, 0
+    with app.app_context():
+        while time.time() < deadline:
+            try:
+                with db.engine.connect() as conn:
+                    conn.execute(text(READ_QUERY)).all()
+                reads += 1
+            except OperationalError:
+                errors += 1
+    results.put({'reads': reads, 'read_errors': errors})
+
+
+def prepare(database, rows, profile):
+    import synthetic_data
+    from models import db
+
+    app = make_app(database, profile)
+    with app.app_context():
+        db.create_all()
+        synthetic_data.load(rows, progress=None)
+        db.session.remove()
+        db.engine.dispose()
+
+
+def run(name, tmp, profile, args):
+    database = 'sqlite:///' + os.path.join(tmp, f'{name}.db')
+    prepare(database, args.rows, profile)
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    deadline = time.time() + args.duration
+    processes = ([context.Process(target=writer, args=(database, profile, deadline, results))
+                  for _ in range(args.writers)] +
+                 [context.Process(target=reader, args=(database, profile, deadline, results))
+                  for _ in range(args.readers)])
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(ms for r in collected for ms in r.get('latencies', []))
+    commits = sum(r.get('commits', 0) for r in collected)
+    summary = {
+        'writes_per_sec': commits / args.duration,
+        'p50_ms': statistics.median(latencies) if latencies else 0.0,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        'lock_errors': sum(r.get('errors', 0) + r.get('read_errors', 0) for r in collected),
+        'retries': sum(r.get('retries', 0) for r in collected),
+        'reads_per_sec': sum(r.get('reads', 0) for r in collected) / args.duration,
+    }
+    print(f"{name:<8} {summary['writes_per_sec']:8.1f} writes/s  p50 {summary['p50_ms']:7.1f} ms  "
+          f"p95 {summary['p95_ms']:7.1f} ms  {summary['lock_errors']:4d} lock errors  "
+          f"{summary['retries']:4d} retries  {summary['reads_per_sec']:7.1f} reads/s")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per profile')
+    parser.add_argument('--rows', type=int, default=20000, help='synthetic rows loaded before the run')
+    args = parser.parse_args()
+
+    print("⏱️  SQLite write concurrency benchmark")
+    print(f"   {args.writers} writers, {args.readers} readers, {args.duration:g}s per profile")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        default = run('default', tmp, DEFAULT_PROFILE, args)
+        tuned = run('tuned', tmp, TUNED_PROFILE, args)
+
+    if default['writes_per_sec']:
+        print(f"\n✅ Tuned profile: {tuned['writes_per_sec'] / default['writes_per_sec']:.1f}x write throughput")
+
+
+if __name__ == '__main__':
+    main()
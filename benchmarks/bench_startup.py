@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Startup time benchmark
+
+Times ``import app`` and ``create_app()`` in fresh interpreters, checks that
+optional subsystems (mail, OSINT helpers, forms) are not loaded at startup,
+and compares the medians with the stored baseline.
+
+Usage: python benchmarks/bench_startup.py [--runs 7] [--tolerance 0.25] [--update-baseline]
+Exits non-zero if startup regressed by more than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baselines', 'startup.json')
+
+# Modules that must only be imported when the feature using them runs
+LAZY_MODULES = ['requests', 'bs4', 'flask_mail', 'wtforms', 'flask_wtf', 'osint', 'forms']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once(env):
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown over the baseline (0.25 = 25%%)')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    print("⏱️  Startup benchmark")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+                   RATELIMIT_STORAGE_URI='sqlite:///' + os.path.join(tmp, 'ratelimit.db'))
+        measure_once(env)  # warm the filesystem and bytecode caches
+        samples = [measure_once(env) for _ in range(args.runs)]
+
+    results = {
+        'import_ms': statistics.median(s['import_ms'] for s in samples),
+        'create_app_ms': statistics.median(s['create_app_ms'] for s in samples),
+    }
+    loaded = sorted({name for s in samples for name in s['loaded']})
+
+    for key, value in results.items():
+        print(f"{key:<16} {value:8.1f} ms (median of {args.runs})")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({k: round(v, 1) for k, v in results.items()}, f, indent=2)
+            f.write('\n')
+        print(f"✅ Baseline written to {os.path.relpath(BASELINE_PATH, ROOT)}")
+        return 0
+
+    failed = False
+    if loaded:
+        print(f"❌ Optional modules loaded at startup: {', '.join(loaded)}")
+        failed = True
+
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        for key, value in results.items():
+            allowed = baseline[key] * (1 + args.tolerance)
+            if value > allowed:
+                print(f"❌ {key} regressed: {value:.1f} ms > {allowed:.1f} ms "
+                      f"(baseline {baseline[key]} ms + {args.tolerance:.0%})")
+                failed = True
+    else:
+        print("⚠️  No baseline yet; run with --update-baseline to record one")
+
+    if not failed:
+        print("✅ Startup within budget")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
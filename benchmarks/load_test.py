@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+End-to-end concurrent load test
+
+Runs the real application under a multi-worker WSGI server (gunicorn when it is
+installed, otherwise Werkzeug's forking server) against a scratch database of
+synthetic data and a local SMTP sink, then replays a weighted mix of reads,
+searches, community reports, evidence uploads and admin batch actions from
+concurrent clients. Reports throughput and p50/p95/p99 latency and error rate
+per route.
+
+Usage: python benchmarks/load_test.py [--rows 10000] [--workers 4] [--clients 16]
+                                      [--duration 30] [--mix read=50,search=25,report=10,upload=5,admin=10]
+                                      [--backend sqlite|postgresql] [--rate-limits] [--json results.json]
+"""
+
+import argparse
+import contextlib
+import http.cookiejar
+import json
+import os
+import random
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_MIX = 'read=50,search=25,report=10,upload=5,admin=10'
+ADMIN_USERNAME = 'loadtest-admin'
+ADMIN_PASSWORD = 'loadtest-admin'
+SEARCH_TERMS = ['Smith', 'Garcia', 'Lee', 'force', 'footage', 'Johnson', 'B0000', 'Harris']
+
+
+# --- Local SMTP sink ---------------------------------------------------------
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts every message and counts it"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 loadtest SMTP sink')
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line.rstrip(b'\r\n') == b'.':
+                    in_data = False
+                    with self.server.lock:
+                        self.server.messages += 1
+                    self.reply('250 OK queued')
+                continue
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.wfile.write(b'250-loadtest\r\n250-AUTH PLAIN LOGIN\r\n')
+                self.reply('250 8BITMIME')
+            elif command.startswith('AUTH'):
+                self.reply('235 Authentication successful')
+            elif command.startswith('DATA'):
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command.startswith('QUIT'):
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.lock = threading.Lock()
+        self.messages = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+# --- Server process ----------------------------------------------------------
+
+def serve(settings):
+    """Run the application with ``settings['workers']`` worker processes"""
+    from app import create_app
+
+    from sqlalchemy.orm import configure_mappers
+
+    app = create_app(settings['config'])
+    configure_mappers()  # once here rather than in every forked worker
+    workers = settings['workers']
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # Werkzeug forks a process per request, so import up front what a
+        # long-lived gunicorn worker would only import once
+        import flask_mail, forms  # noqa: F401
+        from werkzeug.serving import run_simple
+        run_simple('127.0.0.1', settings['port'], app, threaded=False,
+                   processes=workers, use_reloader=False)
+        return
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"127.0.0.1:{settings['port']}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('loglevel', 'warning')
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def free_port():
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def prepare_database(config, rows, seed):
+    import moderation_queue
+    import name_search
+    import synthetic_data
+    from app import create_app
+    from models import db, upgrade_schema, User
+
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        print(f"🧪 Loading {rows:,} synthetic rows (seed {seed})")
+        synthetic_data.load(rows, seed=seed, progress=None)
+        moderation_queue.backfill()
+        name_search.backfill()
+        admin = User(username=ADMIN_USERNAME, email='loadtest-admin@example.com', role='admin')
+        admin.set_password(ADMIN_PASSWORD)
+        db.session.add(admin)
+        db.session.commit()
+
+        from models import Officer, Incident
+        return {
+            'officers': [row[0] for row in db.session.query(Officer.id)],
+            'incidents': [row[0] for row in db.session.query(Incident.id)],
+        }
+
+
+# --- Client ------------------------------------------------------------------
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Measure the POST itself, not the page it redirects to"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content, mime_type) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                     f'filename="{filename}"\r\nContent-Type: {mime_type}\r\n\r\n'.encode() + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Client:
+    """One simulated user with its own cookie jar"""
+
+    def __init__(self, base_url, ids, rng, stats):
+        self.base_url = base_url
+        self.ids = ids
+        self.rng = rng
+        self.stats = stats
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect)
+        self.logged_in = False
+
+    def request(self, route, path, data=None, content_type=None):
+        request = urllib.request.Request(self.base_url + path, data=data)
+        if content_type:
+            request.add_header('Content-Type', content_type)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+        except OSError:
+            status = None
+        self.stats.record(route, (time.perf_counter() - started) * 1000, status)
+
+    def read(self):
+        choice = self.rng.random()
+        if choice < 0.3:
+            self.request('GET /', '/')
+        elif choice < 0.6:
+            page = self.rng.randint(1, max(1, len(self.ids['officers']) // 20))
+            self.request('GET /officers', f'/officers?page={page}')
+        else:
+            officer_id = self.rng.choice(self.ids['officers'])
+            self.request('GET /officer/<id>', f'/officer/{officer_id}')
+
+    def search(self):
+        term = self.rng.choice(SEARCH_TERMS)
+        if self.rng.random() < 0.5:
+            self.request('GET /search', '/search?' + urllib.parse.urlencode({'q': term}))
+        else:
+            self.request('GET /api/live_search', '/api/live_search?' + urllib.parse.urlencode({'q': term[:4]}))
+
+    def report(self):
+        data = urllib.parse.urlencode({
+            'incident_id': self.rng.choice(self.ids['incidents']),
+            'reporter_name': 'Load Test',
+            'report_type': 'witness',
+            'description': 'Synthetic community report submitted by the load test.',
+            'location': 'Main St',
+        }).encode()
+        self.request('POST /community_report', '/community_report', data,
+                     'application/x-www-form-urlencoded')
+
+    def upload(self):
+        content = os.urandom(self.rng.randint(2, 64) * 1024)
+        body, content_type = multipart({
+            'officer_id': self.rng.choice(self.ids['officers']),
+            'incident_id': 0,
+            'evidence_type': 'document',
+            'description': 'Synthetic upload',
+            'source': 'load test',
+        }, {'file': (f'loadtest-{uuid.uuid4().hex}.pdf', content, 'application/pdf')})
+        self.request('POST /add_evidence', '/add_evidence', body, content_type)
+
+    def admin(self):
+        if not self.logged_in:
+            data = urllib.parse.urlencode({'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}).encode()
+            self.request('POST /admin/login', '/admin/login', data, 'application/x-www-form-urlencoded')
+            self.logged_in = True
+            return
+        choice = self.rng.random()
+        if choice < 0.4:
+            self.request('GET /admin', '/admin')
+        elif choice < 0.6:
+            self.request('GET /admin/queue', '/admin/queue')
+        else:
+            endpoint = '/admin/batch_approve' if choice < 0.8 else '/admin/batch_reject'
+            record_ids = self.rng.sample(self.ids['incidents'], min(20, len(self.ids['incidents'])))
+            body = json.dumps({'table_name': 'incidents', 'record_ids': record_ids}).encode()
+            self.request(f'POST {endpoint}', endpoint, body, 'application/json')
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, route, elapsed_ms, status):
+        with self.lock:
+            self.samples.setdefault(route, []).append(elapsed_ms)
+            if status is None or status >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, weight = item.split('=')
+        if name not in ('read', 'search', 'report', 'upload', 'admin'):
+            raise argparse.ArgumentTypeError(f'unknown scenario {name!r}')
+        mix[name] = float(weight)
+    return mix
+
+
+def run_clients(base_url, ids, mix, clients, duration, seed):
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    names, weights = list(mix), list(mix.values())
+
+    def worker(index):
+        rng = random.Random(f'{seed}:{index}')
+        client = Client(base_url, ids, rng, stats)
+        while time.monotonic() < deadline:
+            getattr(client, rng.choices(names, weights)[0])()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('server exited during startup')
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start in time')
+
+
+def main():
+    if os.environ.get('LOADTEST_SERVE'):
+        serve(json.loads(os.environ['LOADTEST_SERVE']))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--backend', choices=['sqlite', 'postgresql'], default='sqlite',
+                        help='scratch database type; postgresql starts a throwaway local server')
+    parser.add_argument('--rate-limits', action='store_true', help='keep rate limiting enabled')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    print("🔥 Load test")
+    print("=" * 40)
+
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    with contextlib.ExitStack() as stack:
+        tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        if args.backend == 'postgresql':
+            from scratch_postgres import scratch_postgres
+            database = stack.enter_context(scratch_postgres())
+        else:
+            database = 'sqlite:///' + os.path.join(tmp, 'loadtest.db')
+        port = free_port()
+        config = {
+            'SECRET_KEY': 'loadtest',  # shared by every worker so sessions survive
+            'SQLALCHEMY_DATABASE_URI': database,
+            'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+            'METRICS_DIR': os.path.join(tmp, 'metrics'),
+            'PERF_PROFILE_DIR': os.path.join(tmp, 'profiles'),
+            'WTF_CSRF_ENABLED': False,
+            'RATELIMIT_ENABLED': args.rate_limits,
+            'RATELIMIT_STORAGE_URI': 'sqlite:///' + os.path.join(tmp, 'ratelimit.db'),
+            'MAIL_SERVER': '127.0.0.1',
+            'MAIL_PORT': sink.port,
+            'MAIL_USE_TLS': False,
+            'MAIL_USERNAME': 'loadtest',
+            'MAIL_PASSWORD': 'loadtest',
+        }
+        ids = prepare_database(config, args.rows, args.seed)
+
+        env = dict(os.environ, LOADTEST_SERVE=json.dumps(
+            {'config': config, 'workers': args.workers, 'port': port}))
+        server_log = open(os.path.join(tmp, 'server.log'), 'w')
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__)], cwd=ROOT, env=env,
+                                  stdout=server_log, stderr=subprocess.STDOUT)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            try:
+                wait_until_ready(base_url, server)
+            except RuntimeError:
+                with open(server_log.name) as f:
+                    print(f.read()[-4000:])
+                raise
+            print(f"🚀 {args.workers} workers, {args.clients} clients, {args.duration:g}s")
+            started = time.monotonic()
+            stats = run_clients(base_url, ids, args.mix, args.clients, args.duration, args.seed)
+            elapsed = time.monotonic() - started
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            server_log.close()
+        sink.shutdown()
+
+    total = sum(len(samples) for samples in stats.samples.values())
+    total_errors = sum(stats.errors.values())
+    results = {'throughput_rps': total / elapsed, 'requests': total, 'errors': total_errors,
+               'emails': sink.messages, 'routes': {}}
+
+    print(f"\n{'route':<28} {'count':>7} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for route in sorted(stats.samples):
+        samples = stats.samples[route]
+        errors = stats.errors.get(route, 0)
+        row = {
+            'count': len(samples),
+            'rps': len(samples) / elapsed,
+            'p50_ms': statistics.median(samples),
+            'p95_ms': percentile(samples, 0.95),
+            'p99_ms': percentile(samples, 0.99),
+            'error_rate': errors / len(samples),
+        }
+        results['routes'][route] = row
+        print(f"{route:<28} {row['count']:>7} {row['rps']:>7.1f} {row['p50_ms']:>6.1f}ms "
+              f"{row['p95_ms']:>6.1f}ms {row['p99_ms']:>6.1f}ms {row['error_rate']:>6.1%}")
+
+    print(f"\n📈 {results['throughput_rps']:.1f} requests/s, {total} requests, "
+          f"{total_errors} errors ({total_errors / max(1, total):.1%}), {sink.messages} emails delivered")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Throwaway local PostgreSQL server for benchmarks
+
+``with scratch_postgres() as url:`` runs initdb into a temporary directory,
+starts a server listening only on a Unix socket in that directory, creates a
+``badapples`` database and yields its URL. The server and its data are removed
+on exit. Needs the PostgreSQL server binaries (initdb, pg_ctl) on PATH or in
+PG_BIN, and psycopg installed.
+"""
+
+import contextlib
+import getpass
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+def _binary(name):
+    directory = os.getenv('PG_BIN')
+    path = os.path.join(directory, name) if directory else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise SystemExit(f"❌ {name} not found; install the PostgreSQL server or set PG_BIN")
+    return path
+
+
+@contextlib.contextmanager
+def scratch_postgres():
+    with tempfile.TemporaryDirectory(prefix='badapples-pg-') as tmp:
+        data = os.path.join(tmp, 'data')
+        user = getpass.getuser()
+        subprocess.run([_binary('initdb'), '-D', data, '-U', user, '-A', 'trust', '--no-sync'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([_binary('pg_ctl'), '-D', data, '-l', os.path.join(tmp, 'server.log'), '-w',
+                        '-o', f"-k {tmp} -c listen_addresses='' -c fsync=off", 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        try:
+            subprocess.run([_binary('createdb'), '-h', tmp, '-U', user, 'badapples'], check=True)
+            yield f'postgresql+psycopg://{user}@/badapples?host={tmp}'
+        finally:
+            subprocess.run([_binary('pg_ctl'), '-D', data, '-m', 'immediate', '-w', 'stop'],
+                           stdout=subprocess.DEVNULL)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Bad Apples Asset Build
+Minifies static/css and static/js, names the results by content hash and
+writes pre-compressed variants
+
+Usage: python build_assets.py [--static static] [--no-minify]
+
+Every .css and .js file is minified and written to static/build/ with the
+first 10 hex digits of its SHA-256 in the name (css/style.css becomes
+build/css/style.3f2a91c0de.css). Each file gets a .gz variant, and a .br
+variant when the brotli package is installed. build/manifest.json maps the
+source names to the built ones. assets.py reads it, so
+url_for('static', filename='css/style.css') links the current build and the
+file is served with an immutable one-year Cache-Control.
+
+Files from the previous build are kept, so pages cached before a deploy
+still find their assets. Older builds are deleted.
+
+The minifiers are deliberately conservative: they remove comments and
+indentation and collapse whitespace, but leave strings, template literals and
+line breaks alone, so JavaScript semicolon insertion is not affected.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import compression
+
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+SOURCES = ('css', 'js')
+
+WORD = re.compile(r'[\w$\\]')
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^') | {''}
+
+
+def minify_css(source):
+    out, i, n = [], 0, len(source)
+    pending_space = False
+    while i < n:
+        char = source[i]
+        if char in '"\'':
+            end = i + 1
+            while end < n and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            if pending_space and out and out[-1] not in '{};,>:(':
+                out.append(' ')
+            pending_space = False
+            out.append(source[i:end + 1])
+            i = end + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            pending_space = True
+        elif char.isspace():
+            pending_space = True
+            i += 1
+        else:
+            if char == '}' and out and out[-1] == ';':
+                out.pop()  # the last declaration needs no semicolon
+            if pending_space and out and out[-1] not in '{};,>:(' and char not in '{};,>)':
+                out.append(' ')
+            pending_space = False
+            out.append(char)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def minify_js(source):
+    out, i, n = [], 0, len(source)
+    pending, newline = False, False
+
+    def last():
+        return out[-1][-1] if out else ''
+
+    def emit(token):
+        nonlocal pending, newline
+        if newline and out:
+            out.append('\n')
+        elif pending and out:
+            before, after = last(), token[0]
+            if (WORD.match(before) and WORD.match(after)) or before + after in ('++', '--', '//'):
+                out.append(' ')
+        pending = newline = False
+        out.append(token)
+
+    while i < n:
+        char = source[i]
+        if char in '"\'`':
+            end = i + 1
+            while end < n and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            emit(source[i:end + 1])
+            i = end + 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            pending = True
+        elif char == '/' and last() in REGEX_PRECEDERS:
+            end, in_class = i + 1, False  # a regular expression literal
+            while end < n and (source[end] != '/' or in_class):
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                end += 1
+            match = re.match(r'[a-z]*', source[end + 1:])
+            emit(source[i:end + 1] + match.group())
+            i = end + 1 + match.end()
+        elif char == '\n':
+            newline = True  # kept, so automatic semicolon insertion still works
+            i += 1
+        elif char.isspace():
+            pending = True
+            i += 1
+        else:
+            end = i + 1
+            if WORD.match(char):
+                while end < n and WORD.match(source[end]):
+                    end += 1
+            emit(source[i:end])
+            i = end
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprinted_name(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def build(static_dir, minify=True):
+    """Build every asset; returns (manifest, bytes before, bytes after)"""
+    build_dir = os.path.join(static_dir, BUILD_DIR)
+    manifest_path = os.path.join(build_dir, MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)['files']
+    except (FileNotFoundError, ValueError, KeyError):
+        previous = {}
+
+    files, before, after = {}, 0, 0
+    for directory in SOURCES:
+        for root, _, names in os.walk(os.path.join(static_dir, directory)):
+            for name in sorted(names):
+                ext = os.path.splitext(name)[1]
+                if ext not in MINIFIERS:
+                    continue
+                source = os.path.join(root, name)
+                with open(source, encoding='utf-8') as f:
+                    text = f.read()
+                data = (MINIFIERS[ext](text) if minify else text).encode('utf-8')
+                relative = os.path.relpath(source, static_dir).replace(os.sep, '/')
+                built = f'{BUILD_DIR}/' + fingerprinted_name(relative, data)
+                if not os.path.exists(os.path.join(static_dir, built)):
+                    compression.write_with_variants(os.path.join(static_dir, built), data)
+                files[relative] = built
+                before += len(text.encode('utf-8'))
+                after += len(data)
+
+    manifest = {'files': files, 'previous': previous}
+    os.makedirs(build_dir, exist_ok=True)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    keep = set(files.values()) | set(previous.values())
+    for root, _, names in os.walk(build_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            for suffix in compression.SUFFIXES.values():
+                if relative.endswith(suffix):
+                    relative = relative[:-len(suffix)]
+            if name != MANIFEST and relative not in keep:
+                os.remove(path)
+    return manifest, before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted, pre-compressed static assets')
+    parser.add_argument('--static', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    parser.add_argument('--no-minify', action='store_true', help='fingerprint and compress only')
+    args = parser.parse_args()
+
+    print("📦 Bad Apples Asset Build")
+    print("=" * 40)
+    manifest, before, after = build(args.static, minify=not args.no_minify)
+    for source, built in manifest['files'].items():
+        print(f"   {source} -> {built}")
+    print(f"✅ {len(manifest['files'])} assets, {before:,} -> {after:,} bytes minified "
+          f"({', '.join(compression.available())} variants)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Change feed for mirrors.
+
+Every ORM flush that inserts, updates or deletes an officer, department,
+incident, taxpayer cost or verified evidence record appends a ChangeLog
+entry in the same transaction. Its id is the feed cursor. ``changes(since)``
+returns the records changed after a cursor, each once, in their current
+state. A record that no longer exists, or evidence that is no longer
+verified, is returned as a tombstone (``"op": "delete"``) that carries no
+data.
+
+``compact()`` deletes the entries that a newer entry for the same record
+supersedes, so the log stays about as long as the number of records. It also
+purges tombstones older than CHANGE_FEED_TOMBSTONE_DAYS. A mirror whose cursor
+is older than the purged tombstones may have missed deletions, so it gets
+``ResyncRequired`` and must rebuild from cursor 0.
+
+Rows written outside the ORM (synthetic data, migrations) are picked up by
+``backfill()``, which ``flask init-db`` runs.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, event, exists, func, insert, literal, select
+from sqlalchemy.orm import Session, aliased
+
+from models import db, ChangeLog, ChangeLogCompaction, Officer, Department, Incident, TaxpayerCost, Evidence
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+DEFAULT_TOMBSTONE_DAYS = 90
+DEFAULT_SETTLE_SECONDS = 5
+COMPACTION_BATCH = 5000
+
+# Published tables and the columns mirrors receive
+FEED_TABLES = {
+    'departments': (Department, None),
+    'officers': (Officer, None),
+    'incidents': (Incident, None),
+    'taxpayer_costs': (TaxpayerCost, None),
+    # metadata only: no storage path and no uploader contact details
+    'evidence': (Evidence, ('id', 'officer_id', 'incident_id', 'evidence_type', 'file_name', 'file_size',
+                            'mime_type', 'description', 'source', 'verified', 'created_at')),
+}
+TABLE_NAMES = {model: table_name for table_name, (model, _) in FEED_TABLES.items()}
+
+
+class ResyncRequired(Exception):
+    """The cursor is older than the oldest tombstone still kept"""
+
+
+def _published(obj):
+    return not isinstance(obj, Evidence) or bool(obj.verified)
+
+
+def _was_published(obj):
+    if not isinstance(obj, Evidence):
+        return True
+    history = db.inspect(obj).attrs.verified.history
+    return bool(history.deleted[0]) if history.deleted else bool(obj.verified)
+
+
+def _officer_id(obj):
+    return obj.id if isinstance(obj, Officer) else getattr(obj, 'officer_id', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_changes(session, flush_context):
+    """Log the flushed changes to published records in the same transaction"""
+    changes = {}
+    for obj in session.new:
+        if type(obj) in TABLE_NAMES and _published(obj):
+            changes[obj] = 'upsert'
+    for obj in session.dirty:
+        if type(obj) in TABLE_NAMES and session.is_modified(obj, include_collections=False):
+            if _published(obj):
+                changes[obj] = 'upsert'
+            elif _was_published(obj):  # evidence that lost its verification
+                changes[obj] = 'delete'
+    for obj in session.deleted:
+        if type(obj) in TABLE_NAMES and _was_published(obj):
+            changes[obj] = 'delete'
+    if changes:
+        now = datetime.utcnow()
+        session.connection().execute(insert(ChangeLog), [
+            {'table_name': TABLE_NAMES[type(obj)], 'record_id': obj.id, 'operation': operation,
+             'officer_id': _officer_id(obj), 'changed_at': now}
+            for obj, operation in changes.items()
+        ])
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def serialize(table_name, obj):
+    """The columns of ``obj`` published for ``table_name``"""
+    model, columns = FEED_TABLES[table_name]
+    columns = columns or [column.key for column in model.__mapper__.column_attrs]
+    return {column: _value(getattr(obj, column)) for column in columns}
+
+
+def horizon():
+    """Cursors below this have missed purged tombstones"""
+    return db.session.execute(select(func.max(ChangeLogCompaction.purged_through))).scalar() or 0
+
+
+def _check_cursor(since):
+    if since and since < horizon():
+        raise ResyncRequired(f'Cursor {since} is older than the change log; resync from 0')
+
+
+def latest_cursor(settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """The newest cursor that changes() would serve now"""
+    return db.session.execute(
+        select(func.max(ChangeLog.id))
+        .where(ChangeLog.changed_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+    ).scalar() or 0
+
+
+def entries_between(since, through):
+    """(table_name, record_id, operation, officer_id) logged after ``since`` up to ``through``"""
+    _check_cursor(since)
+    return db.session.execute(
+        select(ChangeLog.table_name, ChangeLog.record_id, ChangeLog.operation, ChangeLog.officer_id)
+        .where(ChangeLog.id > since, ChangeLog.id <= through)
+    ).all()
+
+
+def changes(since=0, limit=DEFAULT_PAGE_SIZE, settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """Records changed after cursor ``since``; returns (changes, next_cursor, has_more).
+
+    Entries younger than ``settle_seconds`` are held back, so a transaction
+    that took a lower id but committed later is not skipped.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    _check_cursor(since)
+
+    entries = db.session.execute(
+        select(ChangeLog.id, ChangeLog.table_name, ChangeLog.record_id)
+        .where(ChangeLog.id > since,
+               ChangeLog.changed_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}  # each record once, at its newest cursor in this page
+    for cursor, table_name, record_id in entries:
+        latest.pop((table_name, record_id), None)
+        latest[(table_name, record_id)] = cursor
+
+    records = {}
+    for table_name, (model, _) in FEED_TABLES.items():
+        record_ids = [record_id for (name, record_id) in latest if name == table_name]
+        if record_ids:
+            rows = db.session.execute(select(model).where(model.id.in_(record_ids))).scalars()
+            records.update(((table_name, row.id), row) for row in rows if _published(row))
+
+    feed = []
+    for (table_name, record_id), cursor in latest.items():
+        change = {'cursor': cursor, 'table': table_name, 'id': record_id}
+        row = records.get((table_name, record_id))
+        if row is None:
+            change['op'] = 'delete'
+        else:
+            change.update(op='upsert', record=serialize(table_name, row))
+        feed.append(change)
+    next_cursor = entries[-1].id if entries else since
+    return feed, next_cursor, has_more
+
+
+def backfill():
+    """Log every published record that has no change log entry yet.
+
+    Returns the number of entries created.
+    """
+    created = 0
+    now = datetime.utcnow()
+    for table_name, (model, _) in FEED_TABLES.items():
+        logged = exists().where(ChangeLog.table_name == table_name, ChangeLog.record_id == model.id)
+        officer_id = model.id if model is Officer else getattr(model, 'officer_id', literal(None))
+        query = select(literal(table_name), model.id, literal('upsert'), officer_id, literal(now)).where(~logged)
+        if model is Evidence:
+            query = query.where(Evidence.verified.is_(True))
+        result = db.session.execute(
+            insert(ChangeLog).from_select(['table_name', 'record_id', 'operation', 'officer_id', 'changed_at'], query))
+        created += result.rowcount
+    db.session.commit()
+    return created
+
+
+def compact(tombstone_days=DEFAULT_TOMBSTONE_DAYS, batch=COMPACTION_BATCH):
+    """Drop superseded entries and old tombstones in short transactions.
+
+    Returns (superseded entries removed, tombstones removed).
+    """
+    record = ChangeLogCompaction(purged_through=horizon(), superseded_removed=0, tombstones_removed=0)
+
+    newer = aliased(ChangeLog)
+    superseded = select(ChangeLog.id).where(exists().where(
+        newer.table_name == ChangeLog.table_name,
+        newer.record_id == ChangeLog.record_id,
+        newer.id > ChangeLog.id,
+    )).limit(batch)
+    while True:
+        ids = db.session.execute(superseded).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(ChangeLog).where(ChangeLog.id.in_(ids)))
+        record.superseded_removed += len(ids)
+        db.session.add(record)
+        db.session.commit()
+
+    cutoff = datetime.utcnow() - timedelta(days=tombstone_days)
+    old_tombstones = (select(ChangeLog.id)
+                      .where(ChangeLog.operation == 'delete', ChangeLog.changed_at < cutoff)
+                      .order_by(ChangeLog.id).limit(batch))
+    while True:
+        ids = db.session.execute(old_tombstones).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(ChangeLog).where(ChangeLog.id.in_(ids)))
+        # the horizon moves in the same transaction that removes the tombstones
+        record.purged_through = max(record.purged_through, ids[-1])
+        record.tombstones_removed += len(ids)
+        db.session.add(record)
+        db.session.commit()
+    return record.superseded_removed, record.tombstones_removed
+
+
+def init_app(app):
+    app.config.setdefault('CHANGE_FEED_TOMBSTONE_DAYS', DEFAULT_TOMBSTONE_DAYS)
+    app.config.setdefault('CHANGE_FEED_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
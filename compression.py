@@ -0,0 +1,232 @@
+"""
+gzip and brotli encodings, for pre-compressed files and for responses.
+
+Brotli is optional: without the ``brotli`` package only .gz copies are
+written and responses are never brotli-encoded.
+
+Pre-compressed files are served directly by the web server (nginx
+``gzip_static`` and ``brotli_static``), so they are compressed once at the
+highest levels.
+
+``init_app`` compresses dynamic responses (HTML, JSON, CSV) as they leave the
+app, at the cheaper COMPRESS_LEVELS (see benchmarks/bench_compression.py).
+The encoding is negotiated from Accept-Encoding: br, then gzip, then deflate,
+unless the client ranks them differently. Responses smaller than
+COMPRESS_MIN_SIZE, already encoded, served from files or marked no-transform
+are left alone. Streamed responses are compressed chunk by chunk and flushed
+every STREAM_FLUSH_BYTES, so the client keeps receiving data while the
+response is generated.
+"""
+
+import gzip
+import os
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+MIN_SIZE = 256  # smaller files gain nothing from compression
+SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+# Dynamic responses: a level per encoding, chosen for CPU per byte saved
+DEFAULT_LEVELS = {'br': 5, 'gzip': 5, 'deflate': 5}
+DEFAULT_MIN_SIZE = 1024  # below this, the headers and the CPU cost more than is saved
+STREAM_FLUSH_BYTES = 16 * 1024
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+
+def available():
+    """Encodings that can be produced here"""
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+
+def compress(data, encoding, brotli_quality=BROTLI_QUALITY):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)  # mtime=0: same input, same bytes
+    if encoding == 'br' and brotli:
+        return brotli.compress(data, quality=brotli_quality)
+    raise ValueError(f'Unsupported encoding {encoding}')
+
+
+def _write_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_with_variants(path, data, brotli_quality=BROTLI_QUALITY):
+    """Write ``data`` to ``path`` plus a compressed copy per available encoding.
+
+    Copies that would not be smaller are removed rather than written. Quality
+    11 costs about ten times as much CPU as 9 for a few percent smaller files,
+    so files rewritten often can ask for less.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(path, data)
+    for encoding, suffix in SUFFIXES.items():
+        variant = path + suffix
+        compressed = None
+        if encoding in available() and len(data) >= MIN_SIZE:
+            compressed = compress(data, encoding, brotli_quality)
+        if compressed is not None and len(compressed) < len(data):
+            _write_atomic(variant, compressed)
+        elif os.path.exists(variant):
+            os.remove(variant)
+
+
+def remove_with_variants(path):
+    for name in [path] + [path + suffix for suffix in SUFFIXES.values()]:
+        if os.path.exists(name):
+            os.remove(name)
+
+
+class _ZlibEncoder:
+    """gzip (wbits 31) or zlib-wrapped deflate (wbits 15) as a stream"""
+
+    def __init__(self, level, wbits):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def encoder(encoding, level):
+    """A streaming encoder with compress(), flush() and finish()"""
+    if encoding == 'gzip':
+        return _ZlibEncoder(level, 31)
+    if encoding == 'deflate':
+        return _ZlibEncoder(level, 15)
+    if encoding == 'br' and brotli:
+        return _BrotliEncoder(level)
+    raise ValueError(f'Unsupported encoding {encoding}')
+
+
+def parse_levels(value):
+    """'br:4,gzip:6' -> {'br': 4, 'gzip': 6}; encodings left out are not used"""
+    if not value:
+        return dict(DEFAULT_LEVELS)
+    levels = {}
+    for item in value.split(','):
+        encoding, _, level = item.strip().partition(':')
+        if encoding not in DEFAULT_LEVELS:
+            raise ValueError(f'Unsupported encoding {encoding}')
+        levels[encoding] = int(level) if level else DEFAULT_LEVELS[encoding]
+    return levels
+
+
+def negotiate(accept_encodings, levels):
+    """The encoding to use for a request's Accept-Encoding, or None.
+
+    The client's q-values decide; ties go to the first of br, gzip, deflate
+    that is configured.
+    """
+    best, best_quality = None, 0
+    for encoding in ('br', 'gzip', 'deflate'):
+        if encoding not in levels or (encoding == 'br' and not brotli):
+            continue
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _stream(chunks, stream_encoder, flush_bytes):
+    pending = 0
+    try:
+        for chunk in chunks:
+            data = stream_encoder.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_bytes:
+                data += stream_encoder.flush()  # the client can decode everything sent so far
+                pending = 0
+            if data:
+                yield data
+        yield stream_encoder.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()  # ends stream_with_context and releases the request context
+
+
+def _compressible(response, config):
+    return (response.status_code == 200
+            and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in config['COMPRESS_MIMETYPES']
+            and 'no-transform' not in response.headers.get('Cache-Control', ''))
+
+
+def compress_response(response, accept_encodings, config):
+    """Encode ``response`` in place for the client; returns the response"""
+    if not _compressible(response, config):
+        return response
+    response.vary.add('Accept-Encoding')
+    levels = config['COMPRESS_LEVELS']
+    encoding = negotiate(accept_encodings, levels)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _stream(response.iter_encoded(), encoder(encoding, levels[encoding]),
+                                    config['COMPRESS_STREAM_FLUSH_BYTES'])
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        stream_encoder = encoder(encoding, levels[encoding])
+        response.set_data(stream_encoder.compress(data) + stream_encoder.finish())
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:  # the encoded bytes differ, so a strong validator must too
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def init_app(app):
+    """Compress responses on the way out. Call after the other extensions:
+    after_request hooks run in reverse order, so the request timings include
+    the compression."""
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_LEVELS', dict(DEFAULT_LEVELS))
+    app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+    app.config.setdefault('COMPRESS_STREAM_FLUSH_BYTES', STREAM_FLUSH_BYTES)
+    app.config.setdefault('COMPRESS_MIMETYPES', COMPRESSIBLE_TYPES)
+    if not app.config['COMPRESS_ENABLED']:
+        return
+
+    @app.after_request
+    def compress(response):
+        if request.method == 'HEAD':
+            return response
+        return compress_response(response, request.accept_encodings, app.config)
@@ -0,0 +1,124 @@
+"""
+Database backend support: engine options and dialect-portable SQL.
+
+SQLite is the default. For PostgreSQL, set DATABASE_URL to a
+``postgresql://`` URL (``postgres://`` from hosting providers works too); it
+is served through psycopg 3 with a connection pool sized by DB_POOL_SIZE and
+DB_MAX_OVERFLOW, connections checked with a ping before use and recycled
+after DB_POOL_RECYCLE seconds, and every statement limited to
+DB_STATEMENT_TIMEOUT_MS.
+
+SQL that differs between backends lives here as SQLAlchemy constructs that
+compile per dialect, so views stay free of backend checks.
+"""
+
+import os
+import sqlite3
+
+from sqlalchemy import Boolean, String, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+DEFAULT_URI = 'sqlite:///badapples.db'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_RECYCLE = 1800  # seconds; below typical server and proxy idle timeouts
+DEFAULT_STATEMENT_TIMEOUT_MS = 30000
+
+# PostgreSQL lock_not_available and deadlock_detected
+LOCK_SQLSTATES = {'55P03', '40P01'}
+
+
+def normalize_uri(uri):
+    """Route PostgreSQL URLs without an explicit driver to psycopg 3"""
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    if uri.startswith('postgresql://'):
+        uri = 'postgresql+psycopg://' + uri[len('postgresql://'):]
+    return uri
+
+
+def async_url(url):
+    """The same database through an asyncio driver: aiosqlite, or psycopg's async mode"""
+    url = make_url(url)
+    drivers = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+psycopg'}
+    if url.get_backend_name() not in drivers:
+        raise ValueError(f'No asyncio driver for {url.get_backend_name()}')
+    return url.set(drivername=drivers[url.get_backend_name()])
+
+
+def backend(uri):
+    """Dialect name of a database URL, e.g. 'sqlite' or 'postgresql'"""
+    return make_url(uri).get_backend_name()
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for the database URL, tuned from environment variables"""
+    if backend(uri) != 'postgresql':
+        return {}
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', DEFAULT_STATEMENT_TIMEOUT_MS))
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE)),
+        'pool_pre_ping': True,
+        'connect_args': {
+            'application_name': 'badapples',
+            'options': f'-c statement_timeout={statement_timeout}',
+        },
+    }
+
+
+def is_lock_error(error):
+    """Whether a DBAPI error means the statement lost a wait for a lock"""
+    if isinstance(error, sqlite3.OperationalError):
+        return 'locked' in str(error) or 'busy' in str(error)
+    return getattr(error, 'sqlstate', None) in LOCK_SQLSTATES
+
+
+def init_app(app):
+    """Normalize the database URL and tune the engine for its backend. Call before db.init_app()."""
+    uri = app.config['SQLALCHEMY_DATABASE_URI'] = normalize_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(uri))
+
+
+class year_month(FunctionElement):
+    """A date or datetime column as a 'YYYY-MM' string, for grouping by month"""
+    type = String()
+    inherit_cache = True
+
+
+@compiles(year_month)
+def _year_month_default(element, compiler, **kw):
+    return compiler.process(func.strftime('%Y-%m', *element.clauses), **kw)
+
+
+@compiles(year_month, 'postgresql')
+def _year_month_postgresql(element, compiler, **kw):
+    return compiler.process(func.to_char(*element.clauses, 'YYYY-MM'), **kw)
+
+
+@compiles(year_month, 'mysql')
+def _year_month_mysql(element, compiler, **kw):
+    return compiler.process(func.date_format(*element.clauses, '%Y-%m'), **kw)
+
+
+class text_contains(FunctionElement):
+    """Case-insensitive substring match of a column against a search term"""
+    type = Boolean()
+    inherit_cache = True
+    _is_implicitly_boolean = True  # a condition in itself; no "= 1" on SQLite
+
+
+@compiles(text_contains)
+def _text_contains_default(element, compiler, **kw):
+    column, term = element.clauses
+    return compiler.process(column.icontains(term), **kw)
+
+
+@compiles(text_contains, 'sqlite')
+def _text_contains_sqlite(element, compiler, **kw):
+    # SQLite's LIKE already ignores ASCII case; lower() would only add work per row
+    column, term = element.clauses
+    return compiler.process(column.contains(term), **kw)
@@ -0,0 +1,158 @@
+from flask_wtf import FlaskForm
+from wtforms import StringField, TextAreaField, DateField, SelectField, FileField, BooleanField, SubmitField, FloatField, IntegerField
+from wtforms.validators import DataRequired, Email, Optional, NumberRange
+
+class OfficerForm(FlaskForm):
+    badge_number = StringField('Badge Number', validators=[DataRequired()])
+    first_name = StringField('First Name', validators=[DataRequired()])
+    last_name = StringField('Last Name', validators=[DataRequired()])
+    middle_name = StringField('Middle Name')
+    date_of_birth = DateField('Date of Birth')
+    department_id = SelectField('Department', coerce=int)
+    rank = StringField('Rank')
+    hire_date = DateField('Hire Date')
+    status = SelectField('Status', choices=[('active', 'Active'), ('suspended', 'Suspended'), ('terminated', 'Terminated'), ('retired', 'Retired')])
+    submit = SubmitField('Add Officer')
+
+class IncidentForm(FlaskForm):
+    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
+    incident_date = DateField('Incident Date', validators=[DataRequired()])
+    incident_type = StringField('Incident Type', validators=[DataRequired()])
+    description = TextAreaField('Description', validators=[DataRequired()])
+    location = StringField('Location')
+    outcome = StringField('Outcome')
+    charges_filed = BooleanField('Charges Filed')
+    conviction_date = DateField('Conviction Date')
+    sentence = TextAreaField('Sentence')
+    settlement_amount = StringField('Settlement Amount')
+    case_number = StringField('Case Number')
+    court_jurisdiction = StringField('Court Jurisdiction')
+    source = StringField('Source')
+    source_url = StringField('Source URL')
+    submit = SubmitField('Add Incident')
+
+class EvidenceForm(FlaskForm):
+    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
+    incident_id = SelectField('Incident (Optional)', coerce=int)
+    evidence_type = SelectField('Evidence Type', choices=[('photo', 'Photo'), ('video', 'Video'), ('document', 'Document'), ('audio', 'Audio')], validators=[DataRequired()])
+    file = FileField('File', validators=[DataRequired()])
+    description = TextAreaField('Description')
+    source = StringField('Source')
+    uploader_name = StringField('Your Name')
+    uploader_email = StringField('Your Email')
+    submit = SubmitField('Upload Evidence')
+
+class CommunityReportForm(FlaskForm):
+    incident_id = SelectField('Related Incident (Optional)', coerce=int)
+    reporter_name = StringField('Your Name')
+    reporter_email = StringField('Your Email')
+    reporter_phone = StringField('Your Phone')
+    report_type = SelectField('Report Type', choices=[('witness', 'Witness'), ('victim', 'Victim'), ('community', 'Community Member')])
+    description = TextAreaField('Description', validators=[DataRequired()])
+    incident_date = DateField('Incident Date')
+    location = StringField('Location')
+    contact_ok = BooleanField('OK to contact for follow-up')
+    submit = SubmitField('Submit Report')
+
+class DepartmentForm(FlaskForm):
+    name = StringField('Department Name', validators=[DataRequired()])
+    jurisdiction = StringField('Jurisdiction')
+    location = StringField('Location')
+    state = StringField('State')
+    website = StringField('Website')
+    phone = StringField('Phone')
+    submit = SubmitField('Add Department')
+
+class TaxpayerCostForm(FlaskForm):
+    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
+    cost_type = SelectField('Cost Type', choices=[
+        ('lawsuit', 'Lawsuit Settlement'),
+        ('fine', 'Fine/Penalty'),
+        ('conviction', 'Conviction Costs'),
+        ('disciplinary', 'Disciplinary Action'),
+        ('training', 'Retraining Costs'),
+        ('other', 'Other')
+    ], validators=[DataRequired()])
+    amount = FloatField('Amount ($)', validators=[DataRequired(), NumberRange(min=0)])
+    description = TextAreaField('Description', validators=[DataRequired()])
+    case_number = StringField('Case Number')
+    court_jurisdiction = StringField('Court/Jurisdiction')
+    date_occurred = DateField('Date Occurred')
+    date_paid = DateField('Date Paid')
+    source = StringField('Source')
+    source_url = StringField('Source URL')
+    submit = SubmitField('Add Cost')
+
+class OSINTProfileForm(FlaskForm):
+    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
+    platform = SelectField('Platform', choices=[
+        ('facebook', 'Facebook'),
+        ('twitter', 'Twitter'),
+        ('instagram', 'Instagram'),
+        ('linkedin', 'LinkedIn'),
+        ('tiktok', 'TikTok'),
+        ('youtube', 'YouTube'),
+        ('other', 'Other')
+    ], validators=[DataRequired()])
+    username = StringField('Username/Handle')
+    profile_url = StringField('Profile URL')
+    full_name = StringField('Full Name')
+    bio = TextAreaField('Bio/Description')
+    location = StringField('Location')
+    confidence_score = FloatField('Confidence Score (0-1)', validators=[NumberRange(min=0, max=1)])
+    notes = TextAreaField('Notes')
+    submit = SubmitField('Add OSINT Profile')
+
+class DisputeForm(FlaskForm):
+    table_name = StringField('Record Type', validators=[DataRequired()])
+    record_id = IntegerField('Record ID', validators=[DataRequired()])
+    dispute_type = SelectField('Dispute Type', choices=[
+        ('factual_error', 'Factual Error'),
+        ('privacy_violation', 'Privacy Violation'),
+        ('harassment', 'Harassment'),
+        ('inappropriate', 'Inappropriate Content'),
+        ('duplicate', 'Duplicate Information'),
+        ('other', 'Other')
+    ], validators=[DataRequired()])
+    description = TextAreaField('Dispute Description', validators=[DataRequired()])
+    disputer_name = StringField('Your Name')
+    disputer_email = StringField('Your Email')
+    disputer_phone = StringField('Your Phone')
+    evidence_provided = TextAreaField('Evidence Supporting Dispute')
+    submit = SubmitField('Submit Dispute')
+
+class AdminLoginForm(FlaskForm):
+    username = StringField('Username', validators=[DataRequired()])
+    password = StringField('Password', validators=[DataRequired()])
+    submit = SubmitField('Login')
+
+class AdminRegisterForm(FlaskForm):
+    username = StringField('Username', validators=[DataRequired()])
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = StringField('Password', validators=[DataRequired()])
+    confirm_password = StringField('Confirm Password', validators=[DataRequired()])
+    role = SelectField('Role', choices=[('moderator', 'Moderator'), ('admin', 'Administrator')], validators=[DataRequired()])
+    submit = SubmitField('Register Admin User')
+
+class VehicleForm(FlaskForm):
+    officer_id = SelectField('Officer', coerce=int, validators=[DataRequired()])
+    vehicle_type = SelectField('Vehicle Type', choices=[
+        ('patrol', 'Patrol Vehicle'),
+        ('personal', 'Personal Vehicle'),
+        ('unmarked', 'Unmarked'),
+        ('undercover', 'Undercover'),
+        ('other', 'Other')
+    ], validators=[DataRequired()])
+    make = StringField('Make', validators=[DataRequired()])
+    model = StringField('Model', validators=[DataRequired()])
+    year = IntegerField('Year', validators=[Optional(), NumberRange(min=1900, max=2030)])
+    color = StringField('Color', validators=[DataRequired()])
+    license_plate = StringField('License Plate')
+    state = StringField('State (2 letters)', validators=[Optional()])
+    vin = StringField('VIN (17 characters)', validators=[Optional()])
+    is_unmarked = BooleanField('Is Unmarked Vehicle')
+    description = TextAreaField('Description/Notes')
+    last_seen_location = StringField('Last Seen Location')
+    last_seen_date = DateField('Last Seen Date', validators=[Optional()])
+    source = StringField('Source of Information')
+    submit = SubmitField('Add Vehicle')
@@ -0,0 +1,88 @@
+"""
+Live search: officers, incidents and vehicles matching what is typed in the
+search box.
+
+The Flask view (/api/live_search) and the ASGI server (asgi.py) run the same
+three statements through the same serializer views, with ``search`` and
+``search_async`` respectively, so both return identical results. When fewer
+than RESULTS_PER_TYPE officers contain the query, the rest are filled with
+similar names from the name index (see name_search.py).
+"""
+
+from sqlalchemy import or_, select
+
+import database
+import name_search
+import serializers
+from models import Officer, Incident, Vehicle
+
+MIN_QUERY_LENGTH = 3
+RESULTS_PER_TYPE = 5
+RATE_LIMIT = '60 per minute'
+
+
+def empty():
+    return {'officers': [], 'incidents': [], 'vehicles': []}
+
+
+def statements(query):
+    """name -> (statement, serializer view) for each result type"""
+    officers = (select(Officer)
+                .options(*serializers.OFFICER_SEARCH.load_options())
+                .where(or_(database.text_contains(Officer.first_name, query),
+                           database.text_contains(Officer.last_name, query),
+                           database.text_contains(Officer.badge_number, query)))
+                .limit(RESULTS_PER_TYPE))
+    incidents = (select(Incident)
+                 .options(*serializers.INCIDENT_SEARCH.load_options())
+                 .where(or_(database.text_contains(Incident.incident_type, query),
+                            database.text_contains(Incident.description, query)))
+                 .limit(RESULTS_PER_TYPE))
+    vehicles = (select(Vehicle)
+                .options(*serializers.VEHICLE_SEARCH.load_options())
+                .where(or_(database.text_contains(Vehicle.make, query),
+                           database.text_contains(Vehicle.model, query),
+                           database.text_contains(Vehicle.license_plate, query),
+                           database.text_contains(Vehicle.color, query)))
+                .where(Vehicle.is_active.is_(True))
+                .limit(RESULTS_PER_TYPE))
+    return {
+        'officers': (officers, serializers.OFFICER_SEARCH),
+        'incidents': (incidents, serializers.INCIDENT_SEARCH),
+        'vehicles': (vehicles, serializers.VEHICLE_SEARCH),
+    }
+
+
+def close_matches_statement(query):
+    statement = name_search.candidates(query)
+    return statement if statement is None else statement.options(*serializers.OFFICER_SEARCH.load_options())
+
+
+def close_matches(query, candidates, found):
+    """Similar officers that fill the officer results up to RESULTS_PER_TYPE"""
+    ranked = name_search.rank(query, candidates, RESULTS_PER_TYPE - len(found), {officer['id'] for officer in found})
+    return serializers.OFFICER_SEARCH.dump_many(officer for officer, _ in ranked)
+
+
+def search(session, query):
+    if len(query) < MIN_QUERY_LENGTH:
+        return empty()
+    results = {name: view.dump_many(session.execute(statement).scalars())
+               for name, (statement, view) in statements(query).items()}
+    statement = close_matches_statement(query)
+    if len(results['officers']) < RESULTS_PER_TYPE and statement is not None:
+        results['officers'] += close_matches(query, session.execute(statement).scalars(), results['officers'])
+    return results
+
+
+async def search_async(session, query):
+    """``search`` on an AsyncSession"""
+    if len(query) < MIN_QUERY_LENGTH:
+        return empty()
+    results = {}
+    for name, (statement, view) in statements(query).items():
+        results[name] = view.dump_many((await session.execute(statement)).scalars())
+    statement = close_matches_statement(query)
+    if len(results['officers']) < RESULTS_PER_TYPE and statement is not None:
+        results['officers'] += close_matches(query, (await session.execute(statement)).scalars(), results['officers'])
+    return results
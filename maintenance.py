@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Bad Apples Database Maintenance
+Off-peak ANALYZE, incremental vacuum and integrity checks, plus the per-table
+size and fragmentation statistics shown on the admin maintenance page
+
+Usage: python maintenance.py run [--force] [--task optimize|vacuum|changes|stats|integrity] [--loop]
+       python maintenance.py status
+       python maintenance.py stats
+       python maintenance.py enable-incremental-vacuum
+
+``run`` only starts tasks that are due and only inside MAINTENANCE_WINDOW
+(default 02:00-05:00 server time), so it is safe to call from cron every
+15 minutes, or keep it running with --loop. A lock file stops two runs from
+overlapping, and the results go to MAINTENANCE_STATE
+(instance/maintenance.json).
+
+None of the tasks holds the write lock for long:
+
+- optimize: ``PRAGMA optimize`` with an analysis_limit, or a bounded ANALYZE
+  on a database that was never analyzed.
+- vacuum: ``PRAGMA incremental_vacuum`` in batches of
+  MAINTENANCE_VACUUM_PAGES pages. Each batch is its own short transaction,
+  and the task stops when the window ends. This needs auto_vacuum=INCREMENTAL.
+  ``enable-incremental-vacuum`` switches to it with one full VACUUM, which
+  locks the database for the whole rebuild, so run it during downtime.
+- changes: compacts the change feed log (see change_feed.py) in batches.
+- stats: per-table sizes, unused bytes and out-of-order pages from dbstat.
+- integrity: ``PRAGMA quick_check``, a read transaction that does not block
+  writers in WAL mode.
+
+On PostgreSQL the tasks run ANALYZE and a plain (non-FULL) VACUUM, and the
+statistics come from pg_stat_user_tables.
+"""
+
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_WINDOW = '02:00-05:00'
+DEFAULT_VACUUM_PAGES = 256
+DEFAULT_MAX_SECONDS = 600  # forced runs outside the window
+ANALYSIS_LIMIT = 1000  # rows sampled per index by ANALYZE
+BATCH_PAUSE_SECONDS = 0.05  # lets waiting writers in between vacuum batches
+CHECK_INTERVAL_SECONDS = 300  # --loop
+TASKS = (
+    ('optimize', timedelta(days=1)),
+    ('vacuum', timedelta(days=1)),
+    ('stats', timedelta(days=1)),
+    ('changes', timedelta(days=1)),
+    ('integrity', timedelta(days=7)),
+)
+
+SQLITE_TABLE_STATS = """
+WITH pages AS (
+    SELECT name, pageno, pgsize, unused,
+           LAG(pageno) OVER (PARTITION BY name ORDER BY path) AS previous
+    FROM dbstat
+)
+SELECT COALESCE(m.tbl_name, p.name) AS name,
+       SUM(CASE WHEN m.type = 'index' THEN 0 ELSE p.pgsize END) AS data_bytes,
+       SUM(CASE WHEN m.type = 'index' THEN p.pgsize ELSE 0 END) AS index_bytes,
+       SUM(p.unused),
+       COUNT(*),
+       SUM(p.previous IS NOT NULL AND p.pageno != p.previous + 1)
+FROM pages p LEFT JOIN sqlite_master m ON m.name = p.name
+GROUP BY 1
+ORDER BY data_bytes + index_bytes DESC
+"""
+
+POSTGRES_TABLE_STATS = """
+SELECT relname, pg_relation_size(relid), pg_indexes_size(relid), n_live_tup, n_dead_tup
+FROM pg_stat_user_tables
+ORDER BY pg_total_relation_size(relid) DESC
+"""
+
+AUTO_VACUUM_MODES = {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}
+
+
+class MaintenanceError(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def _sqlite_connection(engine):
+    """The pooled sqlite3 connection, with the app's pragmas and busy timeout"""
+    proxy = engine.raw_connection()
+    try:
+        yield proxy.driver_connection
+    finally:
+        proxy.close()
+
+
+def _pragma(conn, name):
+    return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+def optimize(engine, deadline=None):
+    """Refresh the query planner statistics"""
+    if engine.dialect.name != 'sqlite':
+        with engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+        return 'ANALYZE'
+    with _sqlite_connection(engine) as conn:
+        conn.execute(f'PRAGMA analysis_limit={ANALYSIS_LIMIT}')
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            # 0x10002: check every table, not only those this connection used
+            conn.executescript('PRAGMA optimize=0x10002')
+            return 'PRAGMA optimize'
+        conn.executescript('ANALYZE')  # PRAGMA optimize skips never-analyzed databases
+        return 'ANALYZE (first run)'
+
+
+def vacuum(engine, deadline=None, pages=DEFAULT_VACUUM_PAGES):
+    """Return free pages to the filesystem in short batches until ``deadline``"""
+    if engine.dialect.name != 'sqlite':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM'))
+        return 'VACUUM'
+    with _sqlite_connection(engine) as conn:
+        mode = AUTO_VACUUM_MODES.get(_pragma(conn, 'auto_vacuum'))
+        if mode != 'INCREMENTAL':
+            return f'skipped: auto_vacuum is {mode}; run enable-incremental-vacuum during downtime'
+        free = start = _pragma(conn, 'freelist_count')
+        while free and (deadline is None or time.time() < deadline):
+            # executescript steps the pragma to completion; execute() frees one page
+            conn.executescript(f'PRAGMA incremental_vacuum({pages})')
+            free = _pragma(conn, 'freelist_count')
+            time.sleep(BATCH_PAUSE_SECONDS)
+        if _pragma(conn, 'journal_mode') == 'wal':
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+        return f'freed {start - free} pages, {free} left'
+
+
+def integrity(engine, deadline=None):
+    """PRAGMA quick_check; raises MaintenanceError on problems"""
+    if engine.dialect.name != 'sqlite':
+        return 'skipped: use the amcheck extension on PostgreSQL'
+    with _sqlite_connection(engine) as conn:
+        problems = [row[0] for row in conn.execute('PRAGMA quick_check')]
+    if problems != ['ok']:
+        raise MaintenanceError('quick_check: ' + '; '.join(problems[:5]))
+    return 'ok'
+
+
+def enable_incremental_vacuum(engine):
+    """Switch a SQLite database to auto_vacuum=INCREMENTAL (one full VACUUM)"""
+    with _sqlite_connection(engine) as conn:
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.executescript('VACUUM')
+        return AUTO_VACUUM_MODES.get(_pragma(conn, 'auto_vacuum'))
+
+
+def table_stats(engine):
+    """Database totals and per-table sizes, largest table first"""
+    taken = datetime.utcnow().isoformat() + 'Z'
+    if engine.dialect.name != 'sqlite':
+        with engine.connect() as conn:
+            size = conn.execute(text('SELECT pg_database_size(current_database())')).scalar()
+            rows = conn.execute(text(POSTGRES_TABLE_STATS)).all()
+        tables = [{
+            'name': name, 'data_bytes': data, 'index_bytes': index,
+            'unused_pct': 100.0 * dead / (live + dead) if live + dead else 0.0,  # dead tuples
+            'fragmentation_pct': None,
+        } for name, data, index, live, dead in rows]
+        return {'taken': taken, 'backend': engine.dialect.name, 'database': {'size_bytes': size}, 'tables': tables}
+
+    with _sqlite_connection(engine) as conn:
+        page_size = _pragma(conn, 'page_size')
+        database = {
+            'size_bytes': page_size * _pragma(conn, 'page_count'),
+            'free_bytes': page_size * _pragma(conn, 'freelist_count'),
+            'auto_vacuum': AUTO_VACUUM_MODES.get(_pragma(conn, 'auto_vacuum')),
+            'journal_mode': _pragma(conn, 'journal_mode'),
+        }
+        try:
+            rows = conn.execute(SQLITE_TABLE_STATS).fetchall()
+        except sqlite3.OperationalError:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+            rows = []
+    tables = [{
+        'name': name, 'data_bytes': data, 'index_bytes': index,
+        'unused_pct': 100.0 * unused / (data + index) if data + index else 0.0,
+        'fragmentation_pct': 100.0 * out_of_order / pages if pages else 0.0,
+    } for name, data, index, unused, pages, out_of_order in rows]
+    return {'taken': taken, 'backend': 'sqlite', 'database': database, 'tables': tables}
+
+
+def parse_window(window):
+    """'HH:MM-HH:MM' as two datetime.time values; None for an empty window"""
+    if not window:
+        return None
+    try:
+        start, end = (datetime.strptime(part.strip(), '%H:%M').time() for part in window.split('-'))
+    except ValueError:
+        raise ValueError(f"MAINTENANCE_WINDOW must look like '02:00-05:00', not {window!r}")
+    return start, end
+
+
+def window_end(window, now):
+    """When the window containing ``now`` closes, or None if ``now`` is outside it"""
+    bounds = parse_window(window)
+    if bounds is None:
+        return now + timedelta(seconds=DEFAULT_MAX_SECONDS)
+    start, end = bounds
+    today_end = datetime.combine(now.date(), end)
+    if start <= end:
+        return today_end if start <= now.time() < end else None
+    # wraps past midnight, e.g. 23:00-04:00
+    if now.time() >= start:
+        return today_end + timedelta(days=1)
+    return today_end if now.time() < end else None
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'tasks': {}}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def next_due(state, name, interval):
+    last = state['tasks'].get(name, {}).get('last_run')
+    return datetime.fromisoformat(last) + interval if last else None
+
+
+@contextlib.contextmanager
+def _locked(path):
+    """Hold the maintenance lock for the state file at ``path``"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.lock', 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise MaintenanceError('Another maintenance run is in progress')
+        yield
+
+
+def _run_task(name, engine, config, state, deadline):
+    if name == 'stats':
+        state['stats'] = table_stats(engine)
+        return f"{len(state['stats']['tables'])} tables"
+    if name == 'changes':
+        import change_feed
+        from models import ChangeLog, ChangeLogCompaction
+        tables = inspect(engine)
+        if not all(tables.has_table(model.__tablename__) for model in (ChangeLog, ChangeLogCompaction)):
+            return 'skipped: the change log tables do not exist yet; run flask init-db'
+        superseded, tombstones = change_feed.compact(config['CHANGE_FEED_TOMBSTONE_DAYS'])
+        return f'compacted the change log: {superseded} superseded entries, {tombstones} tombstones'
+    if name == 'vacuum':
+        return vacuum(engine, deadline, config['MAINTENANCE_VACUUM_PAGES'])
+    return {'optimize': optimize, 'integrity': integrity}[name](engine, deadline)
+
+
+def run(engine, config, tasks=None, force=False, now=None):
+    """Run the due tasks (or ``tasks``) inside the window; returns {task: record}"""
+    now = now or datetime.now()
+    closes = window_end(config['MAINTENANCE_WINDOW'], now)
+    if closes is None:
+        if not force:
+            return {}
+        closes = now + timedelta(seconds=DEFAULT_MAX_SECONDS)
+    deadline = time.time() + (closes - now).total_seconds()
+
+    path = config['MAINTENANCE_STATE']
+    with _locked(path):
+        state = load_state(path)
+        results = {}
+        for name, interval in TASKS:
+            if tasks is not None and name not in tasks:
+                continue
+            due = next_due(state, name, interval)
+            if tasks is None and not force and due is not None and due > now:
+                continue
+            if time.time() >= deadline:
+                break
+            started = time.perf_counter()
+            record = {'last_run': datetime.now().isoformat(timespec='seconds')}
+            try:
+                record.update(result=_run_task(name, engine, config, state, deadline), ok=True)
+            except Exception as e:  # recorded, and the remaining tasks still run
+                record.update(result=str(e), ok=False)
+            record['seconds'] = round(time.perf_counter() - started, 3)
+            state['tasks'][name] = results[name] = record
+            save_state(path, state)
+        return results
+
+
+def refresh_stats(engine, config):
+    """Recompute the table statistics now, outside the schedule"""
+    path = config['MAINTENANCE_STATE']
+    with _locked(path):
+        state = load_state(path)
+        state['stats'] = table_stats(engine)
+        save_state(path, state)
+    return state['stats']
+
+
+def status(config, now=None):
+    """Each task's last run and next due time, for the admin page"""
+    now = now or datetime.now()
+    state = load_state(config['MAINTENANCE_STATE'])
+    tasks = []
+    for name, interval in TASKS:
+        record = state['tasks'].get(name, {})
+        due = next_due(state, name, interval)
+        tasks.append(dict(record, name=name, interval_hours=interval.total_seconds() / 3600,
+                          next_due=due.isoformat(timespec='minutes') if due else 'next window',
+                          overdue=due is not None and due < now - timedelta(days=1)))
+    return tasks, state.get('stats')
+
+
+def init_app(app):
+    app.config.setdefault('MAINTENANCE_WINDOW', DEFAULT_WINDOW)
+    app.config.setdefault('MAINTENANCE_STATE', os.path.join(app.instance_path, 'maintenance.json'))
+    app.config.setdefault('MAINTENANCE_VACUUM_PAGES', DEFAULT_VACUUM_PAGES)
+    parse_window(app.config['MAINTENANCE_WINDOW'])  # fail at startup on a bad window
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Off-peak maintenance of the Bad Apples database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the due tasks if inside the maintenance window')
+    run_parser.add_argument('--force', action='store_true', help='run now, even outside the window or when not due')
+    run_parser.add_argument('--task', action='append', choices=[name for name, _ in TASKS],
+                            help='run only this task, now (repeatable)')
+    run_parser.add_argument('--loop', action='store_true',
+                            help=f'keep running, checking every {CHECK_INTERVAL_SECONDS // 60} minutes')
+    commands.add_parser('status', help='show when each task last ran')
+    commands.add_parser('stats', help='print per-table sizes and fragmentation')
+    commands.add_parser('enable-incremental-vacuum',
+                        help='switch SQLite to auto_vacuum=INCREMENTAL (full VACUUM, locks the database)')
+    args = parser.parse_args()
+    if args.command == 'run' and args.loop and (args.force or args.task):
+        parser.error('--loop runs the schedule; it cannot be combined with --force or --task')
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    print("🧰 Bad Apples Maintenance")
+    print("=" * 40)
+
+    with app.app_context():
+        engine, config = db.engine, app.config
+        try:
+            if args.command == 'run':
+                while True:
+                    results = run(engine, config, tasks=args.task, force=args.force or bool(args.task))
+                    for name, record in results.items():
+                        print(f"{'✅' if record['ok'] else '❌'} {name}: {record['result']} ({record['seconds']:.2f}s)")
+                    if not args.loop:
+                        if not results:
+                            print(f"💤 Nothing due inside the window {config['MAINTENANCE_WINDOW']}")
+                        return 0 if all(record['ok'] for record in results.values()) else 1
+                    time.sleep(CHECK_INTERVAL_SECONDS)
+            elif args.command == 'status':
+                tasks, _ = status(config)
+                for task in tasks:
+                    print(f"{task['name']:<10} last {task.get('last_run', 'never'):<20} "
+                          f"next {task['next_due']:<17} {task.get('result', '')}")
+            elif args.command == 'stats':
+                stats = table_stats(engine)
+                print(f"Database: {stats['database']}")
+                print(f"{'table':<32} {'data':>12} {'indexes':>12} {'unused':>7} {'fragm.':>7}")
+                for table in stats['tables']:
+                    fragmentation = table['fragmentation_pct']
+                    print(f"{table['name']:<32} {table['data_bytes']:>12,} {table['index_bytes']:>12,} "
+                          f"{table['unused_pct']:>6.1f}% "
+                          f"{'-' if fragmentation is None else f'{fragmentation:.1f}%':>7}")
+            elif args.command == 'enable-incremental-vacuum':
+                if engine.dialect.name != 'sqlite':
+                    print("❌ Only SQLite uses auto_vacuum")
+                    return 1
+                print(f"✅ auto_vacuum is now {enable_incremental_vacuum(engine)}")
+        except MaintenanceError as e:
+            print(f"❌ {e}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+Prometheus metrics with cross-worker aggregation.
+
+Each worker process counts into a small in-memory registry and writes a
+snapshot to ``METRICS_DIR/<pid>.json`` at most every METRICS_FLUSH_SECONDS.
+``/metrics`` merges the snapshots of every worker that has ever run, so
+counters and histograms cover the whole server, and adds gauges (queue
+depths, pool usage) read at scrape time.
+
+Empty METRICS_DIR when the server is (re)deployed, as with Prometheus'
+multiprocess mode; snapshots of exited workers are kept so counters never go
+backwards while the server runs.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import database
+from models import db
+
+DEFAULT_FLUSH_SECONDS = 5.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+# name -> (type, help, buckets)
+METRICS = {
+    'badapples_http_requests_total': ('counter', 'HTTP requests by route and status', None),
+    'badapples_http_request_duration_seconds': ('histogram', 'HTTP request latency by route', LATENCY_BUCKETS),
+    'badapples_db_queries_total': ('counter', 'SQL statements executed', None),
+    'badapples_db_query_duration_seconds': ('histogram', 'SQL statement execution time', QUERY_BUCKETS),
+    'badapples_db_lock_errors_total': ('counter', 'Statements that failed because the database was locked', None),
+    'badapples_db_write_duration_seconds': (
+        'histogram', 'INSERT, UPDATE and DELETE time, including waits for the write lock', LATENCY_BUCKETS),
+    'badapples_db_busy_retries_total': ('counter', 'Write transactions retried because the database was locked', None),
+    'badapples_cache_requests_total': ('counter', 'Cache lookups by cache and result', None),
+    'badapples_upload_bytes_total': ('counter', 'Bytes of evidence uploaded', None),
+    'badapples_uploads_total': ('counter', 'Evidence files uploaded', None),
+    'badapples_export_duration_seconds': ('histogram', 'Time to build each export', EXPORT_BUCKETS),
+}
+
+GAUGES = {
+    'badapples_cache_hit_ratio': 'Share of cache lookups that were hits',
+    'badapples_db_pool_connections': 'Database pool connections by state, summed over live workers',
+    'badapples_moderation_queue_depth': 'Pending moderation entries by state',
+    'badapples_disputes_pending': 'Disputes waiting for review',
+    'badapples_workers': 'Worker processes with a recent metrics snapshot',
+}
+
+EXPORT_ENDPOINTS = {'main.export_officer', 'main.export_officers_csv',
+                    'main.export_incidents_csv', 'main.export_vehicles_csv'}
+
+
+class Registry:
+    """Counters and histograms for one process.
+
+    A registry inherited through fork starts empty in the child, so a
+    preloading master never has its counts duplicated into every worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.exit_hook_pid = None
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = 0.0
+
+    def _check_pid(self):
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_pid()
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = METRICS[name][2]
+        with self._lock:
+            self._check_pid()
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, gauges=None):
+        with self._lock:
+            self._check_pid()
+            return {
+                'pid': self.pid,
+                'time': time.time(),
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, dict(labels), list(series[0]), series[1], series[2]]
+                               for (name, labels), series in self.histograms.items()],
+                'gauges': gauges or [],
+            }
+
+
+registry = Registry()
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def cache_lookup(cache, hits=0, misses=0):
+    """Count lookups against one of the application's caches"""
+    if hits:
+        registry.inc('badapples_cache_requests_total', hits, cache=cache, result='hit')
+    if misses:
+        registry.inc('badapples_cache_requests_total', misses, cache=cache, result='miss')
+
+
+def record_upload(size):
+    registry.inc('badapples_uploads_total')
+    registry.inc('badapples_upload_bytes_total', size or 0)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    registry.inc('badapples_db_queries_total')
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        registry.observe('badapples_db_query_duration_seconds', elapsed)
+        if statement[:6].upper() in WRITE_STATEMENTS:
+            registry.observe('badapples_db_write_duration_seconds', elapsed)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _record_lock_error(context):
+    if database.is_lock_error(context.original_exception):
+        registry.inc('badapples_db_lock_errors_total')
+
+
+# --- Snapshots ---------------------------------------------------------------
+
+def metrics_dir(app=None):
+    app = app or current_app
+    return app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+
+
+def _pool_gauges():
+    pool = db.engine.pool
+    gauges = []
+    for state, method in (('checked_out', 'checkedout'), ('idle', 'checkedin'), ('overflow', 'overflow')):
+        if hasattr(pool, method):
+            gauges.append(['badapples_db_pool_connections', {'state': state}, max(0, getattr(pool, method)())])
+    return gauges
+
+
+def flush(force=False):
+    """Write this worker's snapshot if the flush interval has passed"""
+    now = time.time()
+    if not force and now - registry.flushed_at < current_app.config['METRICS_FLUSH_SECONDS']:
+        return
+    registry.flushed_at = now
+    directory = metrics_dir()
+    if registry.exit_hook_pid != registry.pid:
+        # Counts since the last periodic flush are written when the worker exits
+        registry.exit_hook_pid = registry.pid
+        atexit.register(_write_snapshot, directory)
+    _write_snapshot(directory, _pool_gauges())
+
+
+def _write_snapshot(directory, gauges=None):
+    os.makedirs(directory, exist_ok=True)
+    snapshot = registry.snapshot(gauges=gauges)
+    path = os.path.join(directory, f'{snapshot["pid"]}.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(path + '.tmp', path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Merge every worker's snapshot into (counters, histograms, gauges)"""
+    counters, histograms, gauges = {}, {}, {}
+    directory = metrics_dir()
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    live_workers = 0
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue  # being replaced right now; the next scrape will see it
+        for metric, labels, value in snapshot['counters']:
+            key = (metric, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for metric, labels, buckets, total, count in snapshot['histograms']:
+            key = (metric, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+        if _pid_alive(snapshot['pid']):
+            live_workers += 1
+            for metric, labels, value in snapshot['gauges']:
+                key = (metric, tuple(sorted(labels.items())))
+                gauges[key] = gauges.get(key, 0) + value
+
+    gauges[('badapples_workers', ())] = live_workers
+    return counters, histograms, gauges
+
+
+def _application_gauges(counters):
+    """Gauges computed at scrape time from the database and merged counters"""
+    import moderation_queue
+    from models import Dispute
+
+    gauges = {}
+    for state, value in moderation_queue.queue_depth().items():
+        gauges[('badapples_moderation_queue_depth', (('state', state),))] = value
+    gauges[('badapples_disputes_pending', ())] = Dispute.query.filter_by(status='pending').count()
+
+    lookups = {}
+    for (name, labels), value in counters.items():
+        if name == 'badapples_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    for cache, (hits, total) in lookups.items():
+        gauges[('badapples_cache_hit_ratio', (('cache', cache),))] = hits / total if total else 0
+    return gauges
+
+
+# --- Exposition --------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, extra=None):
+    items = list(labels) + (extra or [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    flush(force=True)
+    counters, histograms, gauges = collect()
+    gauges.update(_application_gauges(counters))
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        else:
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_labels(labels, [("le", _number(bound))])} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+
+    for name, help_text in GAUGES.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for (metric, labels), value in sorted(gauges.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Count every request and flush this worker's snapshot periodically"""
+    app.config.setdefault('METRICS_DIR', None)
+    app.config.setdefault('METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+    app.config.setdefault('METRICS_TOKEN', None)
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        route = request.endpoint or 'unmatched'
+        status = str(response.status_code)
+
+        def record():
+            elapsed = time.perf_counter() - started
+            registry.inc('badapples_http_requests_total', route=route, status=status)
+            registry.observe('badapples_http_request_duration_seconds', elapsed, route=route)
+            if route in EXPORT_ENDPOINTS:
+                registry.observe('badapples_export_duration_seconds', elapsed, export=route.split('.', 1)[1])
+            try:
+                flush()
+            except OSError as e:
+                app.logger.warning('Could not write metrics snapshot: %s', e)
+
+        if response.is_streamed:
+            # A streamed export is only done once the server has sent the whole body
+            def record_in_context():
+                with app.app_context():
+                    record()
+            response.call_on_close(record_in_context)
+        else:
+            record()
+        return response
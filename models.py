@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Officer(db.Model):
     __tablename__ = 'officers'
@@ -252,11 +255,21 @@ class ContentModeration(db.Model):
     dispute_reason = db.Column(db.Text)
     dispute_date = db.Column(db.DateTime)
     resolution_date = db.Column(db.DateTime)
+    priority = db.Column(db.Integer, default=0)  # higher values are reviewed first
+    claimed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    claim_token = db.Column(db.String(32))  # identifies the batch a claim belongs to
+    lease_expires_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_content_moderation_queue', 'status', 'priority', 'id'),
+        db.Index('ix_content_moderation_record', 'table_name', 'record_id'),
+    )
+    
     # Relationships
-    moderator = db.relationship('User', backref='moderation_actions')
+    moderator = db.relationship('User', foreign_keys=[moderator_id], backref='moderation_actions')
+    claimant = db.relationship('User', foreign_keys=[claimed_by])
     
     def __repr__(self):
         return f'<ContentModeration {self.status} for {self.table_name}:{self.record_id}>'
@@ -315,3 +328,75 @@ class Vehicle(db.Model):
     
     def __repr__(self):
         return f'<Vehicle {self.year} {self.make} {self.model} - {self.license_plate}>'
+
+class ChangeLog(db.Model):
+    __tablename__ = 'change_log'
+    
+    id = db.Column(db.Integer, primary_key=True)  # the change feed cursor
+    table_name = db.Column(db.String(50), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)  # upsert, delete
+    officer_id = db.Column(db.Integer)  # the officer whose page shows the record
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_change_log_record', 'table_name', 'record_id', 'id'),
+        {'sqlite_autoincrement': True},  # never reuse the ids of compacted entries
+    )
+    
+    def __repr__(self):
+        return f'<ChangeLog {self.id} {self.operation} {self.table_name}:{self.record_id}>'
+
+class ChangeLogCompaction(db.Model):
+    __tablename__ = 'change_log_compactions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    purged_through = db.Column(db.Integer, nullable=False)  # highest tombstone id removed so far
+    superseded_removed = db.Column(db.Integer, default=0)
+    tombstones_removed = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ChangeLogCompaction through {self.purged_through}>'
+
+class OfficerNameKey(db.Model):
+    __tablename__ = 'officer_name_keys'
+
+    # The primary key doubles as the lookup index: officers sharing a key
+    kind = db.Column(db.String(1), primary_key=True)  # g: trigram, s: soundex code
+    key = db.Column(db.String(4), primary_key=True)
+    officer_id = db.Column(db.Integer, primary_key=True)  # no foreign key: rows go after the officer is deleted
+
+    __table_args__ = (
+        db.Index('ix_officer_name_keys_officer', 'officer_id'),
+    )
+
+    def __repr__(self):
+        return f'<OfficerNameKey {self.kind}:{self.key!r} {self.officer_id}>'
+
+def upgrade_schema():
+    """Add columns introduced after a database was first created.
+
+    ``db.create_all()`` only creates missing tables, so databases created by an
+    older release are missing newer nullable columns. Must be called inside an
+    application context, after ``db.create_all()``.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added.append(f'{table.name}.{column.name}')
+    # Indexes declared after a table was created are not added by create_all
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    return added
@@ -0,0 +1,322 @@
+"""
+Moderation queue over ContentModeration.
+
+Pending records are stored as ContentModeration rows with status 'pending'.
+Moderators claim disjoint batches with a time-limited lease; a claim that is
+not resolved before its lease expires becomes claimable again, so a moderator
+closing their browser never strands records.
+"""
+
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+
+import sqlite_profile
+from models import db, Incident, Evidence, CommunityReport, ContentModeration
+
+# Tables whose records go through moderation
+QUEUE_TABLES = {
+    'incidents': Incident,
+    'evidence': Evidence,
+    'community_reports': CommunityReport,
+}
+
+# Higher priority records are handed out first
+DEFAULT_PRIORITIES = {
+    'community_reports': 20,
+    'incidents': 10,
+    'evidence': 0,
+}
+
+DEFAULT_LEASE_SECONDS = 15 * 60
+DEFAULT_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 100
+
+
+def _claimable(now):
+    """Condition matching pending entries that nobody holds a live lease on"""
+    return and_(
+        ContentModeration.status == 'pending',
+        or_(ContentModeration.claimed_by.is_(None),
+            ContentModeration.lease_expires_at < now)
+    )
+
+
+def enqueue(table_name, record_id, priority=None, commit=True):
+    """Add a record to the moderation queue if it is not already pending"""
+    if table_name not in QUEUE_TABLES:
+        raise ValueError(f'{table_name} is not a moderated table')
+
+    def add():
+        entry = ContentModeration.query.filter_by(
+            table_name=table_name, record_id=record_id, status='pending'
+        ).first()
+        if entry:
+            return entry
+
+        entry = ContentModeration(
+            table_name=table_name,
+            record_id=record_id,
+            status='pending',
+            priority=DEFAULT_PRIORITIES.get(table_name, 0) if priority is None else priority
+        )
+        db.session.add(entry)
+        return entry
+
+    return sqlite_profile.run_with_retry(add) if commit else add()
+
+
+def backfill():
+    """Queue every unverified record that has no pending entry yet.
+
+    Used when upgrading a database created before the queue existed.
+    Returns the number of entries created.
+    """
+    created = 0
+    for table_name, model in QUEUE_TABLES.items():
+        queued = select(ContentModeration.record_id).where(
+            ContentModeration.table_name == table_name,
+            ContentModeration.status == 'pending'
+        )
+        record_ids = db.session.execute(
+            select(model.id).where(model.verified.isnot(True), model.id.not_in(queued))
+        ).scalars().all()
+        if record_ids:
+            now = datetime.utcnow()
+            priority = DEFAULT_PRIORITIES.get(table_name, 0)
+            db.session.execute(ContentModeration.__table__.insert(), [
+                {'table_name': table_name, 'record_id': record_id, 'status': 'pending',
+                 'priority': priority, 'created_at': now, 'updated_at': now}
+                for record_id in record_ids
+            ])
+        created += len(record_ids)
+    db.session.commit()
+    return created
+
+
+def claim_batch(moderator_id, limit=DEFAULT_BATCH_SIZE, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Atomically claim the next highest-priority pending entries.
+
+    Candidates are selected and leased in a single UPDATE, so two moderators
+    claiming at the same time always receive disjoint batches. On PostgreSQL
+    rows locked by a concurrent claim are skipped instead of waited on.
+    """
+    limit = max(1, min(limit, MAX_BATCH_SIZE))
+    now = datetime.utcnow()
+    token = secrets.token_hex(16)
+
+    candidates = (
+        select(ContentModeration.id)
+        .where(_claimable(now))
+        .order_by(ContentModeration.priority.desc(), ContentModeration.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    claim = (
+        update(ContentModeration)
+        .where(ContentModeration.id.in_(candidates), _claimable(now))
+        .values(claimed_by=moderator_id,
+                claim_token=token,
+                lease_expires_at=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    sqlite_profile.run_with_retry(lambda: db.session.execute(claim))
+
+    return ContentModeration.query.filter_by(claim_token=token).order_by(
+        ContentModeration.priority.desc(), ContentModeration.id
+    ).all()
+
+
+def claim_record(table_name, record_id, moderator_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Claim the queue entry for one record.
+
+    Returns the entry, or None when another moderator holds a live lease on it.
+    Records that were never queued are queued and claimed.
+    """
+    now = datetime.utcnow()
+
+    def claim():
+        entry = enqueue(table_name, record_id, commit=False)
+        db.session.flush()
+        result = db.session.execute(
+            update(ContentModeration)
+            .where(ContentModeration.id == entry.id,
+                   ContentModeration.status == 'pending',
+                   or_(ContentModeration.claimed_by.is_(None),
+                       ContentModeration.claimed_by == moderator_id,
+                       ContentModeration.lease_expires_at < now))
+            .values(claimed_by=moderator_id,
+                    claim_token=entry.claim_token if entry.claimed_by == moderator_id else secrets.token_hex(16),
+                    lease_expires_at=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        return entry, result.rowcount
+
+    entry, claimed = sqlite_profile.run_with_retry(claim)
+    if claimed == 0:
+        return None
+    db.session.refresh(entry)
+    return entry
+
+
+def renew(moderator_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Extend every live lease held by a moderator. Returns the number renewed."""
+    now = datetime.utcnow()
+    renewal = (
+        update(ContentModeration)
+        .where(ContentModeration.status == 'pending',
+               ContentModeration.claimed_by == moderator_id,
+               ContentModeration.lease_expires_at >= now)
+        .values(lease_expires_at=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    return sqlite_profile.run_with_retry(lambda: db.session.execute(renewal).rowcount)
+
+
+def release(moderator_id, entry_ids=None):
+    """Return a moderator's claimed entries to the queue"""
+    query = update(ContentModeration).where(
+        ContentModeration.status == 'pending',
+        ContentModeration.claimed_by == moderator_id
+    )
+    if entry_ids is not None:
+        query = query.where(ContentModeration.id.in_(entry_ids))
+    query = (query.values(claimed_by=None, claim_token=None, lease_expires_at=None)
+             .execution_options(synchronize_session=False))
+    return sqlite_profile.run_with_retry(lambda: db.session.execute(query).rowcount)
+
+
+def release_expired():
+    """Clear leases that have run out. Returns the number of entries released."""
+    expired = (
+        update(ContentModeration)
+        .where(ContentModeration.status == 'pending',
+               ContentModeration.claimed_by.isnot(None),
+               ContentModeration.lease_expires_at < datetime.utcnow())
+        .values(claimed_by=None, claim_token=None, lease_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return sqlite_profile.run_with_retry(lambda: db.session.execute(expired).rowcount)
+
+
+def _ids(record_ids):
+    """Record ids as distinct ints, so "5" and 5 match the same queue entry"""
+    return list(dict.fromkeys(int(record_id) for record_id in record_ids))
+
+
+def held_by_others(table_name, record_ids, moderator_id):
+    """Return the subset of record_ids another moderator holds a live lease on"""
+    record_ids = _ids(record_ids)
+    if not record_ids:
+        return set()
+    return set(db.session.execute(
+        select(ContentModeration.record_id).where(
+            ContentModeration.table_name == table_name,
+            ContentModeration.record_id.in_(record_ids),
+            ContentModeration.status == 'pending',
+            ContentModeration.claimed_by.isnot(None),
+            ContentModeration.claimed_by != moderator_id,
+            ContentModeration.lease_expires_at >= datetime.utcnow()
+        )
+    ).scalars().all())
+
+
+def resolve(table_name, record_ids, status, moderator_id, reason_code=None, notes=None):
+    """Close the pending entries for records with an approved/rejected decision.
+
+    Records without a pending entry get a new ContentModeration row carrying the
+    decision, so every moderation decision is recorded in one place. The caller
+    is responsible for skipping records held by other moderators.
+    """
+    if table_name not in QUEUE_TABLES:
+        raise ValueError(f'{table_name} is not a moderated table')
+    record_ids = _ids(record_ids)
+    if not record_ids:
+        return 0
+    now = datetime.utcnow()
+
+    def write():
+        queued = set(db.session.execute(
+            select(ContentModeration.record_id).where(
+                ContentModeration.table_name == table_name,
+                ContentModeration.record_id.in_(record_ids),
+                ContentModeration.status == 'pending'
+            )
+        ).scalars().all())
+        if queued:
+            db.session.execute(
+                update(ContentModeration)
+                .where(ContentModeration.table_name == table_name,
+                       ContentModeration.record_id.in_(queued),
+                       ContentModeration.status == 'pending')
+                .values(status=status, moderator_id=moderator_id, reason_code=reason_code,
+                        notes=notes, resolution_date=now, updated_at=now,
+                        claimed_by=None, claim_token=None, lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            )
+
+        missing = [record_id for record_id in record_ids if record_id not in queued]
+        if missing:
+            db.session.execute(ContentModeration.__table__.insert(), [
+                {'table_name': table_name, 'record_id': record_id, 'status': status,
+                 'moderator_id': moderator_id, 'reason_code': reason_code, 'notes': notes,
+                 'resolution_date': now, 'created_at': now, 'updated_at': now}
+                for record_id in missing
+            ])
+
+    sqlite_profile.run_with_retry(write)
+    return len(record_ids)
+
+
+def claims_for(moderator_id):
+    """Live claims held by a moderator, in review order"""
+    return ContentModeration.query.filter(
+        ContentModeration.status == 'pending',
+        ContentModeration.claimed_by == moderator_id,
+        ContentModeration.lease_expires_at >= datetime.utcnow()
+    ).order_by(ContentModeration.priority.desc(), ContentModeration.id).all()
+
+
+def encode_cursor(entry):
+    return f'{entry.priority or 0}:{entry.id}'
+
+
+def decode_cursor(cursor):
+    """Parse a 'priority:id' cursor. Returns None for a missing or malformed cursor."""
+    try:
+        priority, entry_id = cursor.split(':')
+        return int(priority), int(entry_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def pending_page(after=None, limit=50):
+    """One page of the pending queue using keyset pagination.
+
+    ``after`` is the cursor returned with the previous page. Returns
+    ``(entries, next_cursor)``; next_cursor is None on the last page.
+    """
+    query = ContentModeration.query.filter(ContentModeration.status == 'pending')
+    position = decode_cursor(after)
+    if position:
+        priority, entry_id = position
+        query = query.filter(or_(
+            ContentModeration.priority < priority,
+            and_(ContentModeration.priority == priority, ContentModeration.id > entry_id)
+        ))
+    entries = query.order_by(
+        ContentModeration.priority.desc(), ContentModeration.id
+    ).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+def queue_depth():
+    """Counts of pending entries that are available and currently claimed"""
+    now = datetime.utcnow()
+    pending = ContentModeration.query.filter_by(status='pending').count()
+    available = ContentModeration.query.filter(_claimable(now)).count()
+    return {'pending': pending, 'available': available, 'claimed': pending - available}
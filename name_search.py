@@ -0,0 +1,187 @@
+"""
+Typo-tolerant officer search.
+
+Names in reports and searches are often misspelled ("Jonhson", "Mcdonald"
+for "MacDonald"), and a substring match finds nothing for them. Every officer
+has rows in ``officer_name_keys`` for the trigrams of their first name, last
+name and badge number, and for the Soundex codes of their names. The rows are
+kept up to date by the same flush that writes the officer.
+
+``candidates(query)`` selects the officers that share the most keys with the
+query, using the index, and ``rank()`` scores those few by trigram similarity
+(as in PostgreSQL's pg_trgm) with a bonus when the names sound alike. Officers
+written outside the ORM (synthetic data, migrations) are indexed by
+``backfill()``, which ``flask init-db`` runs.
+"""
+
+import re
+
+from sqlalchemy import case, delete, desc, event, exists, func, insert, or_, select
+from sqlalchemy.orm import Session, load_only
+
+from models import db, Officer, OfficerNameKey
+
+SIMILARITY_THRESHOLD = 0.3  # pg_trgm's default
+PHONETIC_BONUS = 0.2
+PHONETIC_WEIGHT = 3  # a shared Soundex code counts as this many shared trigrams
+CANDIDATES = 100
+MATCHES = 20
+INDEXED_FIELDS = ('first_name', 'last_name', 'badge_number')
+BACKFILL_BATCH = 1000
+
+SOUNDEX_CODES = {letter: str(digit)
+                 for digit, letters in enumerate(['aeiouy', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'])
+                 for letter in letters}
+
+
+def words(text):
+    """Lowercase alphanumeric words; apostrophes are dropped so O'Brien is obrien"""
+    return re.findall(r'[^\W_]+', (text or '').lower().replace("'", ''))
+
+
+def trigrams(text):
+    """pg_trgm-style trigrams: each word padded with two spaces in front and one behind"""
+    grams = set()
+    for word in words(text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def soundex(word):
+    """American Soundex code of a word, or None if it has digits"""
+    if not word.isalpha() or not word.isascii():
+        return None
+    code, previous = word[0].upper(), SOUNDEX_CODES.get(word[0])
+    for letter in word[1:]:
+        digit = SOUNDEX_CODES.get(letter)  # h and w have none and do not separate equal digits
+        if digit is not None:
+            if digit != '0' and digit != previous:
+                code += digit
+            previous = digit
+    return (code + '000')[:4]
+
+
+def sounds(text):
+    return {code for code in map(soundex, words(text)) if code}
+
+
+def similarity(grams, other):
+    """Share of the two trigram sets that is common to both"""
+    if not grams or not other:
+        return 0.0
+    common = len(grams & other)
+    return common / (len(grams) + len(other) - common)
+
+
+def keys(officer):
+    """(kind, key) rows for an officer"""
+    grams = set().union(*(trigrams(getattr(officer, field)) for field in INDEXED_FIELDS))
+    codes = sounds(officer.first_name) | sounds(officer.last_name)
+    return [('g', gram) for gram in grams] + [('s', code) for code in codes]
+
+
+def indexed_columns():
+    return [getattr(Officer, field) for field in INDEXED_FIELDS]
+
+
+def _rows(officers):
+    rows = []
+    for officer in officers:
+        officer_id = officer.id
+        rows += [{'kind': kind, 'key': key, 'officer_id': officer_id} for kind, key in keys(officer)]
+    return rows
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_keys(session, flush_context):
+    """Re-index officers whose name or badge changed, in the same transaction"""
+    changed = [obj for obj in session.new if isinstance(obj, Officer)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, Officer) and any(db.inspect(obj).attrs[field].history.has_changes()
+                                                    for field in INDEXED_FIELDS)]
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Officer)]
+    stale = [obj.id for obj in changed] + removed
+    if not stale:
+        return
+    connection = session.connection()
+    connection.execute(delete(OfficerNameKey).where(OfficerNameKey.officer_id.in_(stale)))
+    if changed:
+        connection.execute(insert(OfficerNameKey.__table__), _rows(changed))
+
+
+def candidates(query, limit=CANDIDATES):
+    """Officers sharing the most trigrams and Soundex codes with ``query``, or None"""
+    grams, codes = trigrams(query), sounds(query)
+    if not grams:
+        return None
+    matching = [(OfficerNameKey.kind == 'g') & OfficerNameKey.key.in_(grams)]
+    if codes:
+        matching.append((OfficerNameKey.kind == 's') & OfficerNameKey.key.in_(codes))
+    shared = (select(OfficerNameKey.officer_id,
+                     func.sum(case((OfficerNameKey.kind == 's', PHONETIC_WEIGHT), else_=1)).label('shared'))
+              .where(or_(*matching))
+              .group_by(OfficerNameKey.officer_id)
+              .order_by(desc('shared'), OfficerNameKey.officer_id)
+              .limit(limit)
+              .subquery())
+    return (select(Officer)
+            .join(shared, shared.c.officer_id == Officer.id)
+            .order_by(shared.c.shared.desc(), Officer.id))
+
+
+def score(query, officer):
+    """Similarity of an officer to ``query``: the best of their first name, last
+    name, full name and badge number, plus PHONETIC_BONUS when every word of the
+    query sounds like one of their names"""
+    grams = trigrams(query)
+    best = max(similarity(grams, trigrams(text)) for text in (
+        officer.first_name, officer.last_name, f'{officer.first_name} {officer.last_name}', officer.badge_number))
+    codes = sounds(query)
+    if codes and len(codes) == len(words(query)) and codes <= sounds(officer.first_name) | sounds(officer.last_name):
+        return best + PHONETIC_BONUS
+    return best if best >= SIMILARITY_THRESHOLD else 0.0
+
+
+def rank(query, officers, limit=None, exclude=()):
+    """[(officer, score)] above the threshold, most similar first"""
+    scored = [(officer, score(query, officer)) for officer in officers if officer.id not in exclude]
+    scored = sorted((pair for pair in scored if pair[1] > 0), key=lambda pair: (-pair[1], pair[0].id))
+    return scored[:limit]
+
+
+def matches(query, limit=MATCHES, exclude=(), options=()):
+    """The officers most similar to ``query``, most similar first"""
+    statement = candidates(query)
+    if statement is None:
+        return []
+    officers = db.session.execute(statement.options(*options)).scalars()
+    return [officer for officer, _ in rank(query, officers, limit, exclude)]
+
+
+def backfill(batch=BACKFILL_BATCH):
+    """Index every officer that has no keys yet; returns how many"""
+    unindexed = (select(Officer)
+                 .where(~exists().where(OfficerNameKey.officer_id == Officer.id))
+                 .options(load_only(*indexed_columns()))
+                 .order_by(Officer.id)
+                 .execution_options(yield_per=batch))
+    indexed = 0
+    rows = []
+    for officer in db.session.execute(unindexed).scalars():
+        rows += _rows([officer])
+        indexed += 1
+        if indexed % batch == 0:
+            # A Core insert: the ORM's bulk insert path costs more than the database does
+            db.session.connection().execute(insert(OfficerNameKey.__table__), rows)
+            rows = []
+    if rows:
+        db.session.connection().execute(insert(OfficerNameKey.__table__), rows)
+    db.session.commit()
+    return indexed
+
+
+def rebuild():
+    """Drop and recompute every officer's keys, after names changed outside the ORM"""
+    db.session.execute(delete(OfficerNameKey))
+    return backfill()
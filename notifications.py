@@ -0,0 +1,119 @@
+"""
+Email notifications for moderators and disputers.
+
+Flask-Mail is imported and set up when the first message is sent, not when
+the application starts.
+"""
+
+from flask import current_app, url_for
+
+import tracing
+from models import User
+
+def get_mail():
+    """The application's Flask-Mail state, created on first use"""
+    state = current_app.extensions.get('mail')
+    if state is None:
+        from flask_mail import Mail
+        state = Mail().init_app(current_app)
+    return state
+
+def send_email_notification(subject, recipients, body_text, body_html=None):
+    """Send email notification"""
+    try:
+        if not current_app.config['MAIL_USERNAME'] or not current_app.config['MAIL_PASSWORD']:
+            # Email not configured, skip silently
+            return False
+            
+        from flask_mail import Message
+        
+        mail = get_mail()  # Message reads the default sender from the mail state
+        msg = Message(
+            subject=subject,
+            recipients=recipients if isinstance(recipients, list) else [recipients],
+            body=body_text,
+            html=body_html or body_text
+        )
+        with tracing.span('smtp.send', server=current_app.config['MAIL_SERVER'], recipients=len(msg.recipients)):
+            mail.send(msg)
+        return True
+    except Exception as e:
+        print(f"Error sending email: {e}")
+        return False
+
+def notify_admins_new_report(report_type, report_id):
+    """Notify admins of new community report"""
+    admin_users = User.query.filter(User.role.in_(['admin', 'moderator'])).all()
+    if not admin_users:
+        return
+    
+    recipients = [user.email for user in admin_users if user.email]
+    if not recipients:
+        return
+    
+    subject = f"New {report_type.title()} Report Submitted"
+    body = f"""
+A new {report_type} report has been submitted to the Bad Apples Database.
+
+Report ID: {report_id}
+Type: {report_type}
+
+Please review this report in the admin panel:
+{url_for('main.admin_panel', _external=True)}
+
+---
+This is an automated notification from the Bad Apples Database.
+    """
+    
+    send_email_notification(subject, recipients, body)
+
+def notify_admins_new_dispute(dispute_id, table_name, record_id):
+    """Notify admins of new dispute"""
+    admin_users = User.query.filter(User.role.in_(['admin', 'moderator'])).all()
+    if not admin_users:
+        return
+    
+    recipients = [user.email for user in admin_users if user.email]
+    if not recipients:
+        return
+    
+    subject = f"New Dispute Submitted - {table_name} #{record_id}"
+    body = f"""
+A new dispute has been submitted to the Bad Apples Database.
+
+Dispute ID: {dispute_id}
+Record Type: {table_name}
+Record ID: {record_id}
+
+Please review this dispute in the admin panel:
+{url_for('main.admin_panel', _external=True)}
+
+---
+This is an automated notification from the Bad Apples Database.
+    """
+    
+    send_email_notification(subject, recipients, body)
+
+def notify_dispute_resolution(dispute, resolution_status):
+    """Notify disputer of resolution"""
+    if not dispute.disputer_email:
+        return
+    
+    subject = f"Dispute Resolution - {dispute.table_name} #{dispute.record_id}"
+    body = f"""
+Your dispute has been reviewed and {resolution_status}.
+
+Dispute ID: {dispute.id}
+Record Type: {dispute.table_name}
+Record ID: {dispute.record_id}
+Status: {resolution_status.upper()}
+
+{f"Resolution: {dispute.resolution}" if dispute.resolution else ""}
+
+Thank you for helping us maintain the accuracy of the Bad Apples Database.
+
+---
+This is an automated notification from the Bad Apples Database.
+    """
+    
+    send_email_notification(subject, [dispute.disputer_email], body)
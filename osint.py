@@ -0,0 +1,80 @@
+"""
+OSINT helpers for finding officers' public social media profiles.
+
+Imported by the OSINT routes when they run, so workers only load requests and
+BeautifulSoup once an OSINT search is actually made.
+"""
+
+from flask import current_app
+import requests
+from bs4 import BeautifulSoup
+
+def search_social_media(name, department=None):
+    """Enhanced OSINT search for social media profiles"""
+    results = []
+    
+    # Search patterns
+    search_terms = [name]
+    if department:
+        search_terms.append(f"{name} {department}")
+    
+    # Twitter/X API integration (if configured)
+    if current_app.config.get('TWITTER_API_KEY'):
+        try:
+            # This is where you'd integrate with Twitter API
+            # For now, this is a placeholder for future implementation
+            twitter_results = search_twitter(name, department)
+            results.extend(twitter_results)
+        except Exception as e:
+            print(f"Twitter search error: {e}")
+    
+    # Facebook API integration (if configured)
+    if current_app.config.get('FACEBOOK_API_KEY'):
+        try:
+            # This is where you'd integrate with Facebook API
+            # For now, this is a placeholder for future implementation
+            facebook_results = search_facebook(name, department)
+            results.extend(facebook_results)
+        except Exception as e:
+            print(f"Facebook search error: {e}")
+    
+    # Google Search fallback (public information only)
+    try:
+        google_results = google_search_public_info(name, department)
+        results.extend(google_results)
+    except Exception as e:
+        print(f"Google search error: {e}")
+    
+    return results
+
+def search_twitter(name, department=None):
+    """Search Twitter/X for profiles (requires API key)"""
+    # Placeholder for Twitter API integration
+    # In production, use tweepy or similar library
+    return []
+
+def search_facebook(name, department=None):
+    """Search Facebook for profiles (requires API key)"""
+    # Placeholder for Facebook API integration
+    # In production, use facebook-sdk or similar library
+    return []
+
+def google_search_public_info(name, department=None):
+    """Search Google for public information"""
+    # This uses basic web scraping for publicly available information
+    # In production, use Google Custom Search API
+    results = []
+    
+    try:
+        search_query = f"{name}"
+        if department:
+            search_query += f" {department}"
+        search_query += " police officer"
+        
+        # This is a basic example - in production use proper APIs
+        # For now, return empty to avoid scraping issues
+        
+    except Exception as e:
+        print(f"Google search error: {e}")
+    
+    return results
@@ -0,0 +1,198 @@
+"""
+Per-request profiling and SQL query accounting.
+
+Every request records its wall time, the number of SQL statements it ran,
+the time spent in them and the number of rows loaded. Requests slower than
+PERF_SLOW_REQUEST_MS are logged with their statements. Totals are kept per
+endpoint in each worker process and shown on /admin/perf.
+
+An admin can add ``?_profile=1`` to any URL to run that single request under
+cProfile; the result is saved to PERF_PROFILE_DIR and listed on /admin/perf.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db
+
+DEFAULT_SLOW_REQUEST_MS = 500
+MAX_STATEMENTS = 50  # kept per request, for the slow request log
+RECENT_SLOW_REQUESTS = 50
+PROFILE_PARAM = '_profile'
+
+
+class RequestStats:
+    """Measurements for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.rows = 0
+        self.statements = []
+
+    def add_query(self, statement, elapsed_ms, rowcount):
+        self.queries += 1
+        self.sql_ms += elapsed_ms
+        if rowcount and rowcount > 0:
+            self.rows += rowcount  # rows written by INSERT/UPDATE/DELETE
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((elapsed_ms, statement))
+
+
+class RouteStats:
+    """Per-endpoint totals for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.slow_requests = deque(maxlen=RECENT_SLOW_REQUESTS)
+
+    def record(self, endpoint, wall_ms, stats):
+        with self._lock:
+            route = self._routes.setdefault(endpoint, {
+                'count': 0, 'wall_ms': 0.0, 'max_ms': 0.0, 'queries': 0, 'sql_ms': 0.0, 'rows': 0
+            })
+            route['count'] += 1
+            route['wall_ms'] += wall_ms
+            route['max_ms'] = max(route['max_ms'], wall_ms)
+            route['queries'] += stats.queries
+            route['sql_ms'] += stats.sql_ms
+            route['rows'] += stats.rows
+
+    def snapshot(self):
+        """Routes with averages, slowest total time first"""
+        with self._lock:
+            routes = [dict(route, endpoint=endpoint) for endpoint, route in self._routes.items()]
+        for route in routes:
+            route['avg_ms'] = route['wall_ms'] / route['count']
+            route['avg_queries'] = route['queries'] / route['count']
+            route['avg_sql_ms'] = route['sql_ms'] / route['count']
+        return sorted(routes, key=lambda route: route['wall_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self.slow_requests.clear()
+
+
+route_stats = RouteStats()
+
+
+def current_stats():
+    """The RequestStats for the active request, or None outside a request"""
+    if has_request_context():
+        return g.get('perf')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('perf_query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['perf_query_started'].pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.add_query(statement, (time.perf_counter() - started) * 1000, cursor.rowcount)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_timer(context):
+    if context.connection is not None and context.connection.info.get('perf_query_started'):
+        context.connection.info['perf_query_started'].pop()
+
+
+@event.listens_for(db.Model, 'load', propagate=True)
+def _count_loaded_row(target, context):
+    stats = current_stats()
+    if stats is not None:
+        stats.rows += 1
+
+
+def profile_dir(app=None):
+    app = app or current_app
+    return app.config.get('PERF_PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+
+
+def list_profiles(limit=20):
+    """Saved profiles, newest first"""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = sorted((name for name in os.listdir(directory) if name.endswith('.prof')), reverse=True)
+    return names[:limit]
+
+
+def profile_report(name, limit=40):
+    """Text summary of a saved profile, sorted by cumulative time"""
+    if not re.fullmatch(r'[\w.-]+\.prof', name):
+        return None
+    path = os.path.join(profile_dir(), name)
+    if not os.path.exists(path):
+        return None
+    output = io.StringIO()
+    pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def _save_profile(profiler, endpoint):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{endpoint or 'unknown'}.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+    return name
+
+
+def init_app(app):
+    """Record timings for every request and handle the admin profiling toggle"""
+    app.config.setdefault('PERF_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS)
+    app.config.setdefault('PERF_PROFILE_DIR', None)
+
+    @app.before_request
+    def start_request_stats():
+        g.perf = RequestStats()
+        if request.args.get(PROFILE_PARAM) and session.get('is_admin'):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request_stats(response):
+        stats = g.pop('perf', None)
+        if stats is None:
+            return response
+        wall_ms = (time.perf_counter() - stats.started) * 1000
+        endpoint = request.endpoint or 'unmatched'
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers['X-Profile'] = _save_profile(profiler, endpoint)
+
+        route_stats.record(endpoint, wall_ms, stats)
+        if wall_ms >= current_app.config['PERF_SLOW_REQUEST_MS']:
+            route_stats.slow_requests.appendleft({
+                'time': datetime.utcnow(), 'method': request.method, 'path': request.full_path.rstrip('?'),
+                'endpoint': endpoint, 'wall_ms': wall_ms, 'queries': stats.queries,
+                'sql_ms': stats.sql_ms, 'rows': stats.rows, 'statements': stats.statements,
+            })
+            current_app.logger.warning(
+                'Slow request %s %s: %.0f ms, %d queries (%.0f ms), %d rows\n%s',
+                request.method, request.full_path.rstrip('?'), wall_ms, stats.queries, stats.sql_ms,
+                stats.rows, '\n'.join(f'  {ms:7.1f} ms  {sql}' for ms, sql in stats.statements)
+            )
+
+        return response
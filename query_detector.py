@@ -0,0 +1,151 @@
+"""
+N+1 query detection and per-route query budgets.
+
+Within each request the detector counts SQL statements by their text. The
+text carries placeholders rather than values, so a loop that lazy-loads the
+same relationship for every row shows up as one statement repeated many
+times. Lazy loads triggered from ORM attributes are attributed to the
+relationship that caused them (e.g. ``Officer.current_department``).
+
+Views declare how many statements they may run with ``@query_budget(n)``.
+Depending on NPLUSONE_MODE, a request that exceeds its budget or repeats a
+statement NPLUSONE_THRESHOLD times either raises QueryBudgetExceeded
+('raise', the default under TESTING), logs a warning ('warn', the default in
+debug mode) or is not checked at all ('off').
+"""
+
+import functools
+import warnings
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+DEFAULT_THRESHOLD = 3
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more statements than its view allows, or an N+1 pattern"""
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+def query_budget(limit):
+    """Declare the most SQL statements a view may run per request"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if 'query_detector' in g:
+                g.query_detector.budget = limit
+            return view(*args, **kwargs)
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+class RequestQueries:
+    """Statements seen during one request"""
+
+    def __init__(self):
+        self.total = 0
+        self.counts = {}
+        self.lazy_loads = {}
+        self.budget = None
+
+    def repeated(self, threshold):
+        """(count, statement, lazy-loaded relationships) for statements run at least ``threshold`` times"""
+        return sorted(
+            ((count, statement, self.lazy_loads.get(statement)) for statement, count in self.counts.items()
+             if count >= threshold),
+            reverse=True
+        )
+
+
+def _current():
+    if has_request_context():
+        return g.get('query_detector')
+    return None
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    queries = _current()
+    if queries is not None:
+        queries.total += 1
+        queries.counts[statement] = queries.counts.get(statement, 0) + 1
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_lazy_load(orm_execute_state):
+    queries = _current()
+    if queries is None or not orm_execute_state.is_relationship_load:
+        return
+    origin = orm_execute_state.lazy_loaded_from
+    if origin is not None:
+        statement = str(orm_execute_state.statement.compile(orm_execute_state.session.get_bind()))
+        path = orm_execute_state.loader_strategy_path
+        relationship = path[-1].key if path and len(path) > 1 else '?'
+        queries.lazy_loads.setdefault(statement, set()).add(f'{origin.class_.__name__}.{relationship}')
+
+
+def checkpoint():
+    """The statements seen so far in this request, for ``rewind``"""
+    queries = _current()
+    return None if queries is None else (queries.total, dict(queries.counts))
+
+
+def rewind(mark):
+    """Forget the statements run since ``checkpoint()``. A transaction retried
+    after a lock error repeats them, which is neither N+1 nor over budget."""
+    queries = _current()
+    if queries is not None and mark is not None:
+        queries.total, queries.counts = mark[0], dict(mark[1])
+
+
+def report(queries, threshold):
+    """Problems found for one request, as human-readable lines"""
+    problems = []
+    if queries.budget is not None and queries.total > queries.budget:
+        problems.append(f'{queries.total} queries, budget is {queries.budget}')
+    for count, statement, relationship in queries.repeated(threshold):
+        origin = f' (lazy load of {", ".join(sorted(relationship))})' if relationship else ''
+        problems.append(f'{count}x{origin}: {" ".join(statement.split())[:200]}')
+    return problems
+
+
+def mode(app):
+    """NPLUSONE_MODE, or the default for how the app is running"""
+    configured = app.config.get('NPLUSONE_MODE')
+    if configured:
+        return configured
+    return 'raise' if app.testing else 'warn' if app.debug else 'off'
+
+
+def init_app(app):
+    """Watch every request's statements according to NPLUSONE_MODE"""
+    app.config.setdefault('NPLUSONE_MODE', None)
+    app.config.setdefault('NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD)
+
+    @app.before_request
+    def start_query_detector():
+        if mode(current_app) != 'off':
+            g.query_detector = RequestQueries()
+
+    @app.after_request
+    def check_query_detector(response):
+        queries = g.pop('query_detector', None)
+        if queries is None:
+            return response
+        problems = report(queries, current_app.config['NPLUSONE_THRESHOLD'])
+        if not problems:
+            return response
+
+        message = f'{request.method} {request.path} ({request.endpoint}):\n  ' + '\n  '.join(problems)
+        if mode(current_app) == 'raise':
+            raise QueryBudgetExceeded(message)
+        warnings.warn(message, NPlusOneWarning, stacklevel=2)
+        current_app.logger.warning('Query problems in %s', message)
+        return response
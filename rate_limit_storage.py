@@ -0,0 +1,177 @@
+"""
+Cross-process rate limit storage backed by a WAL-mode SQLite file.
+
+The default ``memory://`` storage keeps counters per worker process, so every
+gunicorn worker enforces its own copy of each limit. This backend keeps the
+counters in a small SQLite database that all workers on a host share, without
+requiring Redis or memcached.
+
+Importing this module registers the ``sqlite://`` scheme with ``limits``:
+
+    Limiter(storage_uri='sqlite:////var/lib/badapples/ratelimit.db',
+            strategy='sliding-window-counter')
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from limits.errors import ConfigurationError
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# Adds to a live counter, or restarts it if its window has expired
+INCR_SQL = """
+INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    count = CASE WHEN rate_limits.expires_at <= :now
+                 THEN excluded.count ELSE rate_limits.count + excluded.count END,
+    expires_at = CASE WHEN rate_limits.expires_at <= :now
+                      THEN excluded.expires_at ELSE rate_limits.expires_at END
+RETURNING count
+"""
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit storage shared by every process that opens the same file.
+
+    Single-counter updates are one atomic UPSERT. The sliding window check
+    reads two counters and conditionally increments one inside a
+    ``BEGIN IMMEDIATE`` transaction, so concurrent workers cannot both take
+    the last slot in a window.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, busy_timeout=5.0, cleanup_interval=60, **options):
+        """
+        :param uri: ``sqlite:///relative/path.db`` or ``sqlite:////absolute/path.db``
+        :param busy_timeout: seconds to wait for another process's write lock
+        :param cleanup_interval: seconds between purges of expired counters
+        """
+        self.path = uri.split('://', 1)[1][1:] if '://' in uri else ''
+        if not self.path or self.path == ':memory:':
+            raise ConfigurationError('SQLiteStorage needs a database file shared by all workers')
+
+        self.busy_timeout = float(busy_timeout)
+        self.cleanup_interval = float(cleanup_interval)
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().execute(SCHEMA)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """One autocommit connection per thread, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _maybe_cleanup(self, conn, now):
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        conn.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+
+    def _incr(self, conn, key, expiry, amount, now):
+        return conn.execute(INCR_SQL, {
+            'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now
+        }).fetchone()[0]
+
+    def _live_count(self, conn, key, now):
+        row = conn.execute(
+            'SELECT count, expires_at FROM rate_limits WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return (row[0], row[1]) if row else (0, now)
+
+    def incr(self, key, expiry, amount=1, elastic_expiry=False):
+        now = time.time()
+        conn = self._connection()
+        self._maybe_cleanup(conn, now)
+        return self._incr(conn, key, expiry, amount, now)
+
+    def get(self, key):
+        return self._live_count(self._connection(), key, time.time())[0]
+
+    def get_expiry(self, key):
+        return self._live_count(self._connection(), key, time.time())[1]
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def _window_info(self, conn, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._live_count(conn, previous_key, now)[0]
+        current_count = self._live_count(conn, current_key, now)[0]
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        conn = self._connection()
+        self._maybe_cleanup(conn, now)
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            previous_count, previous_ttl, current_count, _ = self._window_info(conn, key, expiry, now)
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            if floor(weighted_count) + amount > limit:
+                conn.execute('ROLLBACK')
+                return False
+            # The current window's counter must outlive the next window, which weights it
+            current_key = self.sliding_window_keys(key, expiry, now)[1]
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            conn.execute('COMMIT')
+            return True
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+
+    def get_sliding_window(self, key, expiry):
+        return self._window_info(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        self._connection().execute(
+            'DELETE FROM rate_limits WHERE key IN (?, ?)', (previous_key, current_key)
+        )
@@ -0,0 +1,64 @@
+"""
+Per-application rate limiting.
+
+Flask-Limiter keeps its storage, strategy and enabled flag on the Limiter
+instance, so a module-level Limiter shared by every ``create_app()`` call would
+carry one app's configuration into the next. Views are decorated with this
+module's ``limit``, ``shared_limit`` and ``exempt`` instead, which only record
+the limits on the view function. ``init_app`` gives each app its own Limiter
+(``get_limiter(app)``), and ``limit_views`` applies the recorded limits to the
+app's registered views.
+"""
+
+from flask import current_app
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+DEFAULT_LIMITS = ['200 per day', '50 per hour']
+
+
+def _record(method, args, kwargs):
+    def decorator(view):
+        view.__dict__.setdefault('rate_limits', []).append((method, args, kwargs))
+        return view
+    return decorator
+
+
+def limit(*args, **kwargs):
+    """Like ``Limiter.limit``, applied to each app's Limiter by ``limit_views``"""
+    return _record('limit', args, kwargs)
+
+
+def shared_limit(*args, **kwargs):
+    """Like ``Limiter.shared_limit``, applied to each app's Limiter by ``limit_views``"""
+    return _record('shared_limit', args, kwargs)
+
+
+def exempt(view):
+    """Like ``Limiter.exempt``: not even the default limits apply to the view"""
+    view.rate_limit_exempt = True
+    return view
+
+
+def init_app(app):
+    """Create the app's Limiter; the storage and strategy come from the app config"""
+    limiter = Limiter(get_remote_address, default_limits=DEFAULT_LIMITS)
+    limiter.init_app(app)
+    app.extensions['rate_limiter'] = limiter
+
+
+def get_limiter(app=None):
+    return (app or current_app).extensions['rate_limiter']
+
+
+def limit_views(app):
+    """Apply the recorded limits to the registered views. Call after registering
+    the blueprints, before anything else wraps the views."""
+    limiter = get_limiter(app)
+    for endpoint, view in list(app.view_functions.items()):
+        if getattr(view, 'rate_limit_exempt', False):
+            limiter.exempt(view)
+        limited = view
+        for method, args, kwargs in getattr(view, 'rate_limits', ()):
+            limited = getattr(limiter, method)(*args, **kwargs)(limited)
+        app.view_functions[endpoint] = limited
@@ -0,0 +1,110 @@
+"""
+Batch resolution of polymorphic (table_name, record_id) references.
+
+Dispute, ContentModeration and AuditLog point at records through a table name
+and id. Resolving those one at a time costs a query per row; RecordResolver
+groups references by table and loads each table with a single IN query,
+remembering what it has loaded (including ids that no longer exist).
+"""
+
+from flask import g
+
+import metrics
+from models import (db, Officer, Department, Incident, Evidence, SocialMediaProfile,
+                    CommunityReport, User, OfficerDepartmentHistory, TaxpayerCost,
+                    OSINTProfile, AuditLog, ContentModeration, Dispute, Vehicle)
+
+RESOLVABLE_MODELS = {
+    model.__tablename__: model for model in (
+        Officer, Department, Incident, Evidence, SocialMediaProfile, CommunityReport,
+        User, OfficerDepartmentHistory, TaxpayerCost, OSINTProfile, AuditLog,
+        ContentModeration, Dispute, Vehicle
+    )
+}
+
+# Stay well below SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+_MISSING = object()
+
+
+def _reference(item):
+    """Accept a (table_name, record_id) pair or any object carrying both attributes"""
+    if isinstance(item, tuple):
+        return item
+    return item.table_name, item.record_id
+
+
+class RecordResolver:
+    """Resolve (table_name, record_id) references with one query per table"""
+
+    def __init__(self, session=None):
+        self.session = session or db.session
+        self._cache = {}
+
+    def load(self, references):
+        """Load every unresolved reference. Unknown table names are ignored."""
+        wanted = {}
+        hits = 0
+        for item in references:
+            table_name, record_id = _reference(item)
+            if table_name not in RESOLVABLE_MODELS or record_id is None:
+                continue
+            if (table_name, record_id) not in self._cache:
+                wanted.setdefault(table_name, set()).add(record_id)
+            else:
+                hits += 1
+        metrics.cache_lookup('record_resolver', hits=hits, misses=sum(len(ids) for ids in wanted.values()))
+
+        for table_name, record_ids in wanted.items():
+            model = RESOLVABLE_MODELS[table_name]
+            record_ids = sorted(record_ids)
+            for start in range(0, len(record_ids), IN_CHUNK_SIZE):
+                chunk = record_ids[start:start + IN_CHUNK_SIZE]
+                for record in self.session.query(model).filter(model.id.in_(chunk)):
+                    self._cache[(table_name, record.id)] = record
+            for record_id in record_ids:
+                self._cache.setdefault((table_name, record_id), _MISSING)
+        return self
+
+    def get(self, table_name, record_id):
+        """Return the record for one reference, or None if it does not exist"""
+        if (table_name, record_id) not in self._cache:
+            self.load([(table_name, record_id)])
+        record = self._cache.get((table_name, record_id), _MISSING)
+        return None if record is _MISSING else record
+
+    def resolve(self, references):
+        """Map each reference to its record (None when missing) in one pass"""
+        references = [_reference(item) for item in references]
+        self.load(references)
+        return {ref: self.get(*ref) for ref in references}
+
+    def clear(self):
+        self._cache.clear()
+
+
+def get_resolver():
+    """Request-scoped resolver, so views and templates share one identity cache"""
+    if 'record_resolver' not in g:
+        g.record_resolver = RecordResolver()
+    return g.record_resolver
+
+
+def record_label(table_name, record):
+    """Short human-readable description of a resolved record"""
+    if record is None:
+        return 'Deleted record'
+    if table_name == 'officers':
+        return f"{record.first_name} {record.last_name} ({record.badge_number})"
+    if table_name == 'incidents':
+        return f"{record.incident_type} - {record.incident_date}"
+    if table_name == 'evidence':
+        return f"{record.evidence_type}: {record.file_name}"
+    if table_name == 'community_reports':
+        return f"{record.report_type or 'Report'} from {record.reporter_name or 'Anonymous'}"
+    if table_name == 'departments':
+        return record.name
+    if table_name == 'users':
+        return record.username
+    return f"{table_name} #{record.id}"
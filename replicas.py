@@ -0,0 +1,106 @@
+"""
+Read/write routing between the primary database and read-only replicas.
+
+DATABASE_REPLICA_URLS lists replica databases, separated by commas. Examples
+are a PostgreSQL streaming replica, or a periodically refreshed copy of the
+SQLite file (``sqlite:///file:/srv/replica.db?mode=ro&uri=true``). Each
+replica becomes a Flask-SQLAlchemy bind named ``replica_<n>``.
+
+A GET or HEAD request reads from one replica picked at random, and keeps
+using it for the whole request. Everything else goes to the primary: other
+methods, paths under REPLICA_PRIMARY_PATHS (the admin pages), ORM flushes,
+INSERT/UPDATE/DELETE statements and SELECT ... FOR UPDATE. Once a request
+writes, its later reads also use the primary.
+
+A request that wrote sets a short-lived cookie, so the same browser reads
+from the primary for the next REPLICA_STICKY_SECONDS and sees its own
+changes despite replication lag.
+"""
+
+import os
+import random
+import time
+
+import flask_sqlalchemy.session
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+import database
+
+DEFAULT_STICKY_SECONDS = 10
+DEFAULT_PRIMARY_PATHS = ('/admin',)
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def replica_uris():
+    """Replica URLs from DATABASE_REPLICA_URLS"""
+    return [uri.strip() for uri in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if uri.strip()]
+
+
+def _is_write(clause):
+    if clause is None:
+        return False
+    return getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None
+
+
+class RoutingSession(flask_sqlalchemy.session.Session):
+    """Session that sends reads of read-only requests to the request's replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get('db_replica'):
+            if self._flushing or _is_write(clause):
+                _note_write()
+            else:
+                return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _note_write():
+    g.db_replica = None  # read our own writes for the rest of the request
+    g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    if has_request_context():
+        _note_write()
+
+
+def _sticky():
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def init_app(app):
+    """Register the replicas as binds. Call before db.init_app()."""
+    app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+    app.config.setdefault('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    app.config.setdefault('REPLICA_PRIMARY_PATHS', DEFAULT_PRIMARY_PATHS)
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    replicas = []
+    for index, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+        uri = database.normalize_uri(uri)
+        key = f'replica_{index}'
+        binds[key] = dict(database.engine_options(uri), url=uri)
+        replicas.append(key)
+    app.extensions['replicas'] = replicas
+    if not replicas:
+        return
+
+    @app.before_request
+    def choose_database():
+        if (request.method in SAFE_METHODS and not _sticky()
+                and not request.path.startswith(tuple(current_app.config['REPLICA_PRIMARY_PATHS']))):
+            g.db_replica = random.choice(replicas)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            seconds = current_app.config['REPLICA_STICKY_SECONDS']
+            response.set_cookie(STICKY_COOKIE, str(time.time() + seconds), max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,351 @@
+"""
+Declarative JSON serializers for the API and the exports.
+
+Each model has one Schema that names every field of its JSON representation
+and where the value comes from: an attribute path such as
+``current_department.name``, optionally formatted (ISO dates, truncated text),
+or a function of the object. Endpoints serialize through views: a subset of
+the fields, compiled once into a plain function that builds the dict without
+per-field lookups.
+
+Clients can ask for less: ``fields=id,last_name`` keeps only those fields of
+the view, and only the columns and joins they need are loaded (``sparse``).
+``fields[<embedded>]=`` does the same for an embedded resource, and
+``include=`` picks which resources are embedded at all (``includes``).
+
+``init_app`` switches jsonify to orjson when it is installed (JSON_BACKEND).
+The output is the same JSON as before, except that non-ASCII characters are
+written as UTF-8 instead of \\u escapes.
+"""
+
+import functools
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import joinedload, load_only
+
+from models import Officer, Incident, TaxpayerCost, Vehicle
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_BACKENDS = ('auto', 'orjson', 'json')
+SUBSET_CACHE_SIZE = 256  # compiled field subsets kept per view
+
+
+class InvalidFieldset(ValueError):
+    """fields= or include= names something the endpoint does not serve"""
+
+
+class Field:
+    """The value at an attribute path; None if any step on the way is None"""
+
+    def __init__(self, source=None):
+        self.source = source
+
+    @staticmethod
+    def access(source, var, lines):
+        """An expression for ``source`` on ``obj``; paths go through ``var``"""
+        first, *rest = source.split('.')
+        if not rest:
+            return f'obj.{first}'
+        lines.append(f'{var} = obj.{first}')
+        for part in rest:
+            lines.append(f'{var} = {var}.{part} if {var} is not None else None')
+        return var
+
+    def bound(self, index, lines):
+        """The value in a local variable, so it can be used twice"""
+        var = f'_{index}'
+        value = self.access(self.source, var, lines)
+        if value != var:
+            lines.append(f'{var} = {value}')
+        return var
+
+    def sources(self):
+        """The attribute paths the value is read from"""
+        return [self.source]
+
+    def emit(self, index, lines, namespace):
+        return self.access(self.source, f'_{index}', lines)
+
+
+class IsoDate(Field):
+    """A date or datetime as an ISO 8601 string"""
+
+    def emit(self, index, lines, namespace):
+        var = self.bound(index, lines)
+        return f'{var}.isoformat() if {var} is not None else None'
+
+
+class Truncated(Field):
+    """Text cut to at most ``length`` characters"""
+
+    def __init__(self, source=None, length=200):
+        super().__init__(source)
+        self.length = length
+
+    def emit(self, index, lines, namespace):
+        var = self.bound(index, lines)
+        return f'{var}[:{int(self.length)}] if {var} is not None else None'
+
+
+class Format(Field):
+    """Several attribute paths formatted into one string, e.g.
+    ``Format('{} {}', 'first_name', 'last_name')``"""
+
+    def __init__(self, template, *sources):
+        super().__init__(sources[0])
+        self.template = template
+        self.paths = sources
+
+    def sources(self):
+        return list(self.paths)
+
+    def emit(self, index, lines, namespace):
+        literals = [part.replace('{', '{{').replace('}', '}}') for part in self.template.split('{}')]
+        values = [self.access(source, f'_{index}_{n}', lines) for n, source in enumerate(self.paths)]
+        text = literals[0] + ''.join(f'{{{value}}}{literal}' for value, literal in zip(values, literals[1:]))
+        return 'f' + repr(text)
+
+
+class Computed(Field):
+    """``function(obj, context)``; context is passed to dump() by the endpoint.
+    ``requires`` lists the attribute paths the function reads."""
+
+    def __init__(self, function, requires=()):
+        super().__init__()
+        self.function = function
+        self.requires = requires
+
+    def sources(self):
+        return list(self.requires)
+
+    def emit(self, index, lines, namespace):
+        namespace[f'_function{index}'] = self.function
+        return f'_function{index}(obj, context)'
+
+
+class View:
+    """A compiled subset of a schema's fields"""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self._fields = fields
+        self.fields = tuple(key for key, _ in fields)
+        lines, namespace, items = [], {}, []
+        for index, (key, field) in enumerate(fields):
+            items.append(f'{key!r}: {field.emit(index, lines, namespace)}')
+        body = ''.join(f'    {line}\n' for line in lines)
+        self.source = f'def serialize(obj, context=None):\n{body}    return {{{", ".join(items)}}}\n'
+        exec(compile(self.source, f'<serializer {model.__name__}>', 'exec'), namespace)
+        self.dump = namespace['serialize']
+
+    def dump_many(self, objs, context=None):
+        dump = self.dump
+        return [dump(obj, context) for obj in objs]
+
+    @functools.lru_cache(maxsize=SUBSET_CACHE_SIZE)
+    def _subset(self, names):
+        return View(self.model, [(key, field) for key, field in self._fields if key in names])
+
+    def subset(self, names):
+        """The view with only ``names`` (and ``id``), in this view's order"""
+        names = frozenset(names) | ({'id'} & set(self.fields))
+        return self if names == set(self.fields) else self._subset(names)
+
+    def load_options(self, *extra_columns):
+        """Loader options that load just the columns and relationships this view
+        reads, plus ``extra_columns`` the caller needs"""
+        columns, related = {'id', *extra_columns}, {}
+        for _, field in self._fields:
+            for source in field.sources():
+                first, *rest = source.split('.')
+                if rest:
+                    related.setdefault(first, set()).add(rest[0])
+                else:
+                    columns.add(first)
+        options = [load_only(*(getattr(self.model, column) for column in sorted(columns)))]
+        for name, attributes in sorted(related.items()):
+            relationship = getattr(self.model, name)
+            target = relationship.property.mapper.class_
+            options.append(joinedload(relationship).load_only(*(getattr(target, a) for a in sorted(attributes))))
+        return options
+
+
+class Schema:
+    """The JSON fields of one model; field names default to the attribute"""
+
+    def __init__(self, model, /, **fields):
+        self.model = model
+        self.fields = fields
+        for key, field in fields.items():
+            if field.source is None and not isinstance(field, Computed):
+                field.source = key
+
+    def view(self, *names, **overrides):
+        """Compile the named fields, plus ``overrides`` that replace or add fields"""
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise KeyError(f'{self.model.__name__} has no fields {", ".join(unknown)}')
+        for key, field in overrides.items():
+            if field.source is None and not isinstance(field, Computed):
+                field.source = key
+        fields = [(name, self.fields[name]) for name in names if name not in overrides]
+        return View(self.model, fields + list(overrides.items()))
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def sparse(view, args, param='fields'):
+    """The part of ``view`` a request asks for with ``fields=a,b``; all of it
+    when the parameter is absent. ``id`` is always kept."""
+    if param not in args:
+        return view
+    names = _names(args[param])
+    unknown = [name for name in names if name not in view.fields]
+    if unknown:
+        raise InvalidFieldset(f'Unknown field {", ".join(unknown)} in {param}; '
+                              f'available: {", ".join(view.fields)}')
+    return view.subset(names)
+
+
+def includes(args, available, default):
+    """The embedded resources a request asks for with ``include=a,b``;
+    ``default`` when the parameter is absent, none when it is empty"""
+    if 'include' not in args:
+        return list(default)
+    names = _names(args['include'])
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise InvalidFieldset(f'Cannot include {", ".join(unknown)}; available: {", ".join(available)}')
+    return names
+
+
+def _incident_count(obj, context):
+    return context['incident_counts'].get(obj.id, 0)
+
+
+OFFICER = Schema(
+    Officer,
+    id=Field(),
+    badge_number=Field(),
+    first_name=Field(),
+    last_name=Field(),
+    middle_name=Field(),
+    name=Format('{} {}', 'first_name', 'last_name'),
+    department=Field('current_department.name'),
+    rank=Field('current_rank'),
+    status=Field(),
+    hire_date=IsoDate(),
+    incident_count=Computed(_incident_count),  # context: {'incident_counts': {officer_id: count}}
+)
+
+INCIDENT = Schema(
+    Incident,
+    id=Field(),
+    officer_id=Field(),
+    officer_name=Format('{} {}', 'officer.first_name', 'officer.last_name'),
+    date=IsoDate('incident_date'),
+    type=Field('incident_type'),
+    location=Field(),
+    description=Field(),
+    outcome=Field(),
+    charges_filed=Field(),
+    conviction_date=IsoDate(),
+    sentence=Field(),
+    settlement_amount=Field(),
+)
+
+TAXPAYER_COST = Schema(
+    TaxpayerCost,
+    id=Field(),
+    officer_id=Field(),
+    type=Field('cost_type'),
+    amount=Field(),
+    description=Field(),
+    date=IsoDate('date_occurred'),
+)
+
+VEHICLE = Schema(
+    Vehicle,
+    id=Field(),
+    officer_id=Field(),
+    vehicle_type=Field(),
+    make=Field(),
+    model=Field(),
+    year=Field(),
+    color=Field(),
+    license_plate=Field(),
+    state=Field(),
+    is_unmarked=Field(),
+    last_seen_location=Field(),
+    last_seen_date=IsoDate(),
+)
+
+# The views the endpoints serve
+OFFICER_LISTING = OFFICER.view('id', 'badge_number', 'first_name', 'last_name', 'department', 'status',
+                               'incident_count')
+OFFICER_DETAIL = OFFICER.view('id', 'badge_number', 'first_name', 'last_name', 'middle_name', 'department',
+                              'rank', 'status', 'hire_date')
+OFFICER_EXPORT = OFFICER.view('name', 'badge_number', 'department', 'status')
+OFFICER_SEARCH = OFFICER.view('id', 'first_name', 'last_name', 'badge_number')
+INCIDENT_DETAIL = INCIDENT.view(*INCIDENT.fields)
+INCIDENT_LISTING = INCIDENT.view('id', 'officer_id', 'officer_name', 'date', 'type', 'location',
+                                 description=Truncated('description', 200))
+INCIDENT_BRIEF = INCIDENT.view('id', 'date', 'type', 'description')
+INCIDENT_EXPORT = INCIDENT.view('date', 'type', 'description', 'outcome', 'charges_filed', 'conviction_date',
+                                'sentence', 'settlement_amount')
+INCIDENT_SEARCH = INCIDENT.view('id', 'officer_id', 'officer_name', incident_type=Field())
+TAXPAYER_COST_BRIEF = TAXPAYER_COST.view('id', 'type', 'amount', 'description', 'date')
+TAXPAYER_COST_EXPORT = TAXPAYER_COST.view('type', 'amount', 'description', 'date')
+VEHICLE_BRIEF = VEHICLE.view('id', 'vehicle_type', 'make', 'model', 'year', 'color', 'license_plate', 'state',
+                             'is_unmarked', 'last_seen_location', 'last_seen_date')
+VEHICLE_SEARCH = VEHICLE.view('id', 'make', 'model', 'license_plate', 'officer_id')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON provider on top of orjson.
+
+    Dates still go through Flask's default (HTTP date strings), and keys are
+    still sorted, so responses match the default provider.
+    """
+
+    def _options(self, indent=False):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)  # json.dumps options orjson does not have
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Use orjson for jsonify and request.get_json when JSON_BACKEND allows it"""
+    app.config.setdefault('JSON_BACKEND', 'auto')
+    backend = app.config['JSON_BACKEND']
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f'JSON_BACKEND must be one of {", ".join(JSON_BACKENDS)}, not {backend!r}')
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_BACKEND is orjson but the orjson package is not installed')
+    if backend != 'json' and orjson is not None:
+        app.json = OrjsonProvider(app)
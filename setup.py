@@ -12,9 +12,11 @@ from werkzeug.security import generate_password_hash
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from app import create_app, db, init_db
 from models import User
 
+app = create_app()
+
 def create_admin_user():
     """Create initial admin user"""
     with app.app_context():
@@ -82,8 +84,12 @@ def main():
     
     # Create database tables
     with app.app_context():
-        db.create_all()
+        added, queued = init_db()
         print("✅ Database tables created")
+        if added:
+            print(f"✅ Added {len(added)} new columns to existing tables")
+        if queued:
+            print(f"✅ Queued {queued} unverified records for moderation")
     
     # Create admin user
     create_admin_user()
@@ -100,7 +106,7 @@ def main():
     print("\n⚠️  Security Notice:")
     print("- Change default passwords immediately")
     print("- Use HTTPS in production")
-    print("- Regularly backup the database")
+    print("- Back up the database regularly with: python backup.py snapshot")
     print("- Monitor audit logs for suspicious activity")
 
 if __name__ == '__main__':
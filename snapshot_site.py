@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Bad Apples Static Snapshot
+Renders the public pages into a static tree that a plain web server can
+serve during traffic spikes
+
+Usage: python snapshot_site.py [--out instance/site] [--full]
+
+The pages are rendered by the app's own views and templates:
+
+    /                   index.html
+    /analytics          analytics.html
+    /officers?page=N    officers/page-N.html
+    /officer/<id>       officer/<id>.html
+    /static/...         static/...
+
+Each file also gets a .gz copy, and a .br copy when the brotli package is
+installed, for nginx's gzip_static and brotli_static.
+
+Each build records in .snapshot.json the change feed cursor it rendered up to
+(see change_feed.py). The next build only re-renders the pages of officers
+whose record, incidents, taxpayer costs, verified evidence or department
+changed since then. It also re-renders the officer list pages those officers
+are on and the two summary pages. Files whose content did not change are not
+rewritten. The change log does not record social media profiles, vehicles,
+department history or unverified evidence; a nightly --full build picks
+those up.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import change_feed
+import compression
+from app import OFFICERS_PER_PAGE, create_app
+from models import db, Officer, OfficerDepartmentHistory
+
+MANIFEST = '.snapshot.json'
+SUMMARY_PAGES = {'/': 'index.html', '/analytics': 'analytics.html'}
+PAGE_BROTLI_QUALITY = 9  # pages are re-rendered often; quality 11 would dominate the build time
+
+
+def default_output_dir():
+    return os.getenv('SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'site'))
+
+
+def officer_page(officer_id):
+    return f'officer/{officer_id}.html'
+
+
+def list_page(page):
+    return f'officers/page-{page}.html'
+
+
+class Build:
+    """One build into ``out``, starting from the previous build's manifest"""
+
+    def __init__(self, app, out):
+        self.app = app
+        self.client = app.test_client()
+        self.out = out
+        try:
+            with open(os.path.join(out, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {'cursor': None, 'pages': {}}
+        self.pages = dict(self.manifest['pages'])  # relative path -> sha256 of the content
+        self.rendered = self.written = self.removed = 0
+
+    def render(self, url, path):
+        """Render ``url`` into ``path``; a page that no longer exists is removed"""
+        response = self.client.get(url)
+        self.rendered += 1
+        if response.status_code != 200:
+            self.remove(path)
+            return
+        self.store(path, response.get_data())
+
+    def store(self, path, data, brotli_quality=PAGE_BROTLI_QUALITY):
+        digest = hashlib.sha256(data).hexdigest()
+        if self.pages.get(path) == digest and os.path.exists(os.path.join(self.out, path)):
+            return
+        compression.write_with_variants(os.path.join(self.out, path), data, brotli_quality)
+        self.pages[path] = digest
+        self.written += 1
+
+    def remove(self, path):
+        if self.pages.pop(path, None) is not None:
+            compression.remove_with_variants(os.path.join(self.out, path))
+            self.removed += 1
+
+    def copy_static(self):
+        for root, _, files in os.walk(self.app.static_folder):
+            for name in files:
+                source = os.path.join(root, name)
+                path = os.path.join('static', os.path.relpath(source, self.app.static_folder))
+                with open(source, 'rb') as f:
+                    self.store(path, f.read(), compression.BROTLI_QUALITY)
+
+    def save(self, cursor):
+        self.manifest.update(cursor=cursor, built=datetime.utcnow().isoformat() + 'Z', pages=self.pages)
+        tmp = os.path.join(self.out, MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, os.path.join(self.out, MANIFEST))
+
+
+def changed_officers(since, through):
+    """Officers whose pages depend on changes after ``since``: (changed, deleted)"""
+    changed, deleted, departments = set(), set(), set()
+    for table_name, record_id, operation, officer_id in change_feed.entries_between(since, through):
+        if table_name == 'departments':
+            departments.add(record_id)
+        elif table_name == 'officers' and operation == 'delete':
+            deleted.add(record_id)
+        elif officer_id is not None:
+            changed.add(officer_id)
+    if departments:
+        changed.update(db.session.execute(
+            db.select(Officer.id).where(Officer.current_department_id.in_(departments))
+            .union(db.select(OfficerDepartmentHistory.officer_id)
+                   .where(OfficerDepartmentHistory.department_id.in_(departments)))
+        ).scalars())
+    return changed - deleted, deleted
+
+
+def build(app, out, full=False):
+    """Bring the static tree in ``out`` up to date; returns the Build"""
+    os.makedirs(out, exist_ok=True)
+    run = Build(app, out)
+    with app.app_context():
+        through = change_feed.latest_cursor(app.config['CHANGE_FEED_SETTLE_SECONDS'])
+        since = run.manifest['cursor']
+        if since is not None and not full:
+            try:
+                officers, deleted = changed_officers(since, through)
+            except change_feed.ResyncRequired:
+                full = True
+        if since is None or full:
+            officers = set(db.session.execute(db.select(Officer.id)).scalars())
+            deleted = {int(path[len('officer/'):-len('.html')]) for path in run.pages
+                       if path.startswith('officer/')} - officers
+        total = db.session.execute(db.select(db.func.count(Officer.id))).scalar()
+
+        def page_of(officer_id):
+            before = db.session.execute(
+                db.select(db.func.count(Officer.id)).where(Officer.id < officer_id)).scalar()
+            return before // OFFICERS_PER_PAGE + 1
+
+        list_pages = max(1, -(-total // OFFICERS_PER_PAGE))
+        if since is None or full:
+            pages = set(range(1, list_pages + 1))
+        else:
+            pages = {page_of(officer_id) for officer_id in officers}
+            if deleted:  # later officers move up a page
+                pages.update(range(min(page_of(officer_id) for officer_id in deleted), list_pages + 1))
+        db.session.remove()
+
+    for officer_id in sorted(officers):
+        run.render(f'/officer/{officer_id}', officer_page(officer_id))
+    for officer_id in deleted:
+        run.remove(officer_page(officer_id))
+    for page in sorted(pages):
+        if page <= list_pages:
+            run.render(f'/officers?page={page}', list_page(page))
+    for path in list(run.pages):
+        if path.startswith('officers/page-') and int(path[len('officers/page-'):-len('.html')]) > list_pages:
+            run.remove(path)
+    if full or through != since:
+        for url, path in SUMMARY_PAGES.items():
+            run.render(url, path)
+    run.copy_static()
+    run.save(through)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render the public pages into a static tree')
+    parser.add_argument('--out', default=default_output_dir(), help='output directory (default instance/site)')
+    parser.add_argument('--full', action='store_true', help='re-render every page')
+    args = parser.parse_args()
+
+    app = create_app({'RATELIMIT_ENABLED': False})
+    print("🗂️  Bad Apples Static Snapshot")
+    print("=" * 40)
+
+    started = time.perf_counter()
+    run = build(app, args.out, args.full)
+    print(f"✅ Rendered {run.rendered} pages, wrote {run.written} files, removed {run.removed} "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"   {args.out} (cursor {run.manifest['cursor']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+SQLite runtime tuning.
+
+Every new SQLite connection gets the configured pragmas:
+
+- SQLITE_JOURNAL_MODE (default WAL): readers no longer block the writer,
+  and the writer no longer blocks readers.
+- SQLITE_SYNCHRONOUS (default NORMAL): with WAL this only risks the last
+  transactions on power loss. It never risks corruption.
+- SQLITE_CACHE_SIZE_KB: the page cache per connection.
+- SQLITE_MMAP_SIZE: how many bytes of the file are read through mmap.
+- SQLITE_BUSY_TIMEOUT_MS: how long a write waits for the lock before failing
+  with "database is locked".
+
+Writes that still lose the race for the lock are retried by
+``commit_with_retry`` and ``run_with_retry``, up to SQLITE_BUSY_RETRIES
+times with backoff. Every write a request makes goes through one of them.
+Retries, lock errors and write times are exported by metrics.py.
+"""
+
+import random
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+import database
+import metrics
+import query_detector
+from models import db
+
+DEFAULT_JOURNAL_MODE = 'WAL'
+DEFAULT_SYNCHRONOUS = 'NORMAL'
+DEFAULT_CACHE_SIZE_KB = 65536
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_BUSY_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.05
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+def pragmas(config):
+    """The PRAGMA statements for the app's configuration, validated"""
+    journal_mode = config['SQLITE_JOURNAL_MODE'].upper()
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f'SQLITE_JOURNAL_MODE must be one of {sorted(JOURNAL_MODES)}')
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f'SQLITE_SYNCHRONOUS must be one of {sorted(SYNCHRONOUS_LEVELS)}')
+    return [
+        f'PRAGMA busy_timeout={int(config["SQLITE_BUSY_TIMEOUT_MS"])}',
+        f'PRAGMA journal_mode={journal_mode}',
+        f'PRAGMA synchronous={synchronous}',
+        f'PRAGMA cache_size={-int(config["SQLITE_CACHE_SIZE_KB"])}',  # negative means KiB
+        f'PRAGMA mmap_size={int(config["SQLITE_MMAP_SIZE"])}',
+    ]
+
+
+def _apply_pragmas(statements):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def tune(engine, config):
+    """Apply the pragmas to every new connection of a SQLite engine, sync or async"""
+    if engine.dialect.name == 'sqlite':
+        event.listen(getattr(engine, 'sync_engine', engine), 'connect', _apply_pragmas(pragmas(config)))
+
+
+def run_with_retry(write):
+    """Call ``write()`` and commit, retrying the whole transaction when the
+    database is locked. Returns what ``write`` returned.
+
+    A retry rolls back, which expires every loaded object, and calls ``write``
+    again: it must load what it changes and make all of its changes itself.
+    """
+    retries = current_app.config.get('SQLITE_BUSY_RETRIES', DEFAULT_BUSY_RETRIES)
+    mark = query_detector.checkpoint()
+    for attempt in range(retries + 1):
+        try:
+            result = write()
+            db.session.commit()
+            return result
+        except OperationalError as e:
+            db.session.rollback()
+            if attempt == retries or not database.is_lock_error(e.orig):
+                raise
+        query_detector.rewind(mark)
+        metrics.inc('badapples_db_busy_retries_total')
+        time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def commit_with_retry(*objects):
+    """Add new rows and commit, retrying when the database is locked.
+
+    Only for transactions that insert new objects: a retry adds ``objects``
+    again, but changes to already loaded objects would be lost. Use
+    ``run_with_retry`` for those.
+    """
+    run_with_retry(lambda: db.session.add_all(objects))
+
+
+def init_app(app):
+    """Tune every SQLite connection of ``db``. Call after db.init_app()."""
+    app.config.setdefault('SQLITE_JOURNAL_MODE', DEFAULT_JOURNAL_MODE)
+    app.config.setdefault('SQLITE_SYNCHRONOUS', DEFAULT_SYNCHRONOUS)
+    app.config.setdefault('SQLITE_CACHE_SIZE_KB', DEFAULT_CACHE_SIZE_KB)
+    app.config.setdefault('SQLITE_MMAP_SIZE', DEFAULT_MMAP_SIZE)
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_BUSY_TIMEOUT_MS)
+    app.config.setdefault('SQLITE_BUSY_RETRIES', DEFAULT_BUSY_RETRIES)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            tune(engine, app.config)
@@ -85,6 +85,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // Hide results if query too short
             if (query.length < 3) {
+                if (liveSearchRequest) liveSearchRequest.abort();
                 searchResultsDiv.classList.add('d-none');
                 return;
             }
@@ -103,10 +104,56 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    async function performLiveSearch(query, resultsDiv) {
+    // Recent results by exact query. A longer query can find officers a
+    // shorter one did not (names are matched by similarity, not only by
+    // substring), so every new query goes to the server.
+    const liveSearchCache = new Map();
+    const LIVE_SEARCH_CACHE_SIZE = 50;
+    const LIVE_SEARCH_CACHE_TTL = 60 * 1000;
+    let liveSearchRequest = null;
+
+    function cachedLiveSearch(query) {
+        const key = query.toLowerCase();
+        const now = Date.now();
+        for (const [cachedQuery, entry] of liveSearchCache) {
+            if (now - entry.time > LIVE_SEARCH_CACHE_TTL) {
+                liveSearchCache.delete(cachedQuery);
+            }
+        }
+        const entry = liveSearchCache.get(key);
+        return entry ? entry.data : null;
+    }
+
+    async function fetchLiveSearch(query) {
+        // Only the latest query matters: abort the one still in flight,
+        // which also stops its work on the server (see asgi.py)
+        if (liveSearchRequest) liveSearchRequest.abort();
+
+        const cached = cachedLiveSearch(query);
+        if (cached) return cached;
+
+        const request = liveSearchRequest = new AbortController();
         try {
-            const response = await fetch(`/api/live_search?q=${encodeURIComponent(query)}`);
+            const response = await fetch(`/api/live_search?q=${encodeURIComponent(query)}`,
+                                         {signal: request.signal});
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
             const data = await response.json();
+            liveSearchCache.delete(query.toLowerCase());
+            liveSearchCache.set(query.toLowerCase(), {data: data, time: Date.now()});
+            if (liveSearchCache.size > LIVE_SEARCH_CACHE_SIZE) {
+                liveSearchCache.delete(liveSearchCache.keys().next().value);
+            }
+            return data;
+        } finally {
+            if (liveSearchRequest === request) liveSearchRequest = null;
+        }
+    }
+
+    async function performLiveSearch(query, resultsDiv) {
+        try {
+            const data = await fetchLiveSearch(query);
+            // The user kept typing while this was loading: leave the results to the newer query
+            if (searchInput.value.trim() !== query) return;
             
             if (data.officers.length === 0 && data.incidents.length === 0 && data.vehicles.length === 0) {
                 resultsDiv.innerHTML = '<div class="p-3 text-muted"><i class="fas fa-search me-2"></i>No results found</div>';
@@ -158,6 +205,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             resultsDiv.classList.remove('d-none');
         } catch (error) {
+            if (error.name === 'AbortError') return;  // superseded by a newer query
             console.error('Search error:', error);
             resultsDiv.innerHTML = '<div class="p-3 text-danger"><i class="fas fa-exclamation-circle me-2"></i>Error performing search</div>';
             resultsDiv.classList.remove('d-none');
@@ -224,8 +272,8 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // Clear form data on successful submission
-    const forms = document.querySelectorAll('form');
-    forms.forEach(form => {
+    const savedForms = document.querySelectorAll('form');
+    savedForms.forEach(form => {
         form.addEventListener('submit', function() {
             // Clear localStorage after successful submission
             setTimeout(() => {
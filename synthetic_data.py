@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Bad Apples Synthetic Data Generator
+Fills a database with seeded, deterministic data for load and benchmark testing
+
+Usage: python synthetic_data.py --rows 100000 [--seed 42] [--database sqlite:///bench.db]
+
+The same --rows and --seed always produce the same data. Incidents follow a
+heavy-tailed distribution over officers (a few officers account for many
+incidents), as in real misconduct datasets.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, insert
+
+from models import (db, Department, Officer, OfficerDepartmentHistory, Incident, Evidence,
+                    TaxpayerCost, Dispute, AuditLog)
+
+# Share of --rows generated for each table; departments are sized separately
+TABLE_SHARES = {
+    'officers': 0.10,
+    'officer_department_history': 0.15,
+    'incidents': 0.30,
+    'evidence': 0.15,
+    'taxpayer_costs': 0.05,
+    'disputes': 0.01,
+    'audit_logs': 0.24,
+}
+
+BATCH_SIZE = 10000
+
+FIRST_NAMES = ['James', 'Michael', 'Robert', 'John', 'David', 'William', 'Richard', 'Joseph',
+               'Thomas', 'Christopher', 'Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth',
+               'Barbara', 'Susan', 'Jessica', 'Sarah', 'Karen', 'Daniel', 'Matthew', 'Anthony',
+               'Mark', 'Steven', 'Paul', 'Andrew', 'Joshua', 'Kevin', 'Brian', 'Jose', 'Carlos']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson',
+              'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Thompson', 'White',
+              'Harris', 'Clark', 'Lewis', 'Robinson', 'Walker', 'McDonald', 'MacDonald', "O'Brien"]
+STATES = ['CA', 'TX', 'FL', 'NY', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI', 'NJ', 'VA', 'WA', 'AZ']
+RANKS = ['Officer', 'Officer', 'Officer', 'Detective', 'Corporal', 'Sergeant', 'Lieutenant', 'Captain']
+STATUSES = ['active'] * 14 + ['suspended', 'terminated', 'terminated', 'retired', 'retired']
+INCIDENT_TYPES = ['Excessive Force', 'Excessive Force', 'Misconduct', 'Misconduct', 'False Arrest',
+                  'Racial Profiling', 'Illegal Search', 'Harassment', 'Perjury', 'Domestic Violence',
+                  'Evidence Tampering', 'Unlawful Detention']
+OUTCOMES = [None, None, 'pending', 'settlement', 'settlement', 'dismissed', 'acquittal', 'conviction']
+EVIDENCE_TYPES = ['photo', 'photo', 'video', 'document', 'document', 'audio']
+MIME_TYPES = {'photo': 'image/jpeg', 'video': 'video/mp4', 'document': 'application/pdf', 'audio': 'audio/mpeg'}
+COST_TYPES = ['lawsuit', 'lawsuit', 'fine', 'conviction', 'disciplinary', 'training', 'other']
+DISPUTE_TYPES = ['factual_error', 'factual_error', 'privacy_violation', 'harassment', 'inappropriate', 'duplicate', 'other']
+AUDIT_ACTIONS = ['create', 'create', 'update', 'view', 'view', 'view', 'approve', 'reject', 'dispute']
+AUDITED_TABLES = ['officers', 'incidents', 'incidents', 'evidence', 'taxpayer_costs', 'community_reports']
+WORDS = ('officer subject vehicle stop arrest complaint witness report video footage force '
+         'department review board lawsuit injury detained searched released statement').split()
+
+START_DATE = date(2000, 1, 1)
+DATE_RANGE_DAYS = (date(2025, 12, 31) - START_DATE).days
+
+
+def table_sizes(rows):
+    """Number of rows to generate per table for a total of roughly ``rows``"""
+    sizes = {table: max(1, int(rows * share)) for table, share in TABLE_SHARES.items()}
+    sizes['departments'] = max(5, rows // 2000)
+    return sizes
+
+
+class Generator:
+    """Deterministic row generator; each table draws from its own seeded stream"""
+
+    def __init__(self, rows, seed=42, id_offsets=None):
+        self.rows = rows
+        self.seed = seed
+        self.sizes = table_sizes(rows)
+        self.offsets = id_offsets or {}
+        self._officer_weights = None
+
+    def _rng(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+    def _ids(self, table):
+        offset = self.offsets.get(table, 0)
+        return range(offset + 1, offset + self.sizes[table] + 1)
+
+    def _date(self, rng, start=START_DATE, span=DATE_RANGE_DAYS):
+        return start + timedelta(days=rng.randrange(max(1, span)))
+
+    def _timestamp(self, rng):
+        return datetime.combine(self._date(rng), datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+
+    def _text(self, rng, words):
+        return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+    def _officer(self, rng):
+        """Pick an officer id with heavy-tailed weights"""
+        if self._officer_weights is None:
+            weight_rng = self._rng('officer_weights')
+            weights = [weight_rng.paretovariate(1.5) for _ in self._ids('officers')]
+            self._officer_ids = list(self._ids('officers'))
+            total = sum(weights)
+            running = 0
+            self._officer_weights = []
+            for weight in weights:
+                running += weight / total
+                self._officer_weights.append(running)
+        return rng.choices(self._officer_ids, cum_weights=self._officer_weights)[0]
+
+    def departments(self):
+        rng = self._rng('departments')
+        for department_id in self._ids('departments'):
+            state = rng.choice(STATES)
+            city = rng.choice(LAST_NAMES) + rng.choice(['ville', ' City', 'ton', ' Heights', ' Springs'])
+            yield {
+                'id': department_id,
+                'name': f'{city} Police Department #{department_id}',
+                'jurisdiction': rng.choice(['city', 'city', 'county', 'state']),
+                'location': f'{city}, {state}',
+                'state': state,
+                'phone': f'(555) {rng.randrange(100, 999)}-{rng.randrange(1000, 9999)}',
+                'created_at': self._timestamp(rng),
+            }
+
+    def officers(self):
+        rng = self._rng('officers')
+        departments = list(self._ids('departments'))
+        for officer_id in self._ids('officers'):
+            created = self._timestamp(rng)
+            yield {
+                'id': officer_id,
+                'badge_number': f'B{officer_id:08d}',
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': rng.choice(LAST_NAMES),
+                'middle_name': rng.choice(FIRST_NAMES) if rng.random() < 0.3 else None,
+                'current_department_id': rng.choice(departments),
+                'current_rank': rng.choice(RANKS),
+                'hire_date': self._date(rng),
+                'status': rng.choice(STATUSES),
+                'created_at': created,
+                'updated_at': created,
+            }
+
+    def officer_department_history(self):
+        rng = self._rng('officer_department_history')
+        departments = list(self._ids('departments'))
+        for history_id in self._ids('officer_department_history'):
+            start = self._date(rng)
+            yield {
+                'id': history_id,
+                'officer_id': self._officer(rng),
+                'department_id': rng.choice(departments),
+                'start_date': start,
+                'end_date': start + timedelta(days=rng.randrange(90, 3650)) if rng.random() < 0.7 else None,
+                'rank': rng.choice(RANKS),
+                'reason_for_transfer': self._text(rng, 8) if rng.random() < 0.4 else None,
+                'created_at': self._timestamp(rng),
+            }
+
+    def incidents(self):
+        rng = self._rng('incidents')
+        for incident_id in self._ids('incidents'):
+            created = self._timestamp(rng)
+            outcome = rng.choice(OUTCOMES)
+            yield {
+                'id': incident_id,
+                'officer_id': self._officer(rng),
+                'incident_date': self._date(rng),
+                'incident_type': rng.choice(INCIDENT_TYPES),
+                'description': self._text(rng, rng.randrange(20, 120)),
+                'location': f'{rng.randrange(1, 9999)} {rng.choice(LAST_NAMES)} St',
+                'outcome': outcome,
+                'charges_filed': outcome == 'conviction' or rng.random() < 0.1,
+                'settlement_amount': round(rng.lognormvariate(11, 1.5), 2) if outcome == 'settlement' else None,
+                'case_number': f'{rng.randrange(1990, 2026)}-CV-{rng.randrange(10000, 99999)}' if outcome else None,
+                'source': rng.choice(['news article', 'court record', 'community report']),
+                'verified': rng.random() < 0.6,
+                'created_at': created,
+                'updated_at': created,
+            }
+
+    def evidence(self):
+        rng = self._rng('evidence')
+        incidents = self.sizes['incidents']
+        incident_offset = self.offsets.get('incidents', 0)
+        for evidence_id in self._ids('evidence'):
+            evidence_type = rng.choice(EVIDENCE_TYPES)
+            extension = MIME_TYPES[evidence_type].split('/')[1]
+            file_name = f'evidence_{evidence_id}.{extension}'
+            yield {
+                'id': evidence_id,
+                'officer_id': self._officer(rng),
+                'incident_id': incident_offset + rng.randrange(1, incidents + 1) if rng.random() < 0.8 else None,
+                'evidence_type': evidence_type,
+                'file_path': os.path.join('uploads', file_name),
+                'file_name': file_name,
+                'file_size': int(rng.lognormvariate(13, 1.2)),
+                'mime_type': MIME_TYPES[evidence_type],
+                'description': self._text(rng, 12),
+                'source': rng.choice(['community upload', 'news media', 'court record']),
+                'verified': rng.random() < 0.5,
+                'created_at': self._timestamp(rng),
+            }
+
+    def taxpayer_costs(self):
+        rng = self._rng('taxpayer_costs')
+        for cost_id in self._ids('taxpayer_costs'):
+            occurred = self._date(rng)
+            yield {
+                'id': cost_id,
+                'officer_id': self._officer(rng),
+                'cost_type': rng.choice(COST_TYPES),
+                'amount': round(rng.lognormvariate(10.5, 1.8), 2),
+                'description': self._text(rng, 15),
+                'case_number': f'{occurred.year}-CV-{rng.randrange(10000, 99999)}',
+                'date_occurred': occurred,
+                'date_paid': occurred + timedelta(days=rng.randrange(30, 900)) if rng.random() < 0.7 else None,
+                'source': 'court record',
+                'verified': rng.random() < 0.7,
+                'created_at': self._timestamp(rng),
+            }
+
+    def disputes(self):
+        rng = self._rng('disputes')
+        for dispute_id in self._ids('disputes'):
+            table_name = rng.choice(['officers', 'incidents', 'incidents', 'evidence'])
+            status = rng.choice(['pending', 'pending', 'under_review', 'resolved', 'dismissed'])
+            yield {
+                'id': dispute_id,
+                'table_name': table_name,
+                'record_id': self.offsets.get(table_name, 0) + rng.randrange(1, self.sizes[table_name] + 1),
+                'dispute_type': rng.choice(DISPUTE_TYPES),
+                'description': self._text(rng, 30),
+                'disputer_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'status': status,
+                'resolution': self._text(rng, 10) if status in ('resolved', 'dismissed') else None,
+                'ip_address': f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}',
+                'created_at': self._timestamp(rng),
+            }
+
+    def audit_logs(self):
+        rng = self._rng('audit_logs')
+        for log_id in self._ids('audit_logs'):
+            table_name = rng.choice(AUDITED_TABLES)
+            size = self.sizes.get(table_name, 1000)
+            yield {
+                'id': log_id,
+                'table_name': table_name,
+                'record_id': self.offsets.get(table_name, 0) + rng.randrange(1, size + 1),
+                'action': rng.choice(AUDIT_ACTIONS),
+                'ip_address': f'192.168.{rng.randrange(256)}.{rng.randrange(256)}',
+                'user_agent': 'Mozilla/5.0 (synthetic)',
+                'timestamp': self._timestamp(rng),
+            }
+
+
+# Load order respects foreign keys
+LOAD_ORDER = [
+    ('departments', Department),
+    ('officers', Officer),
+    ('officer_department_history', OfficerDepartmentHistory),
+    ('incidents', Incident),
+    ('evidence', Evidence),
+    ('taxpayer_costs', TaxpayerCost),
+    ('disputes', Dispute),
+    ('audit_logs', AuditLog),
+]
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load(rows, seed=42, progress=print):
+    """Generate and bulk-insert synthetic data into the current app's database.
+
+    New ids continue after the existing ones, so loading into a non-empty
+    database is safe. Returns the number of rows inserted per table.
+    """
+    offsets = {table: db.session.query(func.max(model.id)).scalar() or 0 for table, model in LOAD_ORDER}
+    generator = Generator(rows, seed=seed, id_offsets=offsets)
+
+    connection = db.session.connection()
+    is_sqlite = connection.dialect.name == 'sqlite'
+    if is_sqlite:
+        # A throwaway bulk load does not need per-transaction durability
+        synchronous = connection.exec_driver_sql('PRAGMA synchronous').scalar()
+        connection.exec_driver_sql('PRAGMA synchronous=OFF')
+
+    counts = {}
+    for table, model in LOAD_ORDER:
+        started = time.perf_counter()
+        count = 0
+        for batch in _batches(getattr(generator, table)()):
+            db.session.execute(insert(model), batch)
+            count += len(batch)
+        db.session.commit()
+        counts[table] = count
+        if progress:
+            progress(f"   {table:<28} {count:>10,} rows  {time.perf_counter() - started:6.2f}s")
+
+    if is_sqlite:
+        db.session.connection().exec_driver_sql(f'PRAGMA synchronous={int(synchronous)}')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load seeded synthetic data for benchmarking')
+    parser.add_argument('--rows', type=int, default=10000, help='approximate total rows (1k to 10M)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='database URL (defaults to DATABASE_URL)')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    config = {'SQLALCHEMY_DATABASE_URI': args.database} if args.database else None
+    app = create_app(config)
+
+    print("🧪 Bad Apples Synthetic Data")
+    print("=" * 40)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = load(args.rows, seed=args.seed)
+        print(f"\n✅ Inserted {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Shared fixtures: the application on scratch databases, so tests never touch
+instance/.
+
+Tests that use ``make_app`` (or a ``database_url``) run once per backend given
+with ``--backend``: ``sqlite`` (the default), ``postgresql``, or both as
+``--backend sqlite,postgresql``. PostgreSQL runs start a throwaway server with
+benchmarks/scratch_postgres.py, which needs ``initdb`` and ``pg_ctl`` on PATH or
+in PG_BIN; each test gets its own database on it.
+"""
+
+import contextlib
+import itertools
+import logging
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, make_url, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BACKENDS = ('sqlite', 'postgresql')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--backend', default='sqlite',
+                     help='comma-separated databases to run the tests on: sqlite, postgresql')
+
+
+def pytest_generate_tests(metafunc):
+    if 'backend' in metafunc.fixturenames:
+        backends = metafunc.config.getoption('backend').split(',')
+        unknown = set(backends) - set(BACKENDS)
+        if unknown:
+            raise pytest.UsageError(f'Unknown --backend {", ".join(sorted(unknown))}; choose from {", ".join(BACKENDS)}')
+        metafunc.parametrize('backend', backends, scope='module')
+
+
+@pytest.fixture(scope='session')
+def databases():
+    """new(backend, directory): the URL of a new, empty database. The PostgreSQL
+    server is started on first use and removed at the end of the session."""
+    with contextlib.ExitStack() as stack:
+        servers = {}
+        numbers = itertools.count(1)
+
+        def new(backend, directory):
+            if backend == 'sqlite':
+                return 'sqlite:///' + os.path.join(directory, 'primary.db')
+            if backend not in servers:
+                from benchmarks.scratch_postgres import scratch_postgres
+                servers[backend] = stack.enter_context(scratch_postgres())
+            url = make_url(servers[backend])
+            name = f'test_{next(numbers)}'
+            engine = create_engine(url, isolation_level='AUTOCOMMIT')
+            with engine.connect() as connection:
+                connection.execute(text(f'CREATE DATABASE {name}'))
+            engine.dispose()
+            return url.set(database=name).render_as_string(hide_password=False)
+
+        yield new
+
+
+def build_app(directory, **config):
+    """An app on <directory>/primary.db; keyword arguments override the config"""
+    from app import create_app
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'primary.db'),
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'RATELIMIT_ENABLED': False,
+        'RATELIMIT_STORAGE_URI': 'memory://',
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+        'PERF_PROFILE_DIR': os.path.join(directory, 'profiles'),
+        'TRACING_FILE': os.path.join(directory, 'traces', 'traces-{pid}.jsonl'),
+        'MAINTENANCE_STATE': os.path.join(directory, 'maintenance.json'),
+        'UPLOAD_FOLDER': os.path.join(directory, 'uploads'),
+        **config,
+    })
+    app.logger.setLevel(logging.CRITICAL)
+    return app
+
+
+@pytest.fixture
+def database_url(backend, databases, tmp_path):
+    """This test's database on the backend under test"""
+    return databases(backend, str(tmp_path))
+
+
+@pytest.fixture
+def make_app(tmp_path, database_url):
+    """build_app on this test's tmp_path and database"""
+    return lambda **config: build_app(str(tmp_path), **{'SQLALCHEMY_DATABASE_URI': database_url, **config})
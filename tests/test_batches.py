@@ -0,0 +1,60 @@
+"""The batch API and the moderation batch actions parse ids the same way"""
+
+from datetime import date
+
+import pytest
+
+from models import db, upgrade_schema, Incident, Officer
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app(API_BATCH_MAX=3)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        upgrade_schema()
+        for number in range(1, 4):
+            officer = Officer(badge_number=f'B{number}', first_name='Test', last_name=f'Officer{number}')
+            db.session.add(Incident(officer=officer, incident_date=date(2020, 1, number), incident_type='test',
+                                    description='test'))
+        db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['is_admin'] = True
+        session['user_id'] = 1
+    return client
+
+
+def test_api_batch_keeps_request_order_without_duplicates(client):
+    response = client.get('/api/officers/batch?ids=3, 1,3,9')
+    assert [officer['id'] for officer in response.json['data']] == [3, 1]
+    assert response.json['missing'] == [9]
+    assert client.get('/api/officers/batch?badges=B2,B2').json['missing'] == []
+
+
+@pytest.mark.parametrize('url', [
+    '/api/officers/batch?ids=',
+    '/api/officers/batch?badges=,',
+    '/api/incidents/batch?ids=',
+    '/api/incidents/batch',
+    '/api/incidents/batch?ids=1,x',
+    '/api/incidents/batch?ids=-1',
+    '/api/incidents/batch?ids=1.5',
+    '/api/incidents/batch?ids=1,2,3,4',  # over API_BATCH_MAX
+])
+def test_api_batch_rejects_bad_batches(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+@pytest.mark.parametrize('record_ids', [[], None, '1', [True], [1.0], ['x'], [-1]])
+def test_moderation_batch_rejects_bad_ids(client, record_ids):
+    response = client.post('/admin/batch_reject', json={'table_name': 'incidents', 'record_ids': record_ids})
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+def test_moderation_batch_accepts_ids_as_strings(client):
+    response = client.post('/admin/batch_approve', json={'table_name': 'incidents', 'record_ids': ['1', 2, '2']})
+    assert response.json['approved'] == 2
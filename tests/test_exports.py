@@ -0,0 +1,60 @@
+"""Streamed CSV exports are charged and timed for the whole body, not just the
+part of the request that ran before the first row"""
+
+import time
+
+import pytest
+
+import adaptive_limits
+import metrics
+from models import db, upgrade_schema
+
+ENDPOINT = 'main.export_incidents_csv'
+DOWNLOADS = 30
+
+
+@pytest.fixture
+def app(make_app):
+    import synthetic_data
+
+    app = make_app(METRICS_FLUSH_SECONDS=3600)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        upgrade_schema()
+        synthetic_data.load(2000, seed=42, progress=None)
+    return app
+
+
+def download(client):
+    """CPU-ms this thread spent on one complete export"""
+    started = time.thread_time()
+    with client.get('/export_incidents_csv') as response:
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.get_data().count(b'\n') > 500
+    return (time.thread_time() - started) * 1000
+
+
+def test_streamed_export_cost_does_not_decay(app, monkeypatch):
+    tracker = adaptive_limits.CostTracker()
+    monkeypatch.setattr(adaptive_limits, 'cost_tracker', tracker)
+    client = app.test_client()
+    download(client)  # warm the caches, so the downloads below cost about the same
+    # Enough downloads for the seeded estimate to have all but worn off
+    spent = [download(client) for _ in range(DOWNLOADS)]
+    # Charged when the stream closes, the estimate tracks what the downloads cost
+    assert tracker.estimate(ENDPOINT) >= 0.5 * min(spent)
+
+
+def test_streamed_export_duration_covers_the_body(app, monkeypatch):
+    observed = []
+    monkeypatch.setattr(metrics.registry, 'observe', lambda name, value, **labels: observed.append((name, value)))
+    client = app.test_client()
+    started = time.perf_counter()
+    with client.get('/export_incidents_csv') as response:
+        response.get_data()
+        time.sleep(0.05)  # a slow client: the response is closed only after this
+    elapsed = time.perf_counter() - started
+    durations = [value for name, value in observed if name == 'badapples_export_duration_seconds']
+    assert len(durations) == 1
+    assert 0.05 <= durations[0] <= elapsed
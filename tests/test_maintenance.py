@@ -0,0 +1,23 @@
+"""Scheduled maintenance tasks"""
+
+import maintenance
+from models import db, ChangeLogCompaction
+
+
+def test_changes_task_skips_a_database_without_the_change_log(make_app):
+    app = make_app()
+    with app.app_context():
+        db.create_all(bind_key=None)
+        ChangeLogCompaction.__table__.drop(db.engine)  # as before the change feed existed
+        results = maintenance.run(db.engine, app.config, tasks=['changes'], force=True)
+    assert results['changes']['ok']
+    assert 'run flask init-db' in results['changes']['result']
+
+
+def test_changes_task_compacts_an_upgraded_database(make_app):
+    app = make_app()
+    with app.app_context():
+        db.create_all(bind_key=None)
+        results = maintenance.run(db.engine, app.config, tasks=['changes'], force=True)
+    assert results['changes']['ok']
+    assert results['changes']['result'].startswith('compacted the change log')
@@ -0,0 +1,25 @@
+"""/metrics is only served to scrapers that send METRICS_TOKEN"""
+
+import pytest
+
+from models import db, upgrade_schema
+
+
+def test_metrics_are_off_without_a_token(make_app):
+    assert make_app().test_client().get('/metrics').status_code == 404
+
+
+@pytest.mark.parametrize('authorization, status', [
+    (None, 401),
+    ('Bearer wrong', 401),
+    ('Bearer sécret', 401),  # non-ASCII, as latin-1 in the WSGI environ
+    ('Bearer secret', 200),
+])
+def test_metrics_need_the_bearer_token(make_app, authorization, status):
+    app = make_app(METRICS_TOKEN='secret')
+    with app.app_context():
+        db.create_all(bind_key=None)
+        upgrade_schema()
+    client = app.test_client()
+    headers = {'Authorization': authorization} if authorization else {}
+    assert client.get('/metrics', headers=headers).status_code == status
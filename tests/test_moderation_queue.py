@@ -0,0 +1,44 @@
+"""Claiming batches from the moderation queue"""
+
+from datetime import date
+
+import pytest
+
+import moderation_queue
+from models import db, upgrade_schema, Incident, Officer
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app()
+    with app.app_context():
+        db.create_all(bind_key=None)
+        upgrade_schema()
+        officer = Officer(badge_number='B1', first_name='Test', last_name='Officer')
+        for day in range(1, 6):
+            db.session.add(Incident(officer=officer, incident_date=date(2020, 1, day), incident_type='test',
+                                    description='test'))
+        db.session.commit()
+        moderation_queue.backfill()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['is_admin'] = True
+        session['user_id'] = 1
+    return client
+
+
+@pytest.mark.parametrize('request_args, claimed', [
+    ({'json': {'limit': 2}}, 2),
+    ({'json': {'limit': '3'}}, 3),
+    ({'json': {'limit': 'many'}}, 5),  # DEFAULT_BATCH_SIZE, more than are pending
+    ({'json': {}}, 5),
+])
+def test_json_clients_set_the_batch_size(client, request_args, claimed):
+    response = client.post('/admin/queue/claim', **request_args)
+    assert len(response.json['claimed']) == claimed
+
+
+def test_the_form_sets_the_batch_size(client):
+    response = client.post('/admin/queue/claim', data={'limit': '4'})
+    assert response.status_code == 302
+    assert len(client.post('/admin/queue/claim', json={}).json['claimed']) == 1
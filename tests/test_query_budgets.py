@@ -0,0 +1,124 @@
+"""Every @query_budget route stays within its budget on seeded data, and the
+detector does fail a view that goes over it"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from conftest import build_app
+from models import db, upgrade_schema, Incident, Officer, User
+from query_detector import QueryBudgetExceeded, query_budget
+
+ROWS = 2000
+
+
+@pytest.fixture(scope='module')
+def seeded(backend, databases, tmp_path_factory):
+    """(app, busiest officer id) on a synthetic database, with NPLUSONE_MODE 'raise'"""
+    import change_feed
+    import moderation_queue
+    import name_search
+    import synthetic_data
+
+    directory = str(tmp_path_factory.mktemp('budgets'))
+    app = build_app(directory, SQLALCHEMY_DATABASE_URI=databases(backend, directory),
+                    NPLUSONE_MODE='raise', CHANGE_FEED_SETTLE_SECONDS=0)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        upgrade_schema()
+        synthetic_data.load(ROWS, seed=42, progress=None)
+        moderation_queue.backfill()
+        change_feed.backfill()
+        name_search.backfill()
+        admin = User(username='admin', email='admin@example.com', role='admin')
+        admin.set_password('admin')
+        db.session.add(admin)
+        db.session.commit()
+        busiest = db.session.execute(
+            select(Incident.officer_id).group_by(Incident.officer_id)
+            .order_by(func.count().desc(), Incident.officer_id).limit(1)
+        ).scalar()
+    return app, busiest
+
+
+def budget_cases(busiest):
+    return [
+        '/',
+        '/officers',
+        '/officers?page=3',
+        '/officers?search=Smith',
+        '/officers?search=Jonhson',  # no exact match: ranked similar names
+        f'/officer/{busiest}',
+        '/search?q=Smith',
+        '/search?q=Garsia',
+        f'/export_officer/{busiest}',
+        '/admin',
+        '/admin/queue',
+        '/api/live_search?q=Joh',
+        '/api/live_search?q=Mcdonld',
+        '/api/officers',
+        '/api/officers?fields=id,last_name,department',
+        f'/api/officer/{busiest}',
+        f'/api/officer/{busiest}?include=incidents,costs,vehicles',
+        f'/api/officers/batch?ids={busiest},1,2,3&include=incidents,costs,vehicles',
+        '/api/officers/batch?badges=B00000001,B00000002',
+        '/api/incidents',
+        '/api/incidents/batch?ids=1,2,3',
+        '/api/changes?since=0',
+    ]
+
+
+@pytest.fixture(scope='module')
+def client(seeded):
+    app, _ = seeded
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['is_admin'] = True
+        session['user_id'] = 1
+    return client
+
+
+def test_every_budgeted_route_is_covered(seeded):
+    app, busiest = seeded
+    adapter = app.url_map.bind('localhost')
+    covered = {adapter.match(url.split('?')[0])[0] for url in budget_cases(busiest)}
+    budgeted = {endpoint for endpoint, view in app.view_functions.items() if hasattr(view, 'query_budget')}
+    assert budgeted <= covered, f'add cases for {sorted(budgeted - covered)}'
+
+
+@pytest.mark.parametrize('case', range(len(budget_cases(0))))
+def test_route_within_budget(seeded, client, case):
+    _, busiest = seeded
+    url = budget_cases(busiest)[case]
+    response = client.get(url)  # QueryBudgetExceeded propagates under TESTING
+    assert response.status_code == 200, url
+
+
+def test_over_budget_and_n_plus_one_views_raise(make_app):
+    app = make_app(NPLUSONE_MODE='raise')
+
+    @query_budget(1)
+    def over_budget():
+        return str(Officer.query.count() + Incident.query.count())
+
+    @query_budget(20)
+    def n_plus_one():
+        return ', '.join(incident.officer.last_name for incident in Incident.query.all())
+
+    app.add_url_rule('/over_budget', 'over_budget', over_budget)
+    app.add_url_rule('/n_plus_one', 'n_plus_one', n_plus_one)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        upgrade_schema()
+        for number in range(3):
+            officer = Officer(badge_number=f'T{number}', first_name='Test', last_name=f'Officer{number}')
+            db.session.add(Incident(officer=officer, incident_date=date(2020, 1, 1), incident_type='test',
+                                    description='test'))
+        db.session.commit()
+
+    client = app.test_client()
+    with pytest.raises(QueryBudgetExceeded, match='over_budget'):
+        client.get('/over_budget')
+    with pytest.raises(QueryBudgetExceeded, match='Incident.officer'):
+        client.get('/n_plus_one')
@@ -0,0 +1,28 @@
+"""Each app gets its own rate limiter, configured from its own config"""
+
+import rate_limits
+
+
+def test_apps_do_not_share_limiter_state(make_app):
+    disabled = make_app(RATELIMIT_ENABLED=False)
+    enabled = make_app(RATELIMIT_ENABLED=True)
+    assert enabled.config['RATELIMIT_ENABLED'] is True
+    assert rate_limits.get_limiter(enabled) is not rate_limits.get_limiter(disabled)
+    assert rate_limits.get_limiter(enabled).enabled
+    assert not rate_limits.get_limiter(disabled).enabled
+
+
+def test_view_limits_apply_per_app(make_app):
+    limited = make_app(RATELIMIT_ENABLED=True).test_client()
+    unlimited = make_app(RATELIMIT_ENABLED=False).test_client()
+    assert [limited.get('/admin/login').status_code for _ in range(6)] == [200] * 5 + [429]
+    assert [unlimited.get('/admin/login').status_code for _ in range(6)] == [200] * 6
+
+
+def test_exempt_view_skips_the_default_limits(make_app):
+    app = make_app(RATELIMIT_ENABLED=True)
+    app.add_url_rule('/probe', 'probe', lambda: 'ok')
+    client = app.test_client()
+    requests = 51  # one over the default "50 per hour"
+    assert {client.get('/metrics').status_code for _ in range(requests)} == {404}  # no METRICS_TOKEN
+    assert [client.get('/probe').status_code for _ in range(requests)][-1] == 429
@@ -0,0 +1,82 @@
+"""Read/write routing against a SQLite file snapshot used as a read-only replica"""
+
+import contextlib
+import sqlite3
+
+import pytest
+
+import replicas
+from models import db, upgrade_schema, Officer
+
+
+@pytest.fixture
+def app(backend, make_app, tmp_path):
+    """An app whose replica is a snapshot of the primary taken before the
+    officer's last name changed: 'Replica' there, 'Primary' on the primary"""
+    if backend != 'sqlite':
+        pytest.skip('the replica is a copy of the SQLite file')
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    seed = make_app()
+    with seed.app_context():
+        db.create_all(bind_key=None)  # earlier apps in the process may have registered replica binds
+        upgrade_schema()
+        db.session.add(Officer(id=1, badge_number='B1', first_name='Pat', last_name='Replica'))
+        db.session.commit()
+        db.engine.dispose()
+    with contextlib.closing(sqlite3.connect(primary)) as source, \
+            contextlib.closing(sqlite3.connect(replica)) as target:
+        source.backup(target)
+        source.execute("UPDATE officers SET last_name = 'Primary' WHERE id = 1")
+        source.commit()
+
+    # The probes re-read the same row on purpose, which the N+1 detector would flag
+    app = make_app(SQLALCHEMY_REPLICA_URIS=[f'sqlite:///file:{replica}?mode=ro&uri=true'], NPLUSONE_MODE='off')
+
+    def last_name():
+        return db.session.get(Officer, 1).last_name
+
+    def write_then_read():
+        before = last_name()
+        db.session.get(Officer, 1).current_rank = 'Sergeant'
+        db.session.flush()
+        db.session.expire_all()
+        after = last_name()
+        db.session.commit()
+        return f'{before} then {after}'
+
+    app.add_url_rule('/probe', 'probe', last_name, methods=['GET', 'POST'])
+    app.add_url_rule('/probe/write', 'probe_write', write_then_read, methods=['GET', 'POST'])
+    app.add_url_rule('/admin/probe', 'admin_probe', last_name)
+    return app
+
+
+def test_get_reads_the_replica(app):
+    client = app.test_client()
+    assert client.get('/probe').text == 'Replica'
+    assert client.head('/probe').status_code == 200
+    assert client.get_cookie(replicas.STICKY_COOKIE) is None
+
+
+def test_post_uses_the_primary(app):
+    client = app.test_client()
+    assert client.post('/probe').text == 'Primary'
+    assert client.get_cookie(replicas.STICKY_COOKIE) is None  # nothing was written
+
+
+def test_flush_switches_to_the_primary_and_sticks(app):
+    client = app.test_client()
+    assert client.get('/probe/write').text == 'Replica then Primary'
+    assert client.get_cookie(replicas.STICKY_COOKIE) is not None
+    assert client.get('/probe').text == 'Primary'  # the browser reads its own writes
+    assert app.test_client().get('/probe').text == 'Replica'  # other browsers do not
+
+
+def test_post_write_sets_the_sticky_cookie(app):
+    client = app.test_client()
+    assert client.post('/probe/write').text == 'Primary then Primary'
+    assert client.get_cookie(replicas.STICKY_COOKIE) is not None
+    assert client.get('/probe').text == 'Primary'
+
+
+def test_admin_pages_use_the_primary(app):
+    assert app.test_client().get('/admin/probe').text == 'Primary'
@@ -0,0 +1,65 @@
+"""Request writes wait out another process holding the SQLite write lock"""
+
+import contextlib
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import metrics
+from models import db, upgrade_schema, Incident, Officer
+
+
+@pytest.fixture
+def app(backend, make_app, tmp_path):
+    if backend != 'sqlite':
+        pytest.skip('SQLite database locks')
+    app = make_app(SQLITE_BUSY_TIMEOUT_MS=10, SQLITE_BUSY_RETRIES=5)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        upgrade_schema()
+        officer = Officer(badge_number='B1', first_name='Test', last_name='Officer')
+        db.session.add(Incident(officer=officer, incident_date=date(2020, 1, 1), incident_type='test',
+                                description='test'))
+        db.session.commit()
+    return app
+
+
+@contextlib.contextmanager
+def locked_for(path, seconds):
+    """Hold the database's write lock from another connection for a while"""
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute('BEGIN IMMEDIATE')
+    timer = threading.Timer(seconds, other.execute, ['COMMIT'])
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.join()
+        other.close()
+
+
+def retries():
+    return sum(value for name, _, value in metrics.registry.snapshot()['counters']
+               if name == 'badapples_db_busy_retries_total')
+
+
+@pytest.mark.parametrize('method, url, body', [
+    ('post', '/admin/batch_approve', {'table_name': 'incidents', 'record_ids': [1]}),
+    ('post', '/admin/batch_reject', {'table_name': 'incidents', 'record_ids': [1]}),
+    ('post', '/admin/queue/claim', {'limit': 1}),
+    ('get', '/admin/approve/incidents/1', None),
+])
+def test_moderation_writes_retry_while_locked(app, tmp_path, method, url, body):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['is_admin'] = True
+        session['user_id'] = 1
+    before = retries()
+    with locked_for(tmp_path / 'primary.db', 0.1):
+        time.sleep(0.01)
+        response = getattr(client, method)(url, json=body)
+    assert response.status_code in (200, 302)
+    assert retries() > before
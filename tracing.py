@@ -0,0 +1,236 @@
+"""
+Lightweight request tracing with a local file exporter.
+
+A sampled request gets a trace made of nested spans: the request itself, the
+view dispatch, every SQL statement, every Jinja template render, and any
+spans opened with ``tracing.span()`` (file sends, SMTP). When the request
+ends, its spans are appended as JSON lines to a size-rotated file, one file
+per worker process so rotation never races between workers.
+
+TRACING_SAMPLE_RATE (0 to 1) picks the share of requests traced; an admin can
+trace a single request by adding ``?_trace=1``. No collector is needed:
+``jq`` or any JSON tool can read the files.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import secrets
+import time
+
+from flask import before_render_template, current_app, g, request, session, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+MAX_STATEMENT_LENGTH = 500
+TRACE_PARAM = '_trace'
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start', 'end', 'attributes', '_token')
+
+    def __init__(self, trace, name, parent, attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes
+        self._token = None
+
+    def finish(self):
+        self.end = time.time()
+        self.trace.spans.append(self)
+
+    def as_dict(self):
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round((self.end - self.start) * 1000, 3),
+            'attributes': self.attributes,
+        }
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+
+
+def start_span(name, **attributes):
+    """Open a child of the current span. Returns None when the request is not traced."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    span = Span(parent.trace, name, parent, attributes)
+    span._token = _current_span.set(span)
+    return span
+
+
+def end_span(span, **attributes):
+    if span is None:
+        return
+    span.attributes.update(attributes)
+    _current_span.reset(span._token)
+    span.finish()
+
+
+class span:
+    """Context manager for a span; does nothing in untraced requests"""
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._span = None
+
+    def __enter__(self):
+        self._span = start_span(self.name, **self.attributes)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._span is not None:
+            self._span.attributes['error'] = exc_type.__name__
+        end_span(self._span)
+        return False
+
+
+# --- Instrumentation ---------------------------------------------------------
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_span(conn, cursor, statement, parameters, context, executemany):
+    if _current_span.get() is not None:
+        conn.info.setdefault('trace_spans', []).append(
+            start_span('sql', statement=statement[:MAX_STATEMENT_LENGTH], executemany=executemany))
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _end_query_span(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('trace_spans')
+    if spans:
+        span = spans.pop()
+        if cursor.rowcount >= 0:  # only known for writes on most drivers
+            span.attributes['rows'] = cursor.rowcount
+        end_span(span)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _fail_query_span(context):
+    spans = context.connection.info.get('trace_spans') if context.connection is not None else None
+    if spans:
+        end_span(spans.pop(), error=type(context.original_exception).__name__)
+
+
+def _start_template_span(sender, template, context, **extra):
+    span = start_span('render_template', template=template.name)
+    if span is not None:
+        g.setdefault('trace_template_spans', []).append(span)
+
+
+def _end_template_span(sender, template, context, **extra):
+    spans = g.get('trace_template_spans')
+    if spans:
+        end_span(spans.pop())
+
+
+def _traced_view(view, endpoint):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with span('dispatch', endpoint=endpoint):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+# --- Export ------------------------------------------------------------------
+
+class FileExporter:
+    """Appends finished traces to a rotating JSON lines file for this process"""
+
+    def __init__(self, path_template, max_bytes, backup_count):
+        self.path_template = path_template
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._pid = None
+        self._handler = None
+
+    def _get_handler(self):
+        if self._pid != os.getpid():
+            path = self.path_template.format(pid=os.getpid())
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=self.max_bytes, backupCount=self.backup_count, delay=True)
+            self._handler.setFormatter(logging.Formatter('%(message)s'))
+            self._pid = os.getpid()
+        return self._handler
+
+    def export(self, trace):
+        handler = self._get_handler()
+        for finished in trace.spans:
+            handler.handle(logging.makeLogRecord({'msg': json.dumps(finished.as_dict(), default=str)}))
+
+
+def _sampled():
+    if request.args.get(TRACE_PARAM) and session.get('is_admin'):
+        return True
+    rate = current_app.config['TRACING_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+def init_app(app):
+    """Trace sampled requests. Call after the blueprints are registered, so views are wrapped."""
+    app.config.setdefault('TRACING_SAMPLE_RATE', 0.0)
+    app.config.setdefault('TRACING_FILE', os.path.join(app.instance_path, 'traces', 'traces-{pid}.jsonl'))
+    app.config.setdefault('TRACING_MAX_BYTES', DEFAULT_MAX_BYTES)
+    app.config.setdefault('TRACING_BACKUP_COUNT', DEFAULT_BACKUP_COUNT)
+
+    exporter = FileExporter(app.config['TRACING_FILE'], app.config['TRACING_MAX_BYTES'],
+                            app.config['TRACING_BACKUP_COUNT'])
+    app.extensions['tracing'] = exporter
+
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint != 'static':
+            app.view_functions[endpoint] = _traced_view(view, endpoint)
+
+    before_render_template.connect(_start_template_span, app)
+    template_rendered.connect(_end_template_span, app)
+
+    @app.before_request
+    def start_trace():
+        if not _sampled():
+            return
+        root = Span(Trace(), 'request', None, {
+            'method': request.method, 'path': request.path, 'endpoint': request.endpoint})
+        root._token = _current_span.set(root)
+        g.trace_root = root
+
+    @app.teardown_request
+    def finish_trace(exc):
+        root = g.pop('trace_root', None)
+        if root is None:
+            return
+        if exc is not None:
+            root.attributes['error'] = type(exc).__name__
+        root.attributes['status'] = g.pop('trace_status', None)
+        _current_span.reset(root._token)
+        root.finish()
+        try:
+            exporter.export(root.trace)
+        except OSError as e:
+            current_app.logger.warning('Could not write trace: %s', e)
+
+    @app.after_request
+    def note_trace_status(response):
+        if 'trace_root' in g:
+            g.trace_status = response.status_code
+        return response